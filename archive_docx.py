@@ -1,17 +1,27 @@
 import os
 from datetime import datetime
-from docx import Document
 import shutil
+from concurrent.futures import ProcessPoolExecutor
 import sys
 from utils_func import (
     load_config,
     mkdirs_with_owner,
     change_file_owner,
     setup_logging,
-    mqtt_publish,
+    get_state_folder,
+)
+from download_index import DownloadIndex
+from notifier import get_notifier
+from docx_merge import merge_docx_stream, PAGE_BREAK, EMPTY_PARAGRAPH
+from output_writers import (
+    ARTICLE_EXTENSIONS,
+    INDEX_EXTENSION,
+    STRUCTURED_EXTENSION,
+    index_name,
 )
 from syno_drive_orgnizer import process_stars_move_api
-import time
+import metrics
+from metrics import observe, timed
 
 # 调用时传入参数: move、combine或者stars
 
@@ -25,133 +35,265 @@ class DocxArchiver:
         self.root_folder = os.path.join(os.getcwd(), self.config.get("save_folder"))
         self.news_sites = self.config.get("news_sites")
         self.current_date = datetime.now().strftime("%Y-%m-%d")
+        self.state_folder = get_state_folder(self.config)
+        metrics.configure(self.config)
+        self._indexes = {}
+        # 并行合并的进程数，为1时在当前进程中逐个合并
+        self.archive_workers = self.config.get("archive_workers", 2)
+        # 已分配给合并任务的输出文件
+        self._reserved_files = set()
+
+    def get_download_index(self, site):
+        # 每个站点的已下载文章索引只打开一次
+        if site not in self._indexes:
+            self._indexes[site] = DownloadIndex(self.state_folder, site)
+        return self._indexes[site]
 
     def merge_docx_files(
-        self, docx_folder, output_folder, file_prefix, break_flag=True, by_category=True
+        self,
+        docx_folder,
+        output_folder,
+        file_prefix,
+        break_flag=True,
+        by_category=True,
+        site=None,
+    ):
+        # 合并一个文件夹中的docx文件，全部合并成功时返回True
+        jobs = self.plan_merge_jobs(
+            docx_folder, output_folder, file_prefix, break_flag, by_category, site
+        )
+        return not self.run_merge_jobs(jobs)
+
+    def plan_merge_jobs(
+        self,
+        docx_folder,
+        output_folder,
+        file_prefix,
+        break_flag=True,
+        by_category=True,
+        site=None,
     ):
-        # 获取输入文件夹中的所有docx文件
-        docx_files = sorted([f for f in os.listdir(docx_folder) if f.endswith(".docx")])
+        # 生成合并任务：每个合并后的文档一个任务，输出文件名在主进程中预先确定
+        # 获取输入文件夹中的所有文章：优先使用docx，只输出了jsonl的文章合并时再转换为docx
+        article_files = {}
+        for file in os.listdir(docx_folder):
+            name_pure, extension = os.path.splitext(file)
+            if extension == INDEX_EXTENSION or (
+                extension == STRUCTURED_EXTENSION and name_pure not in article_files
+            ):
+                article_files[name_pure] = file
+        # 按docx文件名排序，与只有docx时的顺序相同
+        docx_files = [
+            article_files[name_pure]
+            for name_pure in sorted(article_files, key=lambda name: name + INDEX_EXTENSION)
+        ]
         # 获取文件数量以避免多次计算
         num_files = len(docx_files)
         if num_files == 0:
             self.logger.info(f"【{file_prefix}】没有找到任何docx文件")
-            return
+            return []
 
-        # 创建一个字典用于存储不同类别的文档内容（如果按类别合并）
-        category_documents = {} if by_category else None
-        merged_document = Document() if not by_category else None
+        # 按合并后的文档分组，记录每个源文件及其后追加的分隔内容（分页符或空段落）
+        category_sources = {}
 
         for index, docx_file in enumerate(docx_files):
             # 从文件名中提取类别
             category_current = docx_file.split("-")[0]
             docx_path = os.path.join(docx_folder, docx_file)
-            document = Document(docx_path)
 
+            separator = b""
             if break_flag and index < num_files - 1:
                 if by_category:
                     # 获取下一个文件的类别
                     category_next = docx_files[index + 1].split("-")[0]
                     # 如果当前类别与下一个文件类别相同, 则添加分页符
                     if category_current == category_next:
-                        document.add_page_break()
+                        separator = PAGE_BREAK
                 else:
-                    document.add_page_break()
+                    separator = PAGE_BREAK
             else:
-                document.add_paragraph()
-
-            if by_category:
-                # 如果该类别还没有Document对象, 创建一个新的Document对象
-                if category_current not in category_documents:
-                    category_documents[category_current] = Document()
-                # 获取当前类别的Document对象
-                merged_document = category_documents[category_current]
+                separator = EMPTY_PARAGRAPH
 
-            # 将当前文档的内容添加到合并文档中
-            for element in document.element.body:
-                merged_document.element.body.append(element)
+            category_sources.setdefault(
+                category_current if by_category else None, []
+            ).append((docx_path, separator))
 
-        # 保存每个类别的合并文档或单个合并文档
         mkdirs_with_owner(output_folder, self.uid, self.gid)
 
-        if by_category:
-            for category_current, merged_document in category_documents.items():
+        jobs = []
+        for category_current, sources in category_sources.items():
+            if by_category:
                 file_name = f"{file_prefix}-{category_current}-{self.current_date}"
-                file_name = (
-                    f"{self._generate_unique_file_name(output_folder, file_name)}.docx"
-                )
-                output_file = os.path.join(output_folder, file_name)
-                merged_document.save(output_file)
-                change_file_owner(output_file, self.uid, self.gid)
-                self.logger.info(f"合并文件 {file_name} 成功")
-        else:
-            file_name = f"{file_prefix}-{self.current_date}"
+            else:
+                file_name = f"{file_prefix}-{self.current_date}"
             file_name = (
                 f"{self._generate_unique_file_name(output_folder, file_name)}.docx"
             )
             output_file = os.path.join(output_folder, file_name)
-            merged_document.save(output_file)
-            change_file_owner(output_file, self.uid, self.gid)
-            self.logger.info(f"合并文件 {file_name} 成功")
+            self._reserved_files.add(output_file)
+            jobs.append(
+                {
+                    "site": site,
+                    "file_name": file_name,
+                    "output_file": output_file,
+                    "sources": sources,
+                }
+            )
+        return jobs
+
+    @timed("merge_docx")
+    def run_merge_jobs(self, jobs):
+        """
+        执行合并任务，archive_workers大于1时用进程池并行合并。
+        返回合并失败的任务所属的站点集合
+        """
+        failed_sites = set()
+        if not jobs:
+            return failed_sites
+
+        workers = min(self.archive_workers, len(jobs))
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            if executor:
+                futures = [
+                    executor.submit(merge_docx_stream, job["sources"], job["output_file"])
+                    for job in jobs
+                ]
+            # 按任务顺序处理结果，日志和索引更新的顺序保持确定
+            for index, job in enumerate(jobs):
+                try:
+                    if executor:
+                        futures[index].result()
+                    else:
+                        merge_docx_stream(job["sources"], job["output_file"])
+                except Exception as e:
+                    self.logger.error(f"合并文件 {job['file_name']} 失败: {e}")
+                    failed_sites.add(job["site"])
+                    # 删除写了一半的文件，下次合并时重新生成
+                    if os.path.exists(job["output_file"]):
+                        os.remove(job["output_file"])
+                    continue
+                change_file_owner(job["output_file"], self.uid, self.gid)
+                self.logger.info(f"合并文件 {job['file_name']} 成功")
+                if job["site"]:
+                    merged_files = [
+                        index_name(os.path.basename(path)) for path, _ in job["sources"]
+                    ]
+                    self.get_download_index(job["site"]).mark_merged(
+                        merged_files, job["file_name"]
+                    )
+        finally:
+            if executor:
+                executor.shutdown()
+            self._reserved_files.difference_update(job["output_file"] for job in jobs)
+        return failed_sites
 
     def _generate_unique_file_name(self, output_folder, file_name):
         output_file = os.path.join(output_folder, f"{file_name}.docx")
-        if os.path.exists(output_file):
+        # 已分配给其他合并任务但还没写入的文件名同样视为已存在
+        if os.path.exists(output_file) or output_file in self._reserved_files:
             return self._generate_unique_file_name(output_folder, f"{file_name}-new")
         return file_name
 
-    def move_docx_files_to_archive(self, docx_folder, target_folder):
+    def move_docx_files_to_archive(self, docx_folder, target_folder, site=None):
         mkdirs_with_owner(target_folder, self.uid, self.gid)
-        num = 0
+        moved_files = []
         for file in os.listdir(docx_folder):
-            if file.endswith(".docx"):
-                num += 1
+            # 同一篇文章的各种输出格式一起移动
+            if file.endswith(ARTICLE_EXTENSIONS):
+                moved_files.append(file)
                 shutil.move(
                     os.path.join(docx_folder, file),
                     os.path.join(target_folder, file),
                 )
+        num = len(moved_files)
+        if site and moved_files:
+            # 索引中记录相对于站点文件夹的路径
+            site_folder = os.path.join(self.root_folder, site)
+            folder = os.path.relpath(target_folder, site_folder).replace("\\", "/")
+            self.get_download_index(site).move(
+                sorted({index_name(file) for file in moved_files}), folder
+            )
         if num > 0:
             self.logger.info(f"移动 {num} 个文件到 {target_folder} 成功")
 
     def process_combine_mode(self, break_flag=True):
         output_folder = os.path.join(self.root_folder, "合并文档-按类别")
+        jobs = []
         for item in self.news_sites:
             docx_folder = os.path.join(self.root_folder, item.get("name"))
+            # 站点还没有下载过文章时没有文件夹，跳过，不影响其他站点的合并
+            if not os.path.exists(docx_folder):
+                continue
             file_prefix = item.get("name_cn")
 
-            self.merge_docx_files(
-                docx_folder, output_folder, file_prefix, break_flag, by_category=True
+            jobs += self.plan_merge_jobs(
+                docx_folder,
+                output_folder,
+                file_prefix,
+                break_flag,
+                by_category=True,
+                site=item.get("name"),
             )
+        failed_sites = self.run_merge_jobs(jobs)
 
+        for item in self.news_sites:
+            docx_folder = os.path.join(self.root_folder, item.get("name"))
+            if not os.path.exists(docx_folder):
+                continue
+            if item.get("name") in failed_sites:
+                self.logger.error(f"【{item.get('name_cn')}】有文件合并失败，暂不移动")
+                continue
             archive_folder = os.path.join(
                 docx_folder, "合并过的文件", self.current_date
             )
-            self.move_docx_files_to_archive(docx_folder, archive_folder)
+            self.move_docx_files_to_archive(
+                docx_folder, archive_folder, site=item.get("name")
+            )
 
     def process_stars_mode(self, break_flag=True):
         output_folder = os.path.join(self.root_folder, "合并文档-加星")
+        jobs = []
         for item in self.news_sites:
             docx_folder = os.path.join(self.root_folder, item.get("name"), "加星")
             if not os.path.exists(docx_folder):
                 continue
 
             file_prefix = f"{item.get('name_cn')}-加星"
-            self.merge_docx_files(
-                docx_folder, output_folder, file_prefix, break_flag, by_category=False
+            jobs += self.plan_merge_jobs(
+                docx_folder,
+                output_folder,
+                file_prefix,
+                break_flag,
+                by_category=False,
+                site=item.get("name"),
             )
+        failed_sites = self.run_merge_jobs(jobs)
 
+        for item in self.news_sites:
+            docx_folder = os.path.join(self.root_folder, item.get("name"), "加星")
+            if not os.path.exists(docx_folder):
+                continue
+            if item.get("name") in failed_sites:
+                self.logger.error(f"【{item.get('name_cn')}】有文件合并失败，暂不移动")
+                continue
             archive_folder = os.path.join(
                 self.root_folder,
                 item.get("name"),
                 "合并过的文件",
                 f"加星-{self.current_date}",
             )
-            self.move_docx_files_to_archive(docx_folder, archive_folder)
+            self.move_docx_files_to_archive(
+                docx_folder, archive_folder, site=item.get("name")
+            )
 
     def process_move_mode(self):
         for item in self.news_sites:
             docx_folder = os.path.join(self.root_folder, item.get("name"))
             archive_folder = os.path.join(docx_folder, "已读的文件", self.current_date)
-            self.move_docx_files_to_archive(docx_folder, archive_folder)
+            self.move_docx_files_to_archive(
+                docx_folder, archive_folder, site=item.get("name")
+            )
 
     def run(self, mode, break_flag=True):
         if mode not in ["move", "combine", "stars"]:
@@ -161,12 +303,13 @@ class DocxArchiver:
         self.logger.info("开始移动加星文件到指定文件夹")
         process_stars_move_api()
 
-        if mode == "combine":
-            self.process_combine_mode(break_flag)
-        elif mode == "stars":
-            self.process_stars_mode(break_flag)
-        elif mode == "move":
-            self.process_move_mode()
+        with observe(f"archive_{mode}"):
+            if mode == "combine":
+                self.process_combine_mode(break_flag)
+            elif mode == "stars":
+                self.process_stars_mode(break_flag)
+            elif mode == "move":
+                self.process_move_mode()
 
 
 if __name__ == "__main__":
@@ -184,8 +327,8 @@ if __name__ == "__main__":
     try:
         archiver = DocxArchiver()
         archiver.run(mode, break_flag)
-        time.sleep(2)
-        mqtt_publish(payload="update-drive")
+        # 延迟2秒发送，等待文件写入完成；进程退出前等待消息发送
+        get_notifier(archiver.config).mqtt("update-drive", delay=2)
     except Exception as e:
         print(f"发生错误: {str(e)}")
         sys.exit(1)
@@ -0,0 +1,119 @@
+# 文章的紧凑表示：解析后立即转为只含字符串的 __slots__ 对象，不再引用BeautifulSoup文档树，
+# 抓取完成后整个页面的soup即可释放。按年份回填时一年的文章列表也只占很少的内存。
+
+
+class Paper:
+    """列表页中的一篇文章，兼容字典的写法：paper["title"]、paper.get("href_attachement")"""
+
+    __slots__ = ("category", "pubtime", "href", "title", "href_attachement")
+
+    def __init__(self, category, pubtime, href, title, href_attachement=None):
+        self.category = category
+        self.pubtime = pubtime
+        self.href = href
+        self.title = title
+        self.href_attachement = href_attachement
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def _fields(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other):
+        return isinstance(other, Paper) and self._fields() == other._fields()
+
+    def __repr__(self):
+        return f"Paper{self._fields()!r}"
+
+
+class Paragraph:
+    """正文的一个段落：文本和加粗部分在文本中的位置 ((开始, 结束), ...)"""
+
+    __slots__ = ("text", "bold")
+
+    def __init__(self, text, bold=()):
+        self.text = text
+        self.bold = bold
+
+    @classmethod
+    def from_runs(cls, runs):
+        """由[(文本, 是否加粗)]生成，相邻的加粗部分合并"""
+        parts, spans = [], []
+        offset = 0
+        for text, bold in runs:
+            text = str(text)
+            if bold and text:
+                if spans and spans[-1][1] == offset:
+                    spans[-1] = (spans[-1][0], offset + len(text))
+                else:
+                    spans.append((offset, offset + len(text)))
+            parts.append(text)
+            offset += len(text)
+        return cls("".join(parts), tuple(spans))
+
+    def runs(self):
+        """按加粗部分拆分为[(文本, 是否加粗)]，没有文本时为空列表"""
+        runs, offset = [], 0
+        for start, end in self.bold:
+            if start > offset:
+                runs.append((self.text[offset:start], False))
+            runs.append((self.text[start:end], True))
+            offset = end
+        if offset < len(self.text):
+            runs.append((self.text[offset:], False))
+        return runs
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, Paragraph)
+            and self.text == other.text
+            and self.bold == other.bold
+        )
+
+    def __repr__(self):
+        return f"Paragraph({self.text!r}, {self.bold!r})"
+
+
+class Article:
+    """一篇文章，写入各种输出格式；jsonl中的格式见 to_dict"""
+
+    __slots__ = ("category", "title", "pubtime", "href", "paragraphs")
+
+    def __init__(self, category, title, pubtime, href=None, paragraphs=()):
+        self.category = category
+        self.title = title
+        self.pubtime = pubtime
+        self.href = href
+        self.paragraphs = list(paragraphs)
+
+    def body(self):
+        return "\n".join(paragraph.text for paragraph in self.paragraphs)
+
+    def to_dict(self):
+        return {
+            "category": self.category,
+            "title": self.title,
+            "pubtime": self.pubtime,
+            "href": self.href,
+            "paragraphs": [
+                [[text, bold] for text, bold in paragraph.runs()]
+                for paragraph in self.paragraphs
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data["category"],
+            data["title"],
+            data["pubtime"],
+            data.get("href"),
+            [Paragraph.from_runs(runs) for runs in data["paragraphs"]],
+        )
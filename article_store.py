@@ -0,0 +1,323 @@
+import html
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import zipfile
+from article_model import Article, Paragraph
+from download_index import DownloadIndex
+from output_writers import INDEX_EXTENSION, STRUCTURED_EXTENSION, index_name, read_article
+from utils_func import load_config, setup_logging, get_state_folder
+
+# 调用时传入参数:
+#   import [站点名称]                  导入磁盘上已有的docx和jsonl文章，只处理新增或修改过的文件
+#   search [关键词...] [site=站点名称] [category=类别] [from=开始日期] [to=结束日期] [limit=条数]
+#                                      按关键词全文搜索，日期格式为YYYY-MM-DD，不传关键词时按日期列出
+
+# 文件名中的日期，格式与 BaseScraper.format_date 相同
+_NAME_DATE = re.compile(r"-(\d{4}-\d{2}-\d{2})-")
+_TEXT_DATE = re.compile(r"(\d{4})[-年/.](\d{1,2})[-月/.](\d{1,2})")
+# document.xml中的段落和段落中的文本
+_PARAGRAPH = re.compile(rb"<w:p(?:\s[^>]*)?>(.*?)</w:p>|<w:p\s*/>", re.S)
+_PARAGRAPH_TEXT = re.compile(rb"<w:t(?:\s[^>]*)?>([^<]*)</w:t>|<w:(tab|br)\s*/>")
+# 全文索引使用trigram分词，中文按任意连续3个字匹配，少于3个字的关键词改用LIKE
+MIN_MATCH_CHARS = 3
+
+
+def article_date(name, pubtime):
+    """返回YYYY-MM-DD格式的日期，优先从文件名中提取"""
+    if match := _NAME_DATE.search(name):
+        return match.group(1)
+    if match := _TEXT_DATE.search(pubtime or ""):
+        year, month, day = match.groups()
+        return f"{year}-{int(month):02d}-{int(day):02d}"
+    return None
+
+
+def read_docx_paragraphs(path):
+    """直接从document.xml中提取各段落的文本，不加载python-docx对象模型"""
+    with zipfile.ZipFile(path) as package:
+        document_xml = package.read("word/document.xml")
+    paragraphs = []
+    for match in _PARAGRAPH.finditer(document_xml):
+        parts = []
+        for text, special in _PARAGRAPH_TEXT.findall(match.group(1) or b""):
+            if special:
+                parts.append("\t" if special == b"tab" else "\n")
+            else:
+                parts.append(html.unescape(text.decode("utf-8")))
+        paragraphs.append("".join(parts))
+    return paragraphs
+
+
+def read_article_file(path):
+    """读取docx或jsonl文章，返回Article"""
+    if path.endswith(STRUCTURED_EXTENSION):
+        return read_article(path)
+    # 文章docx的前三段依次为类别、标题和日期
+    paragraphs = read_docx_paragraphs(path) + ["", "", ""]
+    category, title, pubtime = paragraphs[:3]
+    return Article(
+        category,
+        title,
+        pubtime,
+        paragraphs=[Paragraph(text) for text in paragraphs[3:-3] if text],
+    )
+
+
+class ArticleStore:
+    """
+    文章库，保存在 state 文件夹下的 sqlite 数据库中，包含类别、标题、日期、链接和正文，
+    用 FTS5 对标题和正文建立全文索引。爬取时每写入一篇文章就加入文章库，
+    已有的文章通过 import 导入，只解析新增或修改过的文件。
+    """
+
+    DB_NAME = "articles.sqlite3"
+
+    def __init__(self, state_folder):
+        self.logger = setup_logging()
+        self.db_path = os.path.join(state_folder, self.DB_NAME)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS articles (
+                id INTEGER PRIMARY KEY,
+                site TEXT NOT NULL,
+                name TEXT NOT NULL,
+                category TEXT,
+                title TEXT,
+                pubtime TEXT,
+                date TEXT,
+                href TEXT,
+                body TEXT,
+                mtime REAL,
+                updated_at REAL,
+                UNIQUE (site, name)
+            );
+            CREATE INDEX IF NOT EXISTS idx_articles_date ON articles (site, date);
+            """
+        )
+        # 全文索引与articles表通过触发器同步；sqlite不支持trigram时只用LIKE搜索
+        try:
+            self._conn.executescript(
+                """
+                CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+                    title, body, content='articles', content_rowid='id',
+                    tokenize='trigram'
+                );
+                CREATE TRIGGER IF NOT EXISTS articles_ai AFTER INSERT ON articles BEGIN
+                    INSERT INTO articles_fts (rowid, title, body)
+                    VALUES (new.id, new.title, new.body);
+                END;
+                CREATE TRIGGER IF NOT EXISTS articles_ad AFTER DELETE ON articles BEGIN
+                    INSERT INTO articles_fts (articles_fts, rowid, title, body)
+                    VALUES ('delete', old.id, old.title, old.body);
+                END;
+                CREATE TRIGGER IF NOT EXISTS articles_au AFTER UPDATE ON articles BEGIN
+                    INSERT INTO articles_fts (articles_fts, rowid, title, body)
+                    VALUES ('delete', old.id, old.title, old.body);
+                    INSERT INTO articles_fts (rowid, title, body)
+                    VALUES (new.id, new.title, new.body);
+                END;
+                """
+            )
+            self.fts = True
+        except sqlite3.OperationalError as e:
+            self.logger.warning(f"sqlite不支持FTS5 trigram分词，改用LIKE搜索：{e}")
+            self.fts = False
+        self._conn.commit()
+
+    def add(self, site, name, article, mtime=None):
+        """加入或更新一篇文章，name为索引中的docx文件名"""
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO articles (
+                    site, name, category, title, pubtime, date, href, body,
+                    mtime, updated_at
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (site, name) DO UPDATE SET
+                    category = excluded.category,
+                    title = excluded.title,
+                    pubtime = excluded.pubtime,
+                    date = excluded.date,
+                    href = COALESCE(excluded.href, articles.href),
+                    body = excluded.body,
+                    mtime = excluded.mtime,
+                    updated_at = excluded.updated_at
+                """,
+                (
+                    site,
+                    name,
+                    article.category,
+                    article.title,
+                    article.pubtime,
+                    article_date(name, article.pubtime),
+                    article.href,
+                    article.body(),
+                    mtime,
+                    time.time(),
+                ),
+            )
+            self._conn.commit()
+
+    def import_folder(self, site, folder, hrefs=None):
+        """
+        导入文件夹（含归档子文件夹）中的文章，返回导入的数量。
+        爬取时加入的文章和修改时间没有变化的文件直接跳过；hrefs为{docx文件名: 链接}
+        """
+        known = dict(
+            self._conn.execute(
+                "SELECT name, mtime FROM articles WHERE site = ?", (site,)
+            ).fetchall()
+        )
+        files = {}
+        for root, _, names in os.walk(folder):
+            for file in names:
+                if not file.endswith((INDEX_EXTENSION, STRUCTURED_EXTENSION)):
+                    continue
+                name = index_name(file)
+                # 同一篇文章同时有docx和jsonl时使用jsonl，包含链接和加粗信息
+                if name not in files or file.endswith(STRUCTURED_EXTENSION):
+                    files[name] = os.path.join(root, file)
+
+        imported = 0
+        for name, path in sorted(files.items()):
+            mtime = os.path.getmtime(path)
+            if name in known and (known[name] is None or known[name] == mtime):
+                continue
+            try:
+                article = read_article_file(path)
+            except Exception as e:
+                self.logger.warning(f"读取文章失败，跳过：{path}，{e}")
+                continue
+            if not article.href and hrefs:
+                article.href = hrefs.get(name)
+            self.add(site, name, article, mtime)
+            imported += 1
+        self.logger.info(
+            f"【{site}】导入{imported}篇文章，跳过{len(files) - imported}篇已导入的文章"
+        )
+        return imported
+
+    def search(
+        self, query="", site=None, category=None, date_from=None, date_to=None, limit=20
+    ):
+        """
+        搜索文章，返回[(日期, 站点, 类别, 标题, 链接, 摘要)]。
+        有关键词时按相关度排序（标题权重更高），否则按日期从新到旧排列
+        """
+        terms = query.split()
+        match_terms = [term for term in terms if len(term) >= MIN_MATCH_CHARS]
+        like_terms = [
+            term for term in terms if not self.fts or len(term) < MIN_MATCH_CHARS
+        ]
+        conditions, params = [], []
+        if self.fts and match_terms:
+            source = "articles_fts JOIN articles a ON a.id = articles_fts.rowid"
+            snippet = "snippet(articles_fts, 1, '【', '】', '…', 24)"
+            conditions.append("articles_fts MATCH ?")
+            params.append(
+                " AND ".join('"{}"'.format(term.replace('"', '""')) for term in match_terms)
+            )
+            order = "bm25(articles_fts, 10.0, 1.0)"
+        else:
+            source = "articles a"
+            snippet = "substr(a.body, 1, 60)"
+            order = "a.date DESC, a.name"
+        for term in like_terms:
+            conditions.append("(a.title LIKE ? OR a.body LIKE ?)")
+            params += [f"%{term}%", f"%{term}%"]
+        if site:
+            conditions.append("a.site = ?")
+            params.append(site)
+        if category:
+            conditions.append("a.category LIKE ?")
+            params.append(f"%{category}%")
+        if date_from:
+            conditions.append("a.date >= ?")
+            params.append(date_from)
+        if date_to:
+            conditions.append("a.date <= ?")
+            params.append(date_to)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return self._conn.execute(
+            f"""
+            SELECT a.date, a.site, a.category, a.title, a.href, {snippet}
+            FROM {source} {where}
+            ORDER BY {order}
+            LIMIT ?
+            """,
+            params + [int(limit)],
+        ).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def import_articles(site=None, config_path="config/config.yaml"):
+    config = load_config(config_path)
+    state_folder = get_state_folder(config)
+    root_folder = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), config.get("save_folder", "docx")
+    )
+    store = ArticleStore(state_folder)
+    for item in config.get("news_sites"):
+        name = item.get("name")
+        if site and name != site:
+            continue
+        save_folder = os.path.join(root_folder, name)
+        if not os.path.exists(save_folder):
+            continue
+        index = DownloadIndex(state_folder, name)
+        store.import_folder(name, save_folder, index.hrefs())
+        index.close()
+    store.close()
+
+
+def search_articles(args, config_path="config/config.yaml"):
+    options = {"site": None, "category": None, "from": None, "to": None, "limit": 20}
+    terms = []
+    for arg in args:
+        key, sep, value = arg.partition("=")
+        if sep and key in options:
+            options[key] = value
+        else:
+            terms.append(arg)
+    store = ArticleStore(get_state_folder(load_config(config_path)))
+    rows = store.search(
+        " ".join(terms),
+        site=options["site"],
+        category=options["category"],
+        date_from=options["from"],
+        date_to=options["to"],
+        limit=options["limit"],
+    )
+    for date, site, category, title, href, snippet in rows:
+        print(f"{date} [{site}] {category} | {title}")
+        if href:
+            print(f"    {href}")
+        print(f"    {(snippet or '').replace(chr(10), ' ')}")
+    print(f"共{len(rows)}条结果")
+    store.close()
+
+
+if __name__ == "__main__":
+    args = sys.argv
+    if len(args) < 2 or args[1] not in ["import", "search"]:
+        print(
+            "参数错误, 请传入参数: import [站点名称] 或者 "
+            "search [关键词...] [site=] [category=] [from=] [to=] [limit=]"
+        )
+        sys.exit(1)
+
+    if args[1] == "import":
+        import_articles(args[2] if len(args) > 2 else None)
+    else:
+        search_articles(args[2:])
@@ -0,0 +1,134 @@
+import json
+import os
+import time
+from utils_func import get_state_folder
+from metrics import timed
+
+
+class BackfillPageError(Exception):
+    """列表页获取失败（不是栏目已结束），该栏目的进度不推进，下次运行从该页重试"""
+
+
+class BackfillCheckpoint:
+    """
+    按年份回填的进度，每个栏目记录下一个要抓取的列表页（cursor）和是否已完成，
+    保存在 state/backfill_<站点>_<年份>.json；state_folder为None时不保存
+    """
+
+    def __init__(self, state_folder, site, year):
+        self.path = (
+            os.path.join(state_folder, f"backfill_{site}_{year}.json")
+            if state_folder
+            else None
+        )
+        self.channels = {}
+        if self.path and os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as file:
+                self.channels = json.load(file)
+
+    def get(self, channel):
+        return self.channels.get(channel, {})
+
+    def update(self, channel, **values):
+        self.channels.setdefault(channel, {}).update(values)
+        if not self.path:
+            return
+        temp_file = f"{self.path}.tmp"
+        with open(temp_file, "w", encoding="utf-8") as file:
+            json.dump(self.channels, file, ensure_ascii=False, indent=2)
+        os.replace(temp_file, self.path)
+
+
+class BackfillMixin:
+    """
+    按年份回填，替换 retrieve_paper：逐个列表页抓取，解析出的文章立即下载，
+    每页处理完后保存进度，中断后再次运行从保存的列表页继续。
+    列表按发布时间从新到旧排列，一页的最后一篇早于目标年份时停止翻页。
+    子类需要实现：
+    - backfill_channels(page)：返回[(栏目, 第一页的cursor)]
+    - fetch_backfill_page(page, channel, cursor)：返回(文章列表, 下一页的cursor或None)，
+      栏目已结束时返回([], None)，获取失败时抛出异常（如BackfillPageError）
+    """
+
+    def backfill_label(self, channel):
+        # 日志中显示的栏目名称
+        return channel
+
+    def paper_year(self, paper):
+        # 日期无法解析时返回None
+        date = self.format_date(paper.get("pubtime", ""))
+        return date[:4] if date else None
+
+    @timed("retrieve_paper")
+    def retrieve_paper(self, page=None):
+        try:
+            start_time = time.perf_counter()
+            # 回放时每次从头处理缓存的全部列表页，不读取也不保存进度
+            checkpoint = BackfillCheckpoint(
+                None if self.replay else get_state_folder(self.config),
+                self.source_name,
+                self.year,
+            )
+            new_paper_list = []
+            total = 0
+            completed = True
+            for channel, first_cursor in self.backfill_channels(page):
+                label = self.backfill_label(channel)
+                progress = checkpoint.get(channel)
+                if progress.get("done"):
+                    self.logger.info(f"【回填{self.year}】{label} 已完成，跳过")
+                    continue
+                cursor = progress.get("cursor", first_cursor)
+                if cursor != first_cursor:
+                    self.logger.info(f"【回填{self.year}】{label} 从 {cursor} 继续")
+                # 某一页有文章下载失败后不再推进进度，下次运行从该页重试
+                blocked = False
+                while cursor is not None:
+                    try:
+                        papers, next_cursor = self.fetch_backfill_page(
+                            page, channel, cursor
+                        )
+                    except Exception as e:
+                        # 获取失败计为失败，停止本栏目，下次运行从该页重试
+                        self.logger.error(f"【回填{self.year}】{label} {cursor}：{str(e)}")
+                        blocked = True
+                        break
+                    matched = [p for p in papers if self.paper_year(p) == self.year]
+                    # 本页最后一篇（可解析日期的）已早于目标年份，后面的列表页不用再抓取
+                    years = [year for p in papers if (year := self.paper_year(p))]
+                    if not papers or (years and years[-1] < self.year):
+                        next_cursor = None
+                    new_papers, failed_num = self.process_papers(matched, page)
+                    new_paper_list.extend(new_papers)
+                    total += len(matched)
+                    self.logger.info(
+                        f"【回填{self.year}】{label} {cursor}：{len(matched)}篇，"
+                        f"新增{len(new_papers)}篇，失败{failed_num}篇"
+                    )
+                    # 栏目第一页没有文章，多半是获取失败，不标记为完成
+                    if not papers and cursor == first_cursor:
+                        failed_num += 1
+                    blocked = blocked or failed_num > 0
+                    if not blocked:
+                        checkpoint.update(channel, cursor=next_cursor)
+                    cursor = next_cursor
+                if blocked:
+                    completed = False
+                else:
+                    checkpoint.update(channel, done=True)
+
+            self.log_fetch_rate(time.perf_counter() - start_time)
+            self.log_dedup()
+            if self.page_cache:
+                self.page_cache.report()
+            if completed and checkpoint.path:
+                self.logger.info(
+                    f"【回填{self.year}】全部完成，如需重新回填请删除 {checkpoint.path}"
+                )
+            if self.notify_switch:
+                self.notify(new_paper_list, total)
+            return completed
+
+        except Exception as e:
+            self.logger.error(f"retrieve_paper()运行过程出错：{str(e)}")
+            return False
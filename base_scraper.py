@@ -1,21 +1,39 @@
+import hashlib
 import os
 import re
-from docx import Document
-from docx.shared import Pt, Mm
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.oxml.ns import qn
-import requests
-from utils_func import setup_logging, load_config, mqtt_publish
+import threading
+import time
+from collections import deque
+from contextlib import closing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from utils_func import setup_logging, load_config, get_state_folder, load_replay_from_args
+from notifier import get_notifier
+from download_index import DownloadIndex, canonical_href
+from http_client import HttpFetcher
+from list_cache import ListPageCache
+from html_parser import set_parser_backend
+from output_writers import build_article, get_writers, render_article
+from article_store import ArticleStore
+from page_cache import PageCacheMiss, open_page_cache
+import metrics
+from metrics import timed, observe
 
 
 class BaseScraper:
     # 包括静态属性和方法
+    # 正文去掉空白和标点后少于该字数时不按正文去重，避免“详见附件”之类的短正文误判
+    DEDUP_MIN_CHARS = 50
+
     def __init__(self):
         # 配置日志
         self.logger = setup_logging()
         # 读取配置文件
         config = load_config()
         self.config = config
+        # 各阶段耗时和计数指标，进程退出时写入textfile
+        metrics.configure(config)
+        # HTML解析后端，默认优先使用lxml
+        set_parser_backend(config.get("html_parser", "auto"))
         # 获取配置文件中的新闻站点
         for news_site in config.get("news_sites"):
             if news_site.get("name") == self.source_name:
@@ -34,137 +52,438 @@ class BaseScraper:
             self.source_name,
         )
         self.playwright_timeout = int(config.get("playwright_timeout", 2)) * 60000
+        # 回放模式（--from-cache）：页面从原始页面缓存读取，文章重新生成到replay_folder，
+        # 不使用也不修改已下载文章索引、文章库、列表页缓存和回填进度，不发送通知
+        self.replay = load_replay_from_args()
+        if self.replay:
+            self.save_folder = os.path.join(
+                os.path.dirname(os.path.abspath(__file__)),
+                config.get("replay_folder", "docx_replay"),
+                self.source_name,
+            )
+            self.notify_switch = False
+            self.logger.info(f"回放模式：从原始页面缓存读取页面，文章写入 {self.save_folder}")
+        # 文章的输出格式：docx、md、txt、jsonl，可以同时输出多种
+        self.output_formats = config.get("output_formats", ["docx"])
+        get_writers(self.output_formats)
+        # 渲染进程数，大于1时抓取线程只提取结构化段落，由进程池生成文件；
+        # 等待渲染的文章超过render_queue篇时暂停提交，抓取也随之暂停
+        self.render_workers = int(config.get("render_workers", 2))
+        self.render_queue = max(1, int(config.get("render_queue", self.render_workers * 4)))
+        self._render_executor = None
+        self._renders = deque()
+        self._render_lock = threading.Lock()
         os.makedirs(self.save_folder, exist_ok=True)
+        # 已下载文章索引，每次运行加载一次；新安装时从磁盘重建
+        state_folder = get_state_folder(config)
+        self.download_index = DownloadIndex(
+            None if self.replay else state_folder, self.source_name
+        )
+        if len(self.download_index) == 0 and not self.replay:
+            self.download_index.rebuild(self.save_folder)
+        # 文章库，写入文章时同时加入全文索引；回放生成的文章不写入，以免覆盖已有的记录
+        self.article_store = (
+            ArticleStore(state_folder)
+            if config.get("article_store", True) and not self.replay
+            else None
+        )
+        # 列表页缓存，列表没有变化时跳过解析
+        self.list_cache = ListPageCache(
+            state_folder,
+            self.source_name,
+            config.get("list_cache", True) and not self.replay,
+        )
+        # 原始页面缓存，保存抓取到的响应，修改正文提取规则后可以回放重新生成文章
+        self.page_cache = open_page_cache(config, self.source_name, self.replay)
 
+        # 共享连接池的HTTP客户端，并发抓取文章的线程数，每个主机的并发上限、速率和重试
+        self.fetch_workers = int(config.get("fetch_workers", 4))
+        self.http = HttpFetcher(
+            pool_size=max(self.fetch_workers, 1) * 2,
+            per_host_limit=int(config.get("per_host_limit", 4)),
+            timeout=int(config.get("http_timeout", 30)),
+            rate=float(config.get("rate_limit", 5)),
+            max_retries=int(config.get("http_retries", 3)),
+            retry_budget=float(config.get("retry_budget", 0.2)),
+        )
+        self.pages_fetched = 0
+        self._pages_lock = threading.Lock()
+        # 重复文章去重：链接相同的不再抓取，正文相同的不再生成docx，只记录为别名
+        self.dedup = config.get("dedup", True)
+        self.dedup_fetches = 0
+        self.dedup_docx = 0
+        self.dedup_bytes = 0
+
+    @timed("retrieve_paper")
     def retrieve_paper(self, page=None):
-        # page参数是可选的，如果传入，表示使用的是playwright获取页面内容
+        # page参数是可选的，如果传入，表示使用的是playwright获取页面内容（页面或页面池）
         # 如果不传入，则使用requests获取页面内容
         # get_paper_list方法和get_paper_info方法需要实现，具体实现由子类实现
         try:
-            paper_list = self.get_paper_list(page) if page else self.get_paper_list()
+            start_time = time.perf_counter()
+            with observe("get_paper_list", self.source_name):
+                paper_list = self.get_paper_list(page) if page else self.get_paper_list()
             if not paper_list:
+                list_urls = self.url if isinstance(self.url, list) else [self.url]
+                # 所有列表页都没有变化时才算成功，有列表页获取失败时仍按出错处理
+                if self.list_cache.skipped >= len(list_urls):
+                    self.logger.info(f"【{self.source_name_cn}】列表页没有变化，跳过。")
+                    self.list_cache.report()
+                    return True
                 self.logger.error("错误：没有找到任何文章，请等待下一次尝试。")
                 return False
 
-            new_paper_list = []
-            tujie_num = 0
-            for paper in paper_list:
+            new_paper_list, failed_num = self.process_papers(paper_list, page)
+            # 全部文章处理成功后才更新列表页缓存，失败的文章下次运行时重试
+            if failed_num == 0:
+                self.list_cache.commit()
+            self.list_cache.report()
+            self.log_fetch_rate(time.perf_counter() - start_time)
+            self.log_dedup()
+            if self.page_cache:
+                self.page_cache.report()
+            if self.notify_switch:
+                self.notify(new_paper_list, len(paper_list))
+            return True
+
+        except Exception as e:
+            self.logger.error(f"retrieve_paper()运行过程出错：{str(e)}")
+            return False
+
+    def process_papers(self, paper_list, page=None):
+        """下载列表中未下载的文章和相关文件，返回(新增的文章列表, 失败的数量)"""
+        pending_papers = []
+        tujie_num = 0
+        for paper in paper_list:
+            category, title = paper["category"], paper["title"]
+            if category == "政策解读库" and title.startswith("图解"):
+                self.logger.debug(f"【跳过图解】[{category}] {paper['pubtime']} {title} ...")
+                tujie_num += 1
+                continue
+            pending_papers.append((paper, self.get_name_pure(paper)))
+
+        # 下载正文：并发抓取，按列表顺序写入docx
+        # 链接已下载过的文章（其他栏目或改了标题）不再抓取；
+        # 本次列表中链接重复的，等第一篇写入后再记为别名
+        article_papers = []
+        batch_aliases = []
+        batch_hrefs = {}
+        dedup_docx = self.dedup_docx
+        skipped_num = tujie_num
+        for paper, name_pure in pending_papers:
+            file_name = f"{name_pure}.docx"
+            if self.is_downloaded(file_name):
+                skipped_num += 1
+                continue
+            if self.dedup:
+                original = self.download_index.find_href(paper["href"])
+                if original:
+                    self.record_alias(file_name, original, paper["href"])
+                    continue
+                canonical = canonical_href(paper["href"])
+                if canonical in batch_hrefs:
+                    batch_aliases.append(
+                        (file_name, batch_hrefs[canonical], paper["href"], None, False)
+                    )
+                    continue
+                batch_hrefs[canonical] = file_name
+            article_papers.append((paper, name_pure))
+        failed_num = 0
+        # 已提交渲染的文章，渲染完成后才写入索引；正文相同的等第一篇写入后再记为别名
+        rendering = {}
+        rendering_hashes = {}
+        # 抓取结果是生成器，提前结束时关闭生成器，以便关闭抓取线程池
+        with closing(
+            self.fetch_paper_infos([paper["href"] for paper, _ in article_papers], page)
+        ) as articles:
+            for (paper, name_pure), fetched in zip(article_papers, articles):
+                file_name = f"{name_pure}.docx"
+                if not fetched:
+                    failed_num += 1
+                    continue
+                if self.is_downloaded(file_name) or file_name in rendering:
+                    continue
                 category, title, datetime, href = (
                     paper["category"],
                     paper["title"],
                     paper["pubtime"],
                     paper["href"],
                 )
-
-                if category == "政策解读库" and title.startswith("图解"):
-                    self.logger.debug(
-                        f"【跳过图解】[{category}] {datetime} {title} ..."
+                paragraphs, body_hash = fetched
+                body_hash = body_hash if self.dedup else None
+                original = self.download_index.find_body(body_hash)
+                if original:
+                    self.record_alias(file_name, original, href, body_hash, fetched=True)
+                    continue
+                if body_hash in rendering_hashes:
+                    batch_aliases.append(
+                        (file_name, rendering_hashes[body_hash], href, body_hash, True)
                     )
-                    tujie_num += 1
                     continue
+                self.logger.info(f"【正在处理】[{category}] {datetime} {title} ...")
+                self.save_article(
+                    file_name, title, category, datetime, paragraphs, href, body_hash
+                )
+                rendering[file_name] = paper
+                if body_hash:
+                    rendering_hashes[body_hash] = file_name
+        self.wait_renders()
+        new_paper_list = [
+            paper for file_name, paper in rendering.items() if self.is_downloaded(file_name)
+        ]
+        failed_num += len(rendering) - len(new_paper_list)
+        # 第一篇写入失败时不记录别名，下次运行重新抓取
+        for file_name, original, href, body_hash, fetched in batch_aliases:
+            if self.is_downloaded(original):
+                self.record_alias(file_name, original, href, body_hash, fetched)
 
-                # 处理文件名，去除特殊字符（'/ \ : * ? " < > |'），替换为下划线
-                name_pure = re.sub(
-                    r"[\/\\\:\*\?\"\<\>\|]",
-                    "_",
-                    f"{category}-{self.format_date(datetime)}-{title}",
+        # 下载附件
+        attachement_tasks = []
+        for paper, name_pure in pending_papers:
+            # 使用下划线，确保排序时.在_之前
+            file_name_attachement = f"{name_pure}_相关文件.docx"
+            if "政策解读库" in file_name_attachement and not self.is_downloaded(
+                file_name_attachement
+            ):
+                href_attachement = paper.get("href_attachement")
+                original = (
+                    self.download_index.find_href(href_attachement)
+                    if self.dedup and href_attachement
+                    else None
                 )
-                # 下载正文
-                file_name = f"{name_pure}.docx"
-                if not self.is_downloaded(file_name):
-                    self.logger.info(f"【正在处理】[{category}] {datetime} {title} ...")
-                    p_elements = (
-                        self.get_paper_info(href, page)
-                        if page
-                        else self.get_paper_info(href)
+                if original:
+                    self.record_alias(file_name_attachement, original, href_attachement)
+                elif href_attachement:
+                    category, title, datetime = (
+                        paper["category"],
+                        paper["title"],
+                        paper["pubtime"],
+                    )
+                    self.logger.info(
+                        f"【正在处理】[{category}] {datetime} {title} 相关文件 ..."
                     )
+                    attachement_tasks.append(
+                        (href_attachement, file_name_attachement, category, datetime)
+                    )
+        self.retrieve_attachements(attachement_tasks, page)
+        self.wait_renders()
+        failed_num += sum(not self.is_downloaded(task[1]) for task in attachement_tasks)
+        if tujie_num > 0:
+            self.logger.info(f"【跳过图解】{tujie_num}篇")
+        for result, count in (
+            ("new", len(new_paper_list)),
+            ("skipped", skipped_num),
+            ("duplicate", self.dedup_docx - dedup_docx),
+            ("failed", failed_num),
+        ):
+            metrics.ARTICLES.inc(count, site=self.source_name, result=result)
+        return new_paper_list, failed_num
 
-                    if p_elements:
-                        self.create_docx(
-                            file_name, title, category, datetime, p_elements
-                        )
-                        new_paper_list.append(paper)
-
-                # 下载附件
-                # 使用下划线，确保排序时.在_之前
-                file_name_attachement = f"{name_pure}_相关文件.docx"
-                if "政策解读库" in file_name_attachement and not self.is_downloaded(
-                    file_name_attachement
-                ):
-                    href_attachement = paper.get("href_attachement")
-                    if href_attachement:
-                        self.logger.info(
-                            f"【正在处理】[{category}] {datetime} {title} 相关文件 ..."
-                        )
-                        # 下面的函数在browser子类中定义
-                        self.retrieve_attachement(
-                            page,
-                            href_attachement,
-                            file_name_attachement,
-                            category,
-                            datetime,
-                        )
-            if tujie_num > 0:
-                self.logger.info(f"【跳过图解】{tujie_num}篇")
-            if self.notify_switch:
-                self.notify(new_paper_list, len(paper_list))
-            return True
+    def get_name_pure(self, paper):
+        # 处理文件名，去除特殊字符（'/ \ : * ? " < > |'），替换为下划线
+        return re.sub(
+            r"[\/\\\:\*\?\"\<\>\|]",
+            "_",
+            f"{paper['category']}-{self.format_date(paper['pubtime'])}-{paper['title']}",
+        )
+
+    def fetch_paper_infos(self, hrefs, page=None):
+        """
+        按hrefs的顺序依次返回每篇文章的(结构化段落, 正文哈希)，抓取失败时为None。
+        使用playwright时页面不能跨线程共享，逐篇抓取；使用requests时用线程池并发抓取，
+        结果仍按原顺序返回，保证docx写入顺序确定
+        """
+        if page:
+            return (self.fetch_article(href, page) for href in hrefs)
+        if self.fetch_workers <= 1 or len(hrefs) <= 1:
+            return (self.fetch_article(href) for href in hrefs)
+        executor = ThreadPoolExecutor(max_workers=self.fetch_workers)
+        return self._map_and_shutdown(
+            executor, self.fetch_article, hrefs, self.fetch_workers * 2
+        )
 
+    def fetch_article(self, href, page=None):
+        """
+        抓取一篇文章并在抓取线程中提取段落和正文哈希，返回后页面的soup即可释放，
+        不把BeautifulSoup对象传给写入和渲染
+        """
+        try:
+            p_elements = (
+                self.get_paper_info(href, page) if page else self.get_paper_info(href)
+            )
+            if not p_elements:
+                return None
+            paragraphs = self.extract_paragraphs(p_elements)
+            return paragraphs, self.body_hash(paragraphs)
         except Exception as e:
-            self.logger.error(f"retrieve_paper()运行过程出错：{str(e)}")
-            return False
+            # 单篇文章出错计为失败，不影响同一批的其他文章
+            self.logger.error(f"fetch_article()运行过程出错：{str(e)}，链接：{href}")
+            return None
 
-    def is_downloaded(self, file_name):
-        return any(file_name in files for _, _, files in os.walk(self.save_folder))
+    def retrieve_attachements(self, attachement_tasks, page=None):
+        # 逐个下载附件，子类可以改为并行
+        for task in attachement_tasks:
+            # 下面的函数在browser子类中定义
+            self.retrieve_attachement(page, *task)
 
     @staticmethod
-    def set_page_to_a4(doc):
-        for section in doc.sections:
-            section.page_height = Mm(297)
-            section.page_width = Mm(210)
+    def _map_and_shutdown(executor, func, items, window):
+        # 按顺序返回结果，最多提前提交window个任务，写入变慢时抓取也随之暂停
+        futures = deque()
+        try:
+            for item in items:
+                futures.append(executor.submit(func, item))
+                if len(futures) >= window:
+                    yield futures.popleft().result()
+            while futures:
+                yield futures.popleft().result()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def fetch_response(self, url, headers=None):
+        """
+        用requests获取页面，状态码为200的响应写入原始页面缓存；
+        回放时从缓存读取，缓存中没有时抛出PageCacheMiss
+        """
+        if self.replay:
+            response = self.page_cache.get(url)
+            if response is None:
+                raise PageCacheMiss(f"原始页面缓存中没有该页面：{url}")
+            return response
+        response = self.http.get(url, headers=headers or {})
+        self.cache_page(url, response.status_code, response.headers, response.content)
+        return response
 
-    def extract_and_write_title(self, doc, title, category, datetime):
-        self.format_title(doc, category, "楷体", WD_ALIGN_PARAGRAPH.LEFT)
-        self.format_title(doc, title, "黑体", WD_ALIGN_PARAGRAPH.CENTER, Pt(16))
-        self.format_title(doc, datetime, "黑体", WD_ALIGN_PARAGRAPH.CENTER)
+    def cache_page(self, url, status_code, headers, content):
+        if self.page_cache and not self.replay:
+            self.page_cache.put(url, status_code, headers, content)
 
-    @staticmethod
-    def format_title(doc, text, font_name, alignment, font_size=None):
-        paragraph = doc.add_paragraph()
-        paragraph.alignment = alignment
-        run = paragraph.add_run(text)
-        run.font.name = font_name
-        run._element.rPr.rFonts.set(qn("w:eastAsia"), font_name)
-        if font_size:
-            run.font.size = font_size
+    def close(self):
+        # 关闭连接池、渲染进程池和原始页面缓存
+        self.http.close()
+        self.wait_renders()
+        if self._render_executor:
+            self._render_executor.shutdown()
+            self._render_executor = None
+        if self.page_cache:
+            self.page_cache.close()
 
-    @staticmethod
-    def format_paragraph(doc):
-        paragraph = doc.add_paragraph()
-        paragraph.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY  # 设置两端对齐
-        paragraph.paragraph_format.first_line_indent = Pt(11 * 2)
-        return paragraph
+    def count_page(self):
+        # 记录抓取的页面数量，用于统计抓取速度
+        with self._pages_lock:
+            self.pages_fetched += 1
 
-    @staticmethod
-    def format_paragraph_font(paragraph):
-        run = paragraph.add_run()
-        run.font.name = "宋体"
-        run._element.rPr.rFonts.set(qn("w:eastAsia"), "宋体")
-        return run
-
-    def create_docx(self, file_name, title, category, datetime, p_elements):
-        doc = Document()  # 创建一个新的Word文档
-        self.set_page_to_a4(doc)  # 设置页面大小为A4
-        self.extract_and_write_title(doc, title, category, datetime)
-        self.extract_and_write_paragraphs(doc, p_elements)
-        doc_path = os.path.join(self.save_folder, file_name)
-        doc.save(doc_path)
-        self.change_file_owner(doc_path)
+    def log_fetch_rate(self, elapsed):
+        if self.pages_fetched and elapsed > 0:
+            self.logger.info(
+                f"【{self.source_name_cn}】抓取{self.pages_fetched}个页面，"
+                f"耗时{elapsed:.1f}秒，{self.pages_fetched / elapsed:.2f}页/秒"
+            )
+
+    @timed("is_downloaded")
+    def is_downloaded(self, file_name):
+        return self.download_index.contains(file_name)
+
+    def body_hash(self, paragraphs):
+        """
+        正文去掉空白和标点后的哈希，排版或标点略有不同的相同正文得到相同的值。
+        paragraphs为extract_paragraphs的结果，与写入文件的正文一致（不包括提取时去掉的段落）
+        """
+        text = "".join(paragraph.text for paragraph in paragraphs)
+        text = re.sub(r"[\W_]+", "", text)
+        if len(text) < self.DEDUP_MIN_CHARS:
+            return None
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def record_alias(self, file_name, original, href, body_hash=None, fetched=False):
+        # 重复文章记为已下载文章的别名，不生成docx
+        self.download_index.add_alias(file_name, original, href, body_hash)
+        if not fetched:
+            self.dedup_fetches += 1
+        self.dedup_docx += 1
+        self.dedup_bytes += self.download_index.size_of(original)
+        self.logger.info(f"【重复文章】{file_name} 与 {original} 相同，跳过")
+
+    def log_dedup(self):
+        if self.dedup_docx:
+            self.logger.info(
+                f"【{self.source_name_cn}】重复文章{self.dedup_docx}篇，"
+                f"少抓取{self.dedup_fetches}个页面，"
+                f"少写入docx约{self.dedup_bytes / 1024:.0f}KB"
+            )
+
+    @timed("save_article")
+    def save_article(
+        self, file_name, title, category, datetime, paragraphs, href=None, body_hash=None
+    ):
+        """
+        整理为结构化数据，按配置的输出格式写入文件；paragraphs为extract_paragraphs的结果。
+        render_workers大于1时提交到渲染进程池后立即返回，写入完成后才记入索引，
+        调用wait_renders等待全部完成
+        """
+        article = build_article(title, category, datetime, paragraphs, href)
+        path_base = os.path.join(self.save_folder, os.path.splitext(file_name)[0])
+        task = (file_name, article, href, body_hash)
+        if self.render_workers <= 1:
+            try:
+                results = render_article(article, path_base, self.output_formats)
+            except Exception as e:
+                self.logger.error(f"写入文章失败：{file_name}，{e}")
+                return
+            self._finish_render(task, results)
+            return
+
+        with self._render_lock:
+            if self._render_executor is None:
+                self._render_executor = ProcessPoolExecutor(max_workers=self.render_workers)
+            future = self._render_executor.submit(
+                render_article, article, path_base, self.output_formats
+            )
+            self._renders.append((task, future))
+            # 等待渲染的文章过多时先完成最早提交的，限制内存中的文章数量
+            while len(self._renders) > self.render_queue:
+                self._collect_render(*self._renders.popleft())
+
+    def wait_renders(self):
+        # 等待已提交的文章全部写入，按提交顺序更新索引
+        with self._render_lock:
+            while self._renders:
+                self._collect_render(*self._renders.popleft())
+
+    def _collect_render(self, task, future):
+        try:
+            results = future.result()
+        except Exception as e:
+            self.logger.error(f"写入文章失败：{task[0]}，{e}")
+            return
+        self._finish_render(task, results)
+
+    def _finish_render(self, task, results):
+        # 在主进程中更改所有者、记录耗时，记入索引和文章库；索引中记录docx的文件名
+        file_name, article, href, body_hash = task
+        size = 0
+        for path, file_size, seconds in results:
+            metrics.STAGE_SECONDS.observe(
+                seconds, stage=f"write_{os.path.splitext(path)[1][1:]}", site=self.source_name
+            )
+            self.change_file_owner(path)
+            size += file_size
+        self.download_index.add(file_name, href, body_hash=body_hash, size=size)
+        if self.article_store:
+            try:
+                self.article_store.add(self.source_name, file_name, article)
+            except Exception as e:
+                self.logger.warning(f"文章加入文章库失败：{file_name}，{e}")
+
+    def list_fingerprint(self, soup):
+        # 列表页中文章列表所在区域的HTML，用于判断列表是否有变化，由子类实现
+        return None
 
     def format_date(self, date_time):
         match = re.search(r"^(\d{4}-\d{2}-\d{2})", date_time)
         return match.group(1) if match else None
 
+    @timed("notify")
     def notify(self, new_paper_list, total):
         # 发送通知函数，利用requests库发送http post把payload发送到webhook地址http://192.168.1.2:1880/scraper-news
         # 这里的payload可以包含新闻的标题、链接、发布时间、分类等信息
@@ -185,14 +504,13 @@ class BaseScraper:
             ),
         }
         payload = {"notify": ha_notify}
+        # 消息写入队列后由后台线程发送，不阻塞爬取
+        notifier = get_notifier(self.config)
         if self.webhook_url:
-            # requests不需要等待返回，用子进程直接发送
+            notifier.webhook(self.webhook_url, payload)
 
-            self.logger.info(f"发送消息到webhook: {self.webhook_url}")
-            requests.post(self.webhook_url, json=payload)
-        
-        # mqtt更新drive内容
-        mqtt_publish(payload="update-drive")
+        # mqtt更新drive内容，多个站点的更新消息合并为一条
+        notifier.mqtt("update-drive")
 
     def change_file_owner(self, file_path):
         """
@@ -207,9 +525,9 @@ class BaseScraper:
 
     # ------------------------------------------------------- #
     # 子类需要实现的抽象方法，为了防止子类未实现，这里会raise NotImplementedError
-    def extract_and_write_paragraphs(self, doc, p_elements):
-        # 必须在子类中实现
-        raise NotImplementedError("子类必须实现extract_and_write_paragraphs方法")
+    def extract_paragraphs(self, p_elements):
+        # 返回[article_model.Paragraph]，只包含字符串，必须在子类中实现
+        raise NotImplementedError("子类必须实现extract_paragraphs方法")
 
     def get_paper_info(self, href, page=None):
         # 必须在子类中实现
@@ -0,0 +1,978 @@
+import json
+import multiprocessing
+import os
+import re
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ProcessPoolExecutor
+from statistics import mean, quantiles
+from urllib.parse import quote, unquote, urljoin
+from bs4 import BeautifulSoup
+from docx import Document
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.oxml.ns import qn
+from docx.shared import Pt, Mm
+import requests
+import yaml
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from archive_docx import DocxArchiver
+from article_model import Paper
+from browser_hubeigov import HubeigovScraper, PAGE_STRAINER
+from browser_pool import PagePool
+from browser_renmin import RenminScraper
+from browser_renmin_jp import RenminJpScraper
+from html_parser import decode_content, make_soup, get_parser_backend
+from docx_merge import merge_docx_stream
+from output_writers import build_article, DocxWriter, JsonlWriter, STRUCTURED_EXTENSION
+from utils_func import load_config, setup_logging
+
+# 调用时传入参数:
+#   record [站点名称]  从线上录制列表页、文章页和相关文件页到 bench_fixtures
+#   parse             对比旧的解析方式（html.parser两次解析）和当前解析后端的速度和提取结果
+#   lists             对比旧的列表页解析和按规则单次遍历的解析速度，检查提取的文章完全相同
+#   docx              对比旧的docx生成方式（默认模板、逐个run设置字体）、模板方式、jsonl
+#                     以及合并时由jsonl转换为docx的速度和文件大小
+#   memory [篇数]     模拟按年份回填（默认2000篇，每页20篇），对比保留soup的旧方式和紧凑文章模型的内存峰值
+#   run [阈值]        通过本地替身服务器回放录制的页面，分阶段统计耗时分位数和内存峰值，
+#                     与基线相比退化超过阈值（默认0.2，即20%）时返回非0
+#   baseline          运行一次并保存为基线
+
+FIXTURE_FOLDER = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "bench_fixtures"
+)
+SCRAPERS = {
+    "renmin": RenminScraper,
+    "renmin_jp": RenminJpScraper,
+    "hubeigov": HubeigovScraper,
+}
+# 每个列表页录制的文章数量
+RECORD_ARTICLES = 5
+# parse基准中每个页面重复解析的次数
+PARSE_REPEAT = 20
+# lists基准中每个列表页重复解析的次数，没有录制的列表页时示例页面的文章数
+LIST_REPEAT = 200
+LIST_ITEMS = 60
+# docx基准中每篇文章重复生成的次数
+DOCX_REPEAT = 10
+# 没有录制的文章页时，docx基准使用的示例段落数量
+SAMPLE_PARAGRAPHS = 30
+# docx基准中文章的类别、标题和日期
+DOCX_CATEGORY, DOCX_TITLE, DOCX_DATE = "要闻", "标题", "2024-01-01"
+# memory基准模拟回填的文章数和每个列表页的文章数
+MEMORY_ARTICLES = 2000
+MEMORY_PAGE_SIZE = 20
+# run基准的轮数，每轮完整运行一次所有阶段
+RUN_ROUNDS = 3
+BASELINE_FILE = os.path.join(FIXTURE_FOLDER, "baseline.json")
+# 回放时不能照搬的响应头：录制的内容已经解压
+SKIP_REPLAY_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+logger = setup_logging()
+
+
+def save_fixture(site, kind, index, url, response):
+    folder = os.path.join(FIXTURE_FOLDER, site)
+    os.makedirs(folder, exist_ok=True)
+    name = f"{kind}_{index:03d}"
+    with open(os.path.join(folder, f"{name}.html"), "wb") as file:
+        file.write(response.content)
+    with open(os.path.join(folder, f"{name}.json"), "w", encoding="utf-8") as file:
+        json.dump(
+            {"url": url, "headers": dict(response.headers)},
+            file,
+            ensure_ascii=False,
+            indent=2,
+        )
+
+
+def load_fixtures(site, kind=None):
+    """返回[(kind, url, headers, content)]，按文件名排序"""
+    folder = os.path.join(FIXTURE_FOLDER, site)
+    if not os.path.exists(folder):
+        return []
+    fixtures = []
+    for name in sorted(os.listdir(folder)):
+        if not name.endswith(".json"):
+            continue
+        fixture_kind = name.rsplit("_", 1)[0]
+        if kind and fixture_kind != kind:
+            continue
+        with open(os.path.join(folder, name), "r", encoding="utf-8") as file:
+            meta = json.load(file)
+        with open(os.path.join(folder, name.replace(".json", ".html")), "rb") as file:
+            content = file.read()
+        fixtures.append((fixture_kind, meta["url"], meta["headers"], content))
+    return fixtures
+
+
+def record(site=None):
+    """用HTTP录制页面，需要浏览器渲染的页面不会被录制"""
+    for name, scraper_class in SCRAPERS.items():
+        if site and name != site:
+            continue
+        scraper = scraper_class()
+        urls = scraper.url if isinstance(scraper.url, list) else [scraper.url]
+        article_index = attachement_index = 0
+        for list_index, url in enumerate(urls):
+            response = scraper.http.get(url)
+            save_fixture(name, "list", list_index, url, response)
+            soup = make_soup(decode_content(response.headers, response.content))
+            if name == "hubeigov":
+                paper_list = scraper.parse_paper_list(soup, url)
+            else:
+                paper_list = scraper.parse_paper_list(
+                    soup, scraper.parse_categories(soup)
+                )
+            for paper in paper_list[:RECORD_ARTICLES]:
+                href = paper["href"]
+                save_fixture(
+                    name, "article", article_index, href, scraper.http.get(href)
+                )
+                article_index += 1
+                if href_attachement := paper.get("href_attachement"):
+                    save_fixture(
+                        name,
+                        "attachement",
+                        attachement_index,
+                        href_attachement,
+                        scraper.http.get(href_attachement),
+                    )
+                    attachement_index += 1
+        logger.info(f"【{name}】录制完成：{len(urls)}个列表页，{article_index}篇文章")
+
+
+def new_scraper(site):
+    """创建不读取配置、不联网的爬虫实例，只用于解析"""
+    scraper = object.__new__(SCRAPERS[site])
+    scraper.logger = logger
+    scraper.source_name = site
+    scraper.base_url = "http://localhost/"
+    return scraper
+
+
+def legacy_soup(site, headers, content):
+    """旧的解析方式：html.parser解析完整页面，人民网先解析一次查找编码，再重新解析"""
+    response = requests.Response()
+    response._content = content
+    response.headers = CaseInsensitiveDict(headers)
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    if site == "hubeigov":
+        return BeautifulSoup(content.decode("utf-8", errors="replace"), "html.parser")
+    soup = BeautifulSoup(response.text, "html.parser")
+    meta_tag = soup.find("meta", attrs={"http-equiv": "content-type"})
+    if meta_tag and "content" in meta_tag.attrs:
+        meta_content = meta_tag["content"]
+        charset = (
+            meta_content.split("charset=")[-1] if "charset=" in meta_content else None
+        )
+        if charset:
+            response.encoding = charset
+    return BeautifulSoup(response.text, "html.parser")
+
+
+def current_soup(site, kind, headers, content):
+    scraper_class = SCRAPERS[site]
+    if site == "hubeigov":
+        strainer = PAGE_STRAINER
+    elif kind == "list":
+        strainer = scraper_class.LIST_STRAINER
+    else:
+        strainer = scraper_class.ARTICLE_STRAINER
+    return make_soup(decode_content(headers, content), strainer)
+
+
+def extract(site, kind, url, soup):
+    """提取结果：列表页为文章字典列表，文章页为各段落的run文本和加粗信息"""
+    scraper = new_scraper(site)
+    if kind == "list":
+        if site == "hubeigov":
+            return scraper.parse_paper_list(soup, url)
+        return scraper.parse_paper_list(soup, scraper.parse_categories(soup))
+    if kind == "attachement":
+        title, p_elements = scraper.parse_attachement_info(soup)
+    else:
+        title, p_elements = "", scraper.parse_paper_info(soup)
+    return title, scraper.extract_paragraphs(p_elements)
+
+
+def time_parse(func, repeat=PARSE_REPEAT):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return mean(durations)
+
+
+def bench_parse():
+    """对比解析速度，并检查两种方式提取出的内容完全相同"""
+    mismatches = 0
+    print(f"解析后端：{get_parser_backend()}")
+    print(f"{'站点':<10}{'类型':<12}{'页面数':>6}{'旧(ms)':>10}{'新(ms)':>10}{'加速':>8}")
+    for site in SCRAPERS:
+        for kind in ("list", "article", "attachement"):
+            fixtures = load_fixtures(site, kind)
+            if not fixtures:
+                continue
+            legacy_times, current_times = [], []
+            for _, url, headers, content in fixtures:
+                legacy = extract(site, kind, url, legacy_soup(site, headers, content))
+                current = extract(
+                    site, kind, url, current_soup(site, kind, headers, content)
+                )
+                if legacy != current:
+                    mismatches += 1
+                    logger.error(f"【{site}】提取结果不一致：{url}")
+                legacy_times.append(
+                    time_parse(lambda: legacy_soup(site, headers, content))
+                )
+                current_times.append(
+                    time_parse(lambda: current_soup(site, kind, headers, content))
+                )
+            old_ms, new_ms = mean(legacy_times) * 1000, mean(current_times) * 1000
+            print(
+                f"{site:<10}{kind:<12}{len(fixtures):>6}{old_ms:>10.2f}"
+                f"{new_ms:>10.2f}{old_ms / new_ms:>7.1f}x"
+            )
+    if mismatches:
+        logger.error(f"{mismatches}个页面的提取结果不一致")
+    return mismatches == 0
+
+
+def legacy_hubeigov_list(soup, url):
+    """旧的湖北列表解析：每个条目中重复调用div_main.find_all("li")"""
+    category = soup.find("div", class_="hbgov-index-bar").find("a").get_text()
+    div_main = soup.find("div", class_="hbgov-bfc-block")
+    if not div_main:
+        return []
+    paper_list = []
+    list_elements = div_main.find_all("li") or div_main.find_all("div", class_="right")
+    for element in list_elements:
+        pubtime = (
+            element.find("span" if div_main.find_all("li") else "div").get_text()
+            if element.find("span" if div_main.find_all("li") else "div")
+            else ""
+        )
+        a_tags = element.find_all("a")
+        if not a_tags:
+            continue
+        href_attachement = a_tags[1]["href"] if len(a_tags) >= 2 else None
+        href = urljoin(url, a_tags[0]["href"])
+        paper_list.append(
+            Paper(category, pubtime, href, a_tags[0].get_text(), href_attachement)
+        )
+    return paper_list
+
+
+def legacy_renmin_list(soup, category_list, base_url):
+    """旧的人民网列表解析：每个li分别调用find查找日期和链接"""
+    div_items = soup.find("div", class_="leftItem").find_all("div", class_="item")
+    paper_list = []
+    for i, item in enumerate(div_items):
+        category = category_list[i] if i < len(category_list) else "Unknown"
+        for li in item.find_all("li"):
+            if i_tag := li.find("i"):
+                pubtime = i_tag.text.strip()
+            else:
+                pubtime = re.search(r"\d{4}-\d{2}-\d{2}", li.get_text()).group()
+            a_tag = li.find("a")
+            title = a_tag.text.strip().replace(f"（{category}）", "") if a_tag else ""
+            href = urljoin(base_url, a_tag["href"]) if a_tag else ""
+            paper_list.append(Paper(category, pubtime, href, title))
+    return paper_list
+
+
+def legacy_renmin_jp_list(soup, category, base_url):
+    """旧的人民网日本版列表解析"""
+    div_main = soup.find("div", class_="left fl")
+    paper_list = []
+    for div_item in div_main.find_all("div", class_="list clearfix"):
+        title = div_item.find("h3", class_="tit").text.strip()
+        span_tag = div_item.find("span", class_="time").text.strip()
+        pubtime = re.search(r"\d{4}-\d{2}-\d{2}", span_tag).group()
+        href = urljoin(base_url, div_item.find("a").attrs["href"])
+        paper_list.append(Paper(category, pubtime, href, title))
+    return paper_list
+
+
+def legacy_list(site, url, soup):
+    scraper = new_scraper(site)
+    if site == "hubeigov":
+        return legacy_hubeigov_list(soup, url)
+    if site == "renmin":
+        return legacy_renmin_list(soup, scraper.parse_categories(soup), scraper.base_url)
+    return legacy_renmin_jp_list(soup, scraper.parse_categories(soup), scraper.base_url)
+
+
+def sample_list_pages(site, items=LIST_ITEMS):
+    """没有录制的列表页时使用的示例页面[(地址, 响应头, 内容)]，包含附件、缺少日期标签等情况"""
+    headers = {"Content-Type": "text/html; charset=utf-8"}
+    url = f"http://localhost/{site}/index.html"
+    if site == "hubeigov":
+        li_items = "".join(
+            f'<li><a href="./t{index}.shtml">湖北新闻{index}</a>'
+            + (f'<a href="/zfwj/f{index}.shtml">相关文件</a>' if index % 3 == 0 else "")
+            + f"<span>2025-03-{index % 28 + 1:02d}</span></li>"
+            for index in range(items)
+        )
+        div_items = "".join(
+            f'<div class="right"><a href="./d{index}.shtml">发布会{index}</a>'
+            f"<div>2025-04-{index % 28 + 1:02d}</div></div>"
+            for index in range(items)
+        )
+        pages = []
+        for body in (f"<ul>{li_items}</ul>", div_items):
+            content = (
+                '<html><body><div class="hbgov-index-bar"><a>政务评论</a></div>'
+                f'<div class="hbgov-bfc-block">{body}</div></body></html>'
+            )
+            pages.append((url, headers, content.encode()))
+        return pages
+    if site == "renmin":
+        categories = ("人民观点", "人民时评", "人民论坛")
+        header = "".join(f'<span><a href="#">{name}</a></span>' for name in categories)
+        blocks = "".join(
+            '<div class="item"><ul>'
+            + "".join(
+                f'<li><a href="/n1/2025/{index}.html">评论{index}（{name}）</a>'
+                + (f"<i>2025-05-{index % 28 + 1:02d}</i>" if index % 5 else " 2025-05-01")
+                + "</li>"
+                for index in range(items // len(categories))
+            )
+            + "</ul></div>"
+            for name in categories
+        )
+        content = (
+            f'<html><body><div class="header"><div class="item">{header}</div></div>'
+            f'<div class="leftItem">{blocks}</div></body></html>'
+        )
+        return [(url, headers, content.encode())]
+    div_items = "".join(
+        f'<div class="list clearfix"><a href="/n3/2025/{index}.html"><img></a>'
+        f'<h3 class="tit"><a href="/n3/2025/{index}.html"> ニュース{index} </a></h3>'
+        f'<span class="time">2025-06-{index % 28 + 1:02d} 10:00</span></div>'
+        for index in range(items)
+    )
+    content = (
+        f'<html><body><div class="left fl"><h3 class="tit">経済</h3>{div_items}'
+        "</div></body></html>"
+    )
+    return [(url, headers, content.encode())]
+
+
+def bench_lists():
+    """对比旧的列表解析和按规则单次遍历的解析速度，并检查提取的文章完全相同"""
+    mismatches = 0
+    print(f"{'站点':<10}{'页面数':>6}{'文章数':>8}{'旧(ms)':>10}{'新(ms)':>10}{'加速':>8}")
+    for site in SCRAPERS:
+        pages = [
+            (url, headers, content)
+            for _, url, headers, content in load_fixtures(site, "list")
+        ] or sample_list_pages(site)
+        legacy_times, current_times = [], []
+        papers = 0
+        for url, headers, content in pages:
+            soup = current_soup(site, "list", headers, content)
+            legacy = legacy_list(site, url, soup)
+            current = extract(site, "list", url, soup)
+            papers += len(current)
+            if legacy != current:
+                mismatches += 1
+                logger.error(f"【{site}】列表提取结果不一致：{url}")
+            legacy_times.append(
+                time_parse(lambda: legacy_list(site, url, soup), LIST_REPEAT)
+            )
+            current_times.append(
+                time_parse(lambda: extract(site, "list", url, soup), LIST_REPEAT)
+            )
+        old_ms, new_ms = mean(legacy_times) * 1000, mean(current_times) * 1000
+        print(
+            f"{site:<10}{len(pages):>6}{papers:>8}{old_ms:>10.3f}"
+            f"{new_ms:>10.3f}{old_ms / new_ms:>7.1f}x"
+        )
+    if mismatches:
+        logger.error(f"{mismatches}个列表页的提取结果不一致")
+    return mismatches == 0
+
+
+def legacy_format_title(doc, text, font_name, alignment, font_size=None):
+    paragraph = doc.add_paragraph()
+    paragraph.alignment = alignment
+    run = paragraph.add_run(text)
+    run.font.name = font_name
+    run._element.rPr.rFonts.set(qn("w:eastAsia"), font_name)
+    if font_size:
+        run.font.size = font_size
+
+
+def legacy_format_paragraph(doc):
+    paragraph = doc.add_paragraph()
+    paragraph.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
+    paragraph.paragraph_format.first_line_indent = Pt(11 * 2)
+    return paragraph
+
+
+def legacy_format_paragraph_font(paragraph):
+    run = paragraph.add_run()
+    run.font.name = "宋体"
+    run._element.rPr.rFonts.set(qn("w:eastAsia"), "宋体")
+    return run
+
+
+def legacy_docx(scraper, p_elements, path):
+    """旧的生成方式：python-docx默认模板，逐个段落设置对齐、逐个run设置字体"""
+    doc = Document()
+    for section in doc.sections:
+        section.page_height = Mm(297)
+        section.page_width = Mm(210)
+    legacy_format_title(doc, DOCX_CATEGORY, "楷体", WD_ALIGN_PARAGRAPH.LEFT)
+    legacy_format_title(doc, DOCX_TITLE, "黑体", WD_ALIGN_PARAGRAPH.CENTER, Pt(16))
+    legacy_format_title(doc, DOCX_DATE, "黑体", WD_ALIGN_PARAGRAPH.CENTER)
+    for body in scraper.extract_paragraphs(p_elements):
+        paragraph = legacy_format_paragraph(doc)
+        for text, bold in body.runs():
+            run = legacy_format_paragraph_font(paragraph)
+            if bold:
+                run.bold = True
+            run.text = text
+    doc.save(path)
+
+
+def bench_article(scraper, p_elements):
+    return build_article(
+        DOCX_TITLE, DOCX_CATEGORY, DOCX_DATE, scraper.extract_paragraphs(p_elements)
+    )
+
+
+def writer_output(writer):
+    # 与BaseScraper.save_article相同，不写入索引
+    def write(scraper, p_elements, path):
+        writer.write(bench_article(scraper, p_elements), path)
+
+    return write
+
+
+def converted_docx(scraper, p_elements, path):
+    # 合并时由jsonl生成docx，只计转换的耗时
+    jsonl_path = f"{path}{STRUCTURED_EXTENSION}"
+    if not os.path.exists(jsonl_path):
+        JsonlWriter().write(bench_article(scraper, p_elements), jsonl_path)
+    merge_docx_stream([(jsonl_path, b"")], path)
+
+
+# docx基准对比的生成方式：(名称, 生成函数, 输出扩展名)
+DOCX_METHODS = (
+    ("旧docx", legacy_docx, ".docx"),
+    ("docx", writer_output(DocxWriter()), ".docx"),
+    ("jsonl", writer_output(JsonlWriter()), STRUCTURED_EXTENSION),
+    ("jsonl转docx", converted_docx, ".docx"),
+)
+
+
+def docx_articles():
+    """返回[(站点, 正文元素)]，没有录制的文章页时使用示例段落"""
+    articles = []
+    for site in SCRAPERS:
+        for _, url, headers, content in load_fixtures(site, "article"):
+            soup = current_soup(site, "article", headers, content)
+            p_elements = new_scraper(site).parse_paper_info(soup)
+            if p_elements:
+                articles.append((site, p_elements))
+    if not articles:
+        html = "".join(
+            f"<p>第{index}段，<strong>湖北省</strong>召开新闻发布会，介绍全省经济运行情况。</p>"
+            for index in range(SAMPLE_PARAGRAPHS)
+        )
+        soup = make_soup(f'<div class="hbgov-article-content">{html}</div>')
+        articles.append(("hubeigov", new_scraper("hubeigov").parse_paper_info(soup)))
+    return articles
+
+
+def docx_content(path):
+    return [
+        (p.text, p.style.name, [bool(run.bold) for run in p.runs])
+        for p in Document(path).paragraphs
+    ]
+
+
+def bench_docx():
+    """
+    对比各种输出方式的生成速度（含保存）和文件大小，
+    并检查旧方式、模板方式和合并时由jsonl转换生成的docx段落文本和加粗完全相同
+    """
+    articles = docx_articles()
+    work_folder = tempfile.mkdtemp(prefix="scraper-bench-")
+    mismatches = 0
+    results = {}
+    try:
+        for name, build, extension in DOCX_METHODS:
+            durations, sizes = [], []
+            for index, (site, p_elements) in enumerate(articles):
+                scraper = new_scraper(site)
+                path = os.path.join(work_folder, f"{name}_{index}{extension}")
+                for _ in range(DOCX_REPEAT):
+                    start = time.perf_counter()
+                    build(scraper, p_elements, path)
+                    durations.append(time.perf_counter() - start)
+                sizes.append(os.path.getsize(path))
+            results[name] = (len(durations) / sum(durations), mean(sizes) / 1024)
+
+        for index, (site, _) in enumerate(articles):
+            legacy, current, converted = (
+                docx_content(os.path.join(work_folder, f"{name}_{index}.docx"))
+                for name in ("旧docx", "docx", "jsonl转docx")
+            )
+            # 旧方式没有样式，只比较文本和加粗
+            if [(text, bold) for text, _, bold in legacy] != [
+                (text, bold) for text, _, bold in current
+            ]:
+                mismatches += 1
+                logger.error(f"【{site}】模板生成的docx内容与旧方式不一致")
+            if current != converted:
+                mismatches += 1
+                logger.error(f"【{site}】jsonl转换的docx内容与模板生成的不一致")
+    finally:
+        shutil.rmtree(work_folder, ignore_errors=True)
+
+    print(f"文章数：{len(articles)}，每篇生成{DOCX_REPEAT}次")
+    print(f"{'方式':<12}{'篇/秒':>10}{'平均大小(KB)':>14}")
+    for name, (docs_per_sec, size_kb) in results.items():
+        print(f"{name:<12}{docs_per_sec:>10.1f}{size_kb:>14.1f}")
+    speedup = results["docx"][0] / results["旧docx"][0]
+    shrink = 1 - results["docx"][1] / results["旧docx"][1]
+    print(f"模板docx：加速 {speedup:.1f}x，文件缩小 {shrink:.0%}")
+    if mismatches:
+        logger.error(f"{mismatches}篇文章的docx内容不一致")
+    return mismatches == 0
+
+
+def memory_pages():
+    """返回[(站点, 响应头, 内容)]，没有录制的文章页时使用示例页面"""
+    pages = [
+        (site, headers, content)
+        for site in SCRAPERS
+        for _, _, headers, content in load_fixtures(site, "article")
+    ]
+    if not pages:
+        html = "".join(
+            f"<p>第{index}段，<strong>湖北省</strong>召开新闻发布会，介绍全省经济运行情况。</p>"
+            for index in range(SAMPLE_PARAGRAPHS)
+        )
+        content = f'<html><body><div class="hbgov-article-content">{html}</div></body></html>'
+        pages = [("hubeigov", {"Content-Type": "text/html; charset=utf-8"}, content.encode())]
+    return pages
+
+
+def memory_papers(pages, articles):
+    """依次返回(站点, 文章序号, 正文元素)，模拟回填时逐篇解析文章页"""
+    scrapers = {site: new_scraper(site) for site, _, _ in pages}
+    for index in range(articles):
+        site, headers, content = pages[index % len(pages)]
+        soup = current_soup(site, "article", headers, content)
+        yield scrapers[site], index, scrapers[site].parse_paper_info(soup)
+
+
+def legacy_backfill(pages, articles, page_size):
+    """
+    旧的方式：一个列表页的文章全部抓取完才逐篇写入，正文元素（Tag）引用整个页面的soup，
+    写入时再整理为嵌套列表；一年的文章字典一直保留到发送通知
+    """
+    year_papers, batch = [], []
+    for scraper, index, p_elements in memory_papers(pages, articles):
+        paper = {
+            "category": DOCX_CATEGORY,
+            "pubtime": DOCX_DATE,
+            "href": f"http://localhost/{index}.html",
+            "title": f"{DOCX_TITLE}{index}",
+        }
+        batch.append((paper, p_elements))
+        if len(batch) == page_size or index == articles - 1:
+            for paper, p_elements in batch:
+                article = {
+                    "category": paper["category"],
+                    "title": paper["title"],
+                    "pubtime": paper["pubtime"],
+                    "href": paper["href"],
+                    "paragraphs": [
+                        [[text, bold] for text, bold in paragraph.runs()]
+                        for paragraph in scraper.extract_paragraphs(p_elements)
+                    ],
+                }
+                year_papers.append(paper)
+            batch = []
+    return year_papers, article
+
+
+def compact_backfill(pages, articles, page_size):
+    """新的方式：解析后立即提取为Article，soup随即释放；一年的文章只保留Paper"""
+    year_papers, batch = [], []
+    for scraper, index, p_elements in memory_papers(pages, articles):
+        paper = Paper(
+            DOCX_CATEGORY,
+            DOCX_DATE,
+            f"http://localhost/{index}.html",
+            f"{DOCX_TITLE}{index}",
+        )
+        paragraphs = scraper.extract_paragraphs(p_elements)
+        del p_elements
+        batch.append(
+            build_article(
+                paper.title, paper.category, paper.pubtime, paragraphs, paper.href
+            )
+        )
+        if len(batch) == page_size or index == articles - 1:
+            year_papers.extend(
+                Paper(article.category, article.pubtime, article.href, article.title)
+                for article in batch
+            )
+            last, batch = batch[-1], []
+    return year_papers, last.to_dict()
+
+
+MEMORY_METHODS = {"旧方式": legacy_backfill, "紧凑模型": compact_backfill}
+
+
+def measure_memory(method, articles, page_size, trace=False):
+    """
+    在单独的进程中运行，返回(RSS峰值增量KB, Python分配峰值KB, 耗时, 最后一篇文章)。
+    trace为True时用tracemalloc统计Python分配峰值，不计耗时和RSS
+    """
+    pages = memory_pages()
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    year_papers, article = MEMORY_METHODS[method](pages, articles, page_size)
+    seconds = time.perf_counter() - start
+    traced = 0
+    if trace:
+        traced = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+    return rss, traced, seconds, len(year_papers), article
+
+
+def bench_memory(articles=MEMORY_ARTICLES, page_size=MEMORY_PAGE_SIZE):
+    """每种方式在新的进程中运行，RSS峰值互不影响；检查两种方式生成的文章内容相同"""
+    results, last_articles = {}, []
+    context = multiprocessing.get_context("spawn")
+    for method in MEMORY_METHODS:
+        measured = []
+        for trace in (False, True):
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                future = executor.submit(
+                    measure_memory, method, articles, page_size, trace
+                )
+                measured.append(future.result())
+        (rss, _, seconds, kept, article), (_, traced, _, _, _) = measured
+        results[method] = (rss / 1024, traced / 1024, seconds, kept)
+        last_articles.append(article)
+
+    print(f"文章数：{articles}，每页{page_size}篇")
+    print(
+        f"{'方式':<10}{'RSS峰值增量(MB)':>16}{'Python分配峰值(MB)':>20}"
+        f"{'耗时(秒)':>10}{'保留文章':>10}"
+    )
+    for method, (rss_mb, traced_mb, seconds, kept) in results.items():
+        print(f"{method:<10}{rss_mb:>16.1f}{traced_mb:>20.1f}{seconds:>10.2f}{kept:>10}")
+    legacy, compact = results["旧方式"], results["紧凑模型"]
+    print(
+        f"紧凑模型：RSS峰值增量减少 {1 - compact[0] / max(legacy[0], 0.1):.0%}，"
+        f"Python分配峰值减少 {1 - compact[1] / max(legacy[1], 0.1):.0%}"
+    )
+    if last_articles[0] != last_articles[1]:
+        logger.error("两种方式生成的文章内容不一致")
+        return False
+    return True
+
+
+class StandInServer:
+    """
+    本地替身服务器，按原始地址回放录制的页面。
+    爬虫的HTTP会话挂载StandInAdapter，所有请求都改写为发往本服务器，原始地址放在路径中
+    """
+
+    def __init__(self):
+        self.pages = {}
+        for site in SCRAPERS:
+            for _, url, headers, content in load_fixtures(site):
+                self.pages[url] = (headers, content)
+        pages = self.pages
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = unquote(self.path[1:])
+                if url not in pages:
+                    self.send_error(404)
+                    return
+                headers, content = pages[url]
+                self.send_response(200)
+                for key, value in headers.items():
+                    if key.lower() not in SKIP_REPLAY_HEADERS:
+                        self.send_header(key, value)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.address = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class StandInAdapter(HTTPAdapter):
+    def __init__(self, address, **kwargs):
+        self.address = address
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        request.url = f"{self.address}/{quote(request.url, safe='')}"
+        return super().send(request, **kwargs)
+
+
+def percentiles(samples):
+    if len(samples) == 1:
+        return {"p50": samples[0], "p90": samples[0], "p99": samples[0]}
+    cuts = quantiles(samples, n=100, method="inclusive")
+    return {"p50": cuts[49], "p90": cuts[89], "p99": cuts[98]}
+
+
+class StageTimer:
+    """按阶段记录每次调用的耗时；trace为True时同时记录该阶段的内存峰值"""
+
+    def __init__(self):
+        self.samples = {}
+        self.peaks = {}
+        self.trace = False
+
+    def measure(self, stage, func, *args):
+        if self.trace:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            if self.trace:
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                self.peaks[stage] = max(self.peaks.get(stage, 0), peak)
+            else:
+                self.samples.setdefault(stage, []).append(elapsed)
+
+    def summary(self):
+        return {
+            stage: {
+                **{k: v * 1000 for k, v in percentiles(samples).items()},
+                "count": len(samples),
+                "peak_kb": self.peaks.get(stage, 0) / 1024,
+            }
+            for stage, samples in self.samples.items()
+        }
+
+
+def write_bench_config(work_folder):
+    """生成指向临时目录和录制列表页的配置文件，爬虫在该目录下运行，不影响正式数据"""
+    config = load_config()
+    config.update(
+        {
+            "save_folder": os.path.join(work_folder, "docx"),
+            "state_folder": os.path.join(work_folder, "state"),
+            "notify_switch": False,
+            "list_cache": False,
+            "fetch_mode": "http",
+            # 在当前进程中合并，tracemalloc才能统计到合并的内存峰值
+            "archive_workers": 1,
+            # 临时目录运行结束后删除，不写入指标文件
+            "metrics": False,
+            # 在当前进程中写入文章，save_article的耗时包含生成文件
+            "render_workers": 1,
+        }
+    )
+    for item in config.get("news_sites"):
+        lists = [url for kind, url, _, _ in load_fixtures(item["name"], "list")]
+        if lists:
+            item["url"] = lists
+    os.makedirs(os.path.join(work_folder, "config"), exist_ok=True)
+    with open(
+        os.path.join(work_folder, "config", "config.yaml"), "w", encoding="utf-8"
+    ) as file:
+        yaml.safe_dump(config, file, allow_unicode=True)
+
+
+def run_site(site, timer, address, known_urls):
+    scraper = SCRAPERS[site]()
+    adapter = StandInAdapter(address, pool_maxsize=10)
+    scraper.http.session.mount("http://", adapter)
+    scraper.http.session.mount("https://", adapter)
+    if site == "hubeigov":
+        with PagePool(1) as pool:
+            paper_list = timer.measure("get_paper_list", scraper.get_paper_list, pool)
+    else:
+        paper_list = timer.measure("get_paper_list", scraper.get_paper_list)
+
+    # 湖北的get_paper_info需要page参数，fetch_mode为http时不会用到
+    page_args = (None,) if site == "hubeigov" else ()
+    for paper in paper_list:
+        # 只处理录制过的文章
+        if paper["href"] not in known_urls:
+            continue
+        p_elements = timer.measure(
+            "get_paper_info", scraper.get_paper_info, paper["href"], *page_args
+        )
+        name_pure = scraper.get_name_pure(paper)
+        if p_elements:
+            timer.measure(
+                "save_article",
+                scraper.save_article,
+                f"{name_pure}.docx",
+                paper["title"],
+                paper["category"],
+                paper["pubtime"],
+                scraper.extract_paragraphs(p_elements),
+                paper["href"],
+            )
+        # 录制过的相关文件：抓取、解析并写入，与正式运行相同
+        href_attachement = paper.get("href_attachement")
+        if site == "hubeigov" and href_attachement in known_urls:
+            timer.measure(
+                "attachement",
+                scraper.retrieve_attachement,
+                None,
+                href_attachement,
+                f"{name_pure}_相关文件.docx",
+                paper["category"],
+                paper["pubtime"],
+            )
+    scraper.close()
+    return scraper.save_folder
+
+
+def bench_run():
+    timer = StageTimer()
+    cwd = os.getcwd()
+    sites = [site for site in SCRAPERS if load_fixtures(site, "list")]
+    if not sites:
+        logger.error("没有录制的页面，请先运行 python benchmark.py record")
+        return None
+    with StandInServer() as server:
+        for round_index in range(RUN_ROUNDS + 1):
+            # 最后一轮开启tracemalloc统计内存峰值，不计入耗时
+            timer.trace = round_index == RUN_ROUNDS
+            work_folder = tempfile.mkdtemp(prefix="scraper-bench-")
+            try:
+                write_bench_config(work_folder)
+                os.chdir(work_folder)
+                archiver = DocxArchiver()
+                for site in sites:
+                    save_folder = run_site(
+                        site, timer, server.address, set(server.pages)
+                    )
+                    timer.measure(
+                        "merge_docx_files",
+                        archiver.merge_docx_files,
+                        save_folder,
+                        os.path.join(work_folder, "merged"),
+                        site,
+                    )
+            finally:
+                os.chdir(cwd)
+                shutil.rmtree(work_folder, ignore_errors=True)
+    return timer.summary()
+
+
+def print_summary(summary, baseline=None):
+    print(
+        f"{'阶段':<18}{'次数':>6}{'p50(ms)':>10}{'p90(ms)':>10}"
+        f"{'p99(ms)':>10}{'峰值(KB)':>10}{'基线p90':>10}"
+    )
+    for stage, stats in summary.items():
+        base = (baseline or {}).get(stage, {}).get("p90")
+        print(
+            f"{stage:<18}{stats['count']:>6}{stats['p50']:>10.2f}{stats['p90']:>10.2f}"
+            f"{stats['p99']:>10.2f}{stats['peak_kb']:>10.0f}"
+            + (f"{base:>10.2f}" if base is not None else f"{'-':>10}")
+        )
+
+
+def check_regression(summary, baseline, threshold):
+    """p90耗时或内存峰值超过基线(1+threshold)倍时视为退化"""
+    regressions = []
+    for stage, stats in summary.items():
+        base = baseline.get(stage)
+        if not base:
+            continue
+        for key in ("p90", "peak_kb"):
+            if base[key] and stats[key] > base[key] * (1 + threshold):
+                regressions.append(
+                    f"{stage} {key}: {stats[key]:.2f} > 基线 {base[key]:.2f}"
+                )
+    for regression in regressions:
+        logger.error(f"性能退化：{regression}")
+    return not regressions
+
+
+if __name__ == "__main__":
+    args = sys.argv
+    if len(args) < 2 or args[1] not in [
+        "record",
+        "parse",
+        "lists",
+        "docx",
+        "memory",
+        "run",
+        "baseline",
+    ]:
+        print(
+            "参数错误, 请传入参数: record [站点名称]、parse、lists、docx、memory [篇数]、"
+            "run [阈值] 或者 baseline"
+        )
+        sys.exit(1)
+
+    if args[1] == "record":
+        record(args[2] if len(args) > 2 else None)
+    elif args[1] == "parse":
+        if not bench_parse():
+            sys.exit(1)
+    elif args[1] == "lists":
+        if not bench_lists():
+            sys.exit(1)
+    elif args[1] == "docx":
+        if not bench_docx():
+            sys.exit(1)
+    elif args[1] == "memory":
+        if not bench_memory(int(args[2]) if len(args) > 2 else MEMORY_ARTICLES):
+            sys.exit(1)
+    else:
+        summary = bench_run()
+        if summary is None:
+            sys.exit(1)
+        baseline = None
+        if os.path.exists(BASELINE_FILE):
+            with open(BASELINE_FILE, "r", encoding="utf-8") as file:
+                baseline = json.load(file)
+        print_summary(summary, baseline)
+        if args[1] == "baseline":
+            with open(BASELINE_FILE, "w", encoding="utf-8") as file:
+                json.dump(summary, file, ensure_ascii=False, indent=2)
+            logger.info(f"基线已保存到 {BASELINE_FILE}")
+        elif baseline:
+            threshold = float(args[2]) if len(args) > 2 else 0.2
+            if not check_regression(summary, baseline, threshold):
+                sys.exit(1)
@@ -1,9 +1,38 @@
-from playwright.sync_api import Playwright, sync_playwright
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlparse
 from base_scraper import BaseScraper
+from article_model import Paper, Paragraph
+from browser_pool import PagePool, shared_pool
+from resource_filter import ResourceFilter
+from fetch_strategy import FetchStrategy
+from utils_func import get_state_folder
+from page_cache import PageCacheMiss
+from html_parser import ListSpec, class_strainer, decode_content, make_soup
+from metrics import timed, FETCH_BYTES
 import traceback
 
+# HTTP直接获取页面时，用于判断页面是否已包含正文或列表内容的选择器
+EXPECTED_SELECTORS = (
+    "div.hbgov-bfc-block",
+    "div.hbgov-article-content",
+    "div.text_record",
+)
+# 只解析需要的区域：列表页的栏目和文章列表、文章和相关文件的标题和正文
+PAGE_STRAINER = class_strainer(
+    "div",
+    [
+        "hbgov-index-bar",
+        "hbgov-bfc-block",
+        "hbgov-article-title",
+        "hbgov-article-content",
+        "text_record",
+    ],
+)
+# 列表页的条目：有li时每个li一条，日期在span中；否则每个div.right一条，日期在div中
+LIST_SPECS = (
+    ListSpec("li", {"pubtime": "span"}, links=True),
+    ListSpec(("div", "right"), {"pubtime": "div"}, links=True),
+)
+
 
 class HubeigovScraper(BaseScraper):
     def __init__(self):
@@ -11,38 +40,61 @@ class HubeigovScraper(BaseScraper):
         self.source_name = "hubeigov"
         super().__init__()
         self.headless_mode = self.config.get("HEADLESS", False)
+        # 页面池大小，即同时打开的playwright页面数量
+        self.pool_size = int(self.config.get("playwright_pool_size", 1))
+        self.resource_filter = None
+        # 常驻模式：定时任务之间保持firefox启动，每次运行使用新的context
+        self.keep_alive = bool(self.config.get("playwright_keep_alive", False))
+        # 常驻模式下playwright和firefox的内存上限，单位：MB，超过后重新启动
+        self.max_rss_mb = int(self.config.get("playwright_max_rss_mb", 1024))
+        # 先用HTTP获取页面，缺少预期内容时再使用浏览器
+        self.fetch_strategy = FetchStrategy(
+            get_state_folder(self.config), self.config.get("fetch_mode", "hybrid")
+        )
 
     def run(self):
         try:
-            with sync_playwright() as playwright:
-                self.request_data(playwright)
-                return True
+            return self.request_data()
         except Exception as e:
             self.logger.error(f"run()运行过程出错：{str(e)}")
             return False
+        finally:
+            self.close()
 
-    def request_data(self, playwright: Playwright):
+    def request_data(self):
         self.logger.info("开始启动playwright...")
         try:
-            with playwright.firefox.launch(headless=self.headless_mode) as browser:
-                with browser.new_context() as context:
-                    page = context.new_page()
-                    page.set_default_timeout(self.playwright_timeout)
-                    self.retrieve_paper(page)
+            # 只需要HTML，拦截图片、字体、样式和统计脚本，每次运行单独统计
+            self.resource_filter = ResourceFilter.from_config(self.config)
+            # 页面池中的每个页面从共享队列中领取列表页、文章和附件任务
+            if self.keep_alive:
+                pool = shared_pool(
+                    self.pool_size,
+                    self.headless_mode,
+                    self.playwright_timeout,
+                    self.max_rss_mb,
+                )
+            else:
+                pool = PagePool(self.pool_size, self.headless_mode, self.playwright_timeout)
+            with pool.session(
+                self.resource_filter.attach if self.resource_filter else None
+            ):
+                result = self.retrieve_paper(pool)
+            self.fetch_strategy.save()
+            self.fetch_strategy.report(pool.launch_count)
+            if self.resource_filter and pool.browser_used:
+                self.resource_filter.report()
+            return result
         except Exception as e:
             self.logger.error(
                 f"request_data()运行过程出错：提前退出playwright。原因：{str(e)}\n{traceback.format_exc()}"
             )
-        finally:
-            self.logger.info("playwright已关闭。")
+            return False
 
-    def get_paper_list(self, page):
+    def get_paper_list(self, pool):
         paper_list = []
         try:
-            for url in self.url:
-                selector = "div.hbgov-index-bar"
-                soup = self.fetch_page_soup(page, url, selector)
-                sub_paper_list = self.parse_paper_list(soup, url)
+            for sub_paper_list in pool.map(self.fetch_paper_list, self.url, default=[]):
                 if sub_paper_list:  # 如果不是空列表
                     paper_list.extend(sub_paper_list)
         except Exception as e:
@@ -50,40 +102,131 @@ class HubeigovScraper(BaseScraper):
 
         return paper_list
 
-    def fetch_page_soup(self, page, url, selector=""):
+    def fetch_paper_list(self, page, url):
+        selector = "div.hbgov-index-bar"
+        soup = self.fetch_page_soup(page, url, selector, conditional=True)
+        if self.list_cache.unchanged(
+            url, self.list_fingerprint(soup) if soup else None
+        ):
+            self.logger.info(f"列表页没有变化，跳过：{url}")
+            return []
+        return self.parse_paper_list(soup, url) if soup else []
+
+    def list_fingerprint(self, soup):
+        div_main = soup.find("div", class_="hbgov-bfc-block")
+        return str(div_main) if div_main else None
+
+    def fetch_paper_infos(self, hrefs, pool):
+        return pool.map(
+            lambda page, href: self.fetch_article(href, page), hrefs, default=None
+        )
+
+    def retrieve_attachements(self, attachement_tasks, pool):
+        # 附件任务在页面池中并行执行，等待全部完成
+        list(
+            pool.map(
+                lambda page, task: self.retrieve_attachement(page, *task),
+                attachement_tasks,
+            )
+        )
+
+    @timed("fetch_page_soup")
+    def fetch_page_soup(self, page, url, selector="", conditional=False, missing=None):
+        # conditional为True时HTTP请求带上条件请求头，服务器返回304时返回None
+        # 页面不存在（404）时返回missing，获取失败时返回None
+        if self.replay:
+            return self.fetch_cached_soup(url, missing)
+        if self.fetch_strategy.prefer_http(url):
+            soup, need_browser = self.fetch_http_soup(url, selector, conditional, missing)
+            if not need_browser:
+                return soup
+        if self.fetch_strategy.mode == "http":
+            return None
+        self.fetch_strategy.record_browser(url)
+        return self.fetch_browser_soup(page, url, selector, missing)
+
+    @timed("fetch_http_soup")
+    def fetch_http_soup(self, url, selector="", conditional=False, missing=None):
+        """
+        用HTTP请求获取页面，返回(soup, 是否需要浏览器)。
+        页面未修改时返回None，不存在时返回missing，都不再用浏览器重试
+        """
+        try:
+            headers = self.list_cache.conditional_headers(url) if conditional else {}
+            response = self.fetch_response(url, headers)
+            if conditional and self.list_cache.record_response(url, response):
+                self.count_page()
+                return None, False
+            if response.status_code == 404:
+                return missing, False
+            response.raise_for_status()
+            self.count_page()
+            text = decode_content(response.headers, response.content)
+            soup = make_soup(text, PAGE_STRAINER)
+        except Exception as e:
+            self.logger.debug(f"fetch_http_soup()运行过程出错：{str(e)}")
+            self.fetch_strategy.record_http(url, False)
+            return None, True
+
+        ok = (not selector or soup.select_one(selector)) and any(
+            soup.select_one(expected) for expected in EXPECTED_SELECTORS
+        )
+        self.fetch_strategy.record_http(url, bool(ok))
+        return (soup, False) if ok else (None, True)
+
+    @timed("fetch_browser_soup")
+    def fetch_browser_soup(self, page, url, selector="", missing=None):
         try:
-            page.goto(url)
+            if self.resource_filter:
+                self.resource_filter.prepare(page, url)
+            response = page.goto(url)
+            if response is not None and response.status == 404:
+                return missing
             if selector:
                 page.wait_for_selector(selector)
             content = page.content()
-            soup = BeautifulSoup(content, "html.parser")
+            self.count_page()
+            body = content.encode("utf-8")
+            self.cache_page(url, 200, {"Content-Type": "text/html; charset=utf-8"}, body)
+            FETCH_BYTES.inc(len(body), method="browser", host=urlparse(url).netloc)
+            soup = make_soup(content, PAGE_STRAINER)
             return soup
         except Exception as e:
             self.logger.error(f"fetch_page_soup()运行过程出错：{str(e)}")
             return None
 
+    def fetch_cached_soup(self, url, missing=None):
+        # 回放：HTTP和浏览器获取的页面都从原始页面缓存读取。
+        # 缓存只保存200的响应，缺少的页面按不存在处理，返回missing
+        try:
+            response = self.fetch_response(url)
+        except PageCacheMiss as e:
+            self.logger.warning(str(e))
+            return missing
+        self.count_page()
+        return make_soup(decode_content(response.headers, response.content), PAGE_STRAINER)
+
     def parse_paper_list(self, soup, url):
         category = soup.find("div", class_="hbgov-index-bar").find("a").get_text()
         div_main = soup.find("div", class_="hbgov-bfc-block")
         if not div_main:
             return []
 
+        # 使用第一个有条目的规则
+        for spec in LIST_SPECS:
+            list_elements = spec.find_items(div_main)
+            if list_elements:
+                break
+
         paper_list = []
-        list_elements = div_main.find_all("li") or div_main.find_all(
-            "div", class_="right"
-        )
         for element in list_elements:
-            pubtime = (
-                element.find("span" if div_main.find_all("li") else "div").get_text()
-                if element.find("span" if div_main.find_all("li") else "div")
-                else ""
-            )
-            # 找出element下的a标签，如果有1个，则执行以下操作，如果有2个，则执行下面的else
-            a_tags = element.find_all("a")
+            fields = spec.extract(element)
+            a_tags = fields["links"]
             if not a_tags:
                 continue
+            pubtime = fields["pubtime"].get_text() if "pubtime" in fields else ""
 
-            # 处理附件
+            # 第二个a标签为附件
             if len(a_tags) >= 2:
                 href_attachement = a_tags[1]["href"]
             else:
@@ -92,35 +235,39 @@ class HubeigovScraper(BaseScraper):
             href = urljoin(url, a_tags[0]["href"])
             title = a_tags[0].get_text()
 
-            paper_list.append(
-                {
-                    "category": category,
-                    "pubtime": pubtime,
-                    "href": href,
-                    "title": title,
-                    "href_attachement": href_attachement,
-                }
-            )
+            paper_list.append(Paper(category, pubtime, href, title, href_attachement))
         return paper_list
 
+    @timed("get_paper_info")
     def get_paper_info(self, href, page) -> list:
         try:
             soup = self.fetch_page_soup(page, href)
-            div = soup.find("div", class_="hbgov-article-content")
-            if not div:
-                div = soup.find("div", class_="text_record")
-            p_elements = div.find_all("p") if div else []
-            return p_elements
+            return self.parse_paper_info(soup)
 
         except Exception as e:
             self.logger.error(f"get_paper_info()运行过程出错：{str(e)}")
             return []
 
-    def extract_and_write_paragraphs(self, doc, p_elements):
+    def parse_paper_info(self, soup) -> list:
+        div = soup.find("div", class_="hbgov-article-content")
+        if not div:
+            div = soup.find("div", class_="text_record")
+        p_elements = div.find_all("p") if div else []
+        return p_elements
+
+    def parse_attachement_info(self, soup):
+        # 相关文件标题
+        h1 = soup.find("div", class_="hbgov-article-title").find("h1")
+        h1_text = h1.get_text().strip() if h1 else ""
+        # 相关文件主体
+        return h1_text, self.parse_paper_info(soup)
+
+    def extract_paragraphs(self, p_elements):
+        paragraphs = []
         for p in p_elements:
             if "text-align: right" in p.get("style", ""):
                 continue
-            paragraph = self.format_paragraph(doc)
+            runs = []
             # 处理标签
             for content in p.contents:
                 # 统一提取文本
@@ -130,10 +277,9 @@ class HubeigovScraper(BaseScraper):
                     text = str(content).strip()
                 if not text:
                     continue
-                run = self.format_paragraph_font(paragraph)
-                if hasattr(content, "name") and content.name == "strong":
-                    run.bold = True
-                run.text = text
+                runs.append((text, hasattr(content, "name") and content.name == "strong"))
+            paragraphs.append(Paragraph.from_runs(runs))
+        return paragraphs
 
     def retrieve_attachement(
         self, page, href_attachement, file_name_attachement, category, datetime
@@ -141,23 +287,16 @@ class HubeigovScraper(BaseScraper):
         try:
             if href_attachement:
                 soup = self.fetch_page_soup(page, href_attachement)
-
-                # 相关文件标题
-                h1 = soup.find("div", class_="hbgov-article-title").find("h1")
-                h1_text = h1.get_text().strip() if h1 else ""
-                # 相关文件主体
-                div = soup.find("div", class_="hbgov-article-content")
-                if not div:
-                    div = soup.find("div", class_="text_record")
-                p_elements_attachement = div.find_all("p") if div else []
+                h1_text, p_elements_attachement = self.parse_attachement_info(soup)
 
             if p_elements_attachement:
-                self.create_docx(
+                self.save_article(
                     file_name_attachement,
                     h1_text,
                     f"{category}-相关文件",
                     datetime,
-                    p_elements_attachement,
+                    self.extract_paragraphs(p_elements_attachement),
+                    href_attachement,
                 )
         except Exception as e:
             self.logger.error(f"retrieve_attachement()运行过程出错：{str(e)}")
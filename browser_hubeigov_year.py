@@ -1,48 +1,39 @@
 from urllib.parse import urljoin
 from browser_hubeigov import HubeigovScraper
-import re
+from backfill import BackfillMixin, BackfillPageError
 from utils_func import setup_logging
 
 # 配置日志
 logging = setup_logging()
+# 列表页不存在（超过最后一页）时fetch_page_soup的返回值，与获取失败的None区分
+PAGE_NOT_FOUND = object()
 
 
-class HubeigovScraperYear(HubeigovScraper):
+class HubeigovScraperYear(BackfillMixin, HubeigovScraper):
+    # 每个栏目最多翻页数
+    MAX_PAGES = 50
+
     def __init__(self, year):
         # 父类初始化
         super().__init__()
         self.year = str(year)
 
-    def get_paper_list(self, page):
-        paper_list = []
-        selector = "div.hbgov-index-bar"
-        for url in self.url:
-            i = 0
-            while i < 50:
-                if i != 0:
-                    url = urljoin(url, f"index_{i}.shtml")
-                i += 1
-                soup = self.fetch_page_soup(page, url, selector)
-                if not soup:
-                    break
-                sub_paper_list = self.parse_paper_list(soup, url)
-                if sub_paper_list:  # 如果不是空列表
-                    for paper in sub_paper_list:
-                        if self.is_year_match(paper["pubtime"]):
-                            paper_list.append(paper)
-                        else:
-                            continue
-                else:
-                    continue
-
-        return paper_list
-
-    def is_year_match(self, pubtime):
-        datetime = self.format_date(pubtime)
-        match = re.search(r"\d{4}", datetime)
-        if match and self.year == match.group():
-            return True
-        return False
+    def backfill_channels(self, pool):
+        # 每个栏目的cursor为列表页的序号，第0页为栏目首页，之后为index_N.shtml
+        return [(url, 0) for url in self.url]
+
+    def fetch_backfill_page(self, pool, channel, cursor):
+        url = channel if cursor == 0 else urljoin(channel, f"index_{cursor}.shtml")
+        soup = pool.run(
+            self.fetch_page_soup, url, "div.hbgov-index-bar", False, PAGE_NOT_FOUND
+        )
+        # 列表页不存在时栏目结束；获取失败时报错，不推进进度
+        if soup is PAGE_NOT_FOUND:
+            return [], None
+        if soup is None:
+            raise BackfillPageError(f"列表页获取失败：{url}")
+        next_cursor = cursor + 1 if cursor + 1 < self.MAX_PAGES else None
+        return self.parse_paper_list(soup, url), next_cursor
 
 
 def browser_func(year):
@@ -0,0 +1,412 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from playwright.sync_api import sync_playwright
+from utils_func import setup_logging
+
+# map中单个任务的最长执行时间为task_timeout的倍数：一个任务包含打开页面、等待元素等多个playwright操作
+TASK_DEADLINE_FACTOR = 3
+
+
+class LazyPage:
+    """
+    延迟启动的 playwright 页面。
+    第一次访问页面的属性或方法时，才在当前工作线程中启动 playwright 和 firefox，
+    任务只用 HTTP 就能完成时不会启动浏览器。
+    常驻页面池中浏览器在多次运行之间保持启动，每次运行使用新的context。
+    """
+
+    def __init__(self, pool):
+        self._pool = pool
+        self._playwright = None
+        self._browser = None
+        self._context = None
+        self._page = None
+        self._launch_error = None
+        self._run_id = pool.run_id
+        # playwright驱动进程的pid，firefox是它的子进程，用于统计浏览器占用的内存
+        self.driver_pid = None
+
+    @property
+    def launched(self):
+        return self._browser is not None
+
+    def _healthy(self):
+        try:
+            return self._browser.is_connected()
+        except Exception:
+            return False
+
+    def _begin_run(self):
+        # 新的一次运行：关闭上次运行的context，清除启动失败的记录
+        self._run_id = self._pool.run_id
+        self._launch_error = None
+        self.close_context()
+        if self._browser is not None and self._pool.recycle_browsers:
+            self._pool.logger.info("playwright进程内存超过上限，重新启动firefox")
+            self.stop()
+
+    def _ensure_page(self):
+        if self._run_id != self._pool.run_id:
+            self._begin_run()
+        if self._page is not None:
+            return self._page
+        if self._launch_error:
+            # 浏览器启动失败过，本次运行的后续任务直接失败，不再重复启动
+            raise self._launch_error
+        try:
+            start = time.monotonic()
+            cold = False
+            if self._browser is not None and not self._healthy():
+                self._pool.logger.warning("firefox已断开连接，重新启动")
+                self.stop()
+            if self._browser is None:
+                manager = sync_playwright()
+                self._playwright = manager.start()
+                self.driver_pid = _driver_pid(manager)
+                self._browser = self._playwright.firefox.launch(
+                    headless=self._pool.headless
+                )
+                cold = True
+            new_context = self._context is None
+            if new_context:
+                self._context = self._browser.new_context()
+                if self._pool.context_setup:
+                    self._pool.context_setup(self._context)
+            self._page = self._context.new_page()
+            self._page.set_default_timeout(self._pool.task_timeout)
+            if new_context:
+                self._pool.on_launch(time.monotonic() - start, cold)
+            return self._page
+        except Exception as e:
+            self._launch_error = e
+            self.stop()
+            raise
+
+    def __getattr__(self, name):
+        return getattr(self._ensure_page(), name)
+
+    def __hash__(self):
+        return id(self)
+
+    def __eq__(self, other):
+        # 资源过滤等回调拿到的是真实页面，与代理对象视为同一个页面
+        return other is self or (self._page is not None and other is self._page)
+
+    def reset(self):
+        """任务失败后页面状态不确定，关闭页面，下次使用时重新打开"""
+        if self._page is not None:
+            try:
+                self._page.close()
+            except Exception:
+                pass
+            self._page = None
+
+    def close_context(self):
+        self.reset()
+        if self._context is not None:
+            try:
+                self._context.close()
+            except Exception:
+                pass
+            self._context = None
+
+    def stop(self):
+        for closer in (self._context, self._browser):
+            if closer is not None:
+                try:
+                    closer.close()
+                except Exception:
+                    pass
+        if self._playwright is not None:
+            try:
+                self._playwright.stop()
+            except Exception:
+                pass
+        self._playwright = self._browser = self._context = self._page = None
+        self.driver_pid = None
+
+
+def _driver_pid(manager):
+    """playwright驱动进程的pid，playwright没有公开接口，取不到时返回None"""
+    try:
+        return manager._connection._transport._proc.pid
+    except AttributeError:
+        return None
+
+
+def process_tree_rss_mb(pids):
+    """
+    pids中的进程及其所有子孙进程（playwright驱动和它启动的firefox）占用的内存，单位：MB，读取/proc。
+    只统计浏览器的进程树，不包括同一进程启动的写入进程池等其他子进程
+    """
+    children = {}
+    try:
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat", "rb") as file:
+                    stat = file.read()
+            except OSError:
+                continue
+            # 进程名可能包含空格和括号，从最后一个括号之后解析
+            ppid = int(stat[stat.rindex(b")") + 2 :].split()[1])
+            children.setdefault(ppid, []).append(int(entry))
+    except OSError:
+        return 0
+    total_pages = 0
+    stack = list(pids)
+    while stack:
+        child = stack.pop()
+        stack.extend(children.get(child, []))
+        try:
+            with open(f"/proc/{child}/statm", "rb") as file:
+                total_pages += int(file.read().split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+    return total_pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+
+class PagePool:
+    """
+    Playwright 页面池。
+    playwright 的同步 API 不能跨线程使用，所以每个工作线程持有自己的 playwright、
+    firefox 和页面，从共享任务队列中取任务执行。任务函数的第一个参数是该线程的页面，
+    浏览器在任务第一次使用页面时才启动。
+    用法：with PagePool(size, headless, timeout) as pool: pool.map(func, items)
+    keep_alive为True时（见shared_pool），运行结束后保留工作线程和浏览器，
+    下次运行通过 with pool.session(context_setup) 复用，每次运行使用新的context。
+    """
+
+    def __init__(
+        self,
+        size=1,
+        headless=True,
+        task_timeout=120000,
+        context_setup=None,
+        keep_alive=False,
+        max_rss_mb=0,
+    ):
+        self.logger = setup_logging()
+        self.size = max(1, int(size))
+        self.headless = headless
+        # 单个任务中每个playwright操作的超时时间，单位：毫秒，超时只影响当前任务
+        self.task_timeout = task_timeout
+        # map等待单个任务的最长时间，单位：秒，从任务开始执行时计时
+        self.task_deadline = task_timeout / 1000 * TASK_DEADLINE_FACTOR
+        # 新建context后的回调，例如挂载资源过滤
+        self.context_setup = context_setup
+        self.keep_alive = keep_alive
+        # playwright和firefox进程的内存上限，单位：MB，超过后在下次运行时重新启动，0为不限制
+        self.max_rss_mb = max_rss_mb
+        self.recycle_browsers = False
+        self.run_id = 0
+        # 本次运行的启动统计：冷启动（启动firefox）和热启动（复用firefox新建context）
+        self.launch_count = 0
+        self.warm_count = 0
+        self.cold_seconds = []
+        self.warm_seconds = []
+        self._queue = queue.Queue()
+        self._threads = []
+        self._pages = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        for index in range(self.size):
+            thread = threading.Thread(
+                target=self._worker, args=(index,), name=f"page-pool-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        self.logger.info(f"playwright页面池已启动，共{self.size}个页面")
+        return self
+
+    def close(self):
+        if not self._threads:
+            return
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self.logger.info("playwright页面池已关闭。")
+
+    def begin_run(self, context_setup=None):
+        if not self._threads:
+            self.start()
+        self.context_setup = context_setup
+        self.launch_count = self.warm_count = 0
+        self.cold_seconds, self.warm_seconds = [], []
+        rss_mb = self.browser_rss_mb() if self.max_rss_mb else 0
+        self.recycle_browsers = rss_mb > self.max_rss_mb if self.max_rss_mb else False
+        if self.recycle_browsers:
+            self.logger.info(
+                f"playwright进程占用内存{rss_mb:.0f}MB，超过上限{self.max_rss_mb}MB"
+            )
+        # 工作线程下次使用页面时发现运行编号变化，关闭旧的context
+        self.run_id += 1
+
+    def browser_rss_mb(self):
+        with self._lock:
+            pids = [page.driver_pid for page in self._pages if page.driver_pid]
+        return process_tree_rss_mb(pids) if pids else 0
+
+    def end_run(self):
+        self.report()
+        if not self.keep_alive:
+            self.close()
+
+    @contextmanager
+    def session(self, context_setup=None):
+        """一次运行，keep_alive时运行结束后保留浏览器"""
+        self.begin_run(context_setup)
+        try:
+            yield self
+        finally:
+            self.end_run()
+
+    def __enter__(self):
+        self.begin_run(self.context_setup)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.end_run()
+
+    @property
+    def browser_used(self):
+        return self.launch_count + self.warm_count > 0
+
+    def on_launch(self, seconds, cold=True):
+        with self._lock:
+            if cold:
+                self.launch_count += 1
+                self.cold_seconds.append(seconds)
+            else:
+                self.warm_count += 1
+                self.warm_seconds.append(seconds)
+
+    def report(self):
+        if not self.browser_used:
+            return
+
+        def average(values):
+            return sum(values) / len(values) if values else 0
+
+        self.logger.info(
+            f"playwright启动：冷启动{self.launch_count}次，平均{average(self.cold_seconds):.2f}秒；"
+            f"热启动{self.warm_count}次，平均{average(self.warm_seconds):.2f}秒"
+        )
+
+    def _worker(self, index):
+        page = LazyPage(self)
+        with self._lock:
+            self._pages.append(page)
+        try:
+            while (item := self._queue.get()) is not None:
+                if not self._run_task(page, item):
+                    page.reset()
+        except Exception as e:
+            self.logger.error(f"playwright页面池工作线程{index}出错：{str(e)}")
+        finally:
+            page.stop()
+            with self._lock:
+                self._pages.remove(page)
+
+    @staticmethod
+    def _run_task(page, item):
+        """执行一个任务，返回False时工作线程重置页面：任务出错，或map已按超时放弃该任务"""
+        future, func, args = item
+        if not future.set_running_or_notify_cancel():
+            return True
+        future.started = time.monotonic()
+        try:
+            result = func(page, *args)
+        except BaseException as e:
+            try:
+                future.set_exception(e)
+            except InvalidStateError:
+                pass
+            return False
+        try:
+            future.set_result(result)
+            return True
+        except InvalidStateError:
+            return False
+
+    def submit(self, func, *args):
+        future = Future()
+        future.started = None
+        self._queue.put((future, func, args))
+        return future
+
+    def _result(self, future):
+        """
+        等待任务的结果，从任务开始执行时计时，排队的时间不计入；超过task_deadline时抛出TimeoutError。
+        工作线程中的playwright调用不能从其他线程中断，超时的任务标记为失败，
+        任务返回后该线程重置页面再执行下一个任务
+        """
+        while True:
+            started = future.started
+            if started is None:
+                timeout = self.task_deadline
+            else:
+                timeout = max(started + self.task_deadline - time.monotonic(), 0)
+            try:
+                return future.result(timeout=timeout)
+            except FutureTimeoutError:
+                started = future.started
+                if started is not None and time.monotonic() >= started + self.task_deadline:
+                    break
+        try:
+            future.set_exception(
+                FutureTimeoutError(f"任务执行超过{self.task_deadline:.0f}秒")
+            )
+        except InvalidStateError:
+            # 超时的同时任务刚好完成
+            pass
+        return future.result()
+
+    def run(self, func, *args):
+        """提交一个任务并等待结果"""
+        return self.submit(func, *args).result()
+
+    def map(self, func, items, default=None):
+        """
+        把所有任务一次性放入队列，由各页面并行执行，按items的顺序返回结果。
+        单个任务失败或超时只返回default，不影响其他任务
+        """
+        futures = [self.submit(func, item) for item in items]
+        for future in futures:
+            try:
+                yield self._result(future)
+            except Exception as e:
+                self.logger.error(f"playwright任务出错：{str(e)}")
+                yield default
+
+
+_shared_pools = {}
+_shared_lock = threading.Lock()
+
+
+def shared_pool(size=1, headless=True, task_timeout=120000, max_rss_mb=0):
+    """
+    常驻的页面池，同一进程中多次运行之间保持playwright驱动和firefox，
+    用于main.py定时任务；进程退出时关闭
+    """
+    key = (int(size), headless, task_timeout)
+    with _shared_lock:
+        pool = _shared_pools.get(key)
+        if pool is None:
+            pool = PagePool(
+                size, headless, task_timeout, keep_alive=True, max_rss_mb=max_rss_mb
+            )
+            _shared_pools[key] = pool
+            atexit.register(pool.close)
+        pool.max_rss_mb = max_rss_mb
+    return pool
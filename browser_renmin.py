@@ -1,11 +1,20 @@
-import requests
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 import re
 from base_scraper import BaseScraper
+from article_model import Paper, Paragraph
+from html_parser import ListSpec, class_strainer, decode_content, make_soup
+from metrics import timed
+
+DATE_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}")
 
 
 class RenminScraper(BaseScraper):
+    # 只解析需要的区域：列表页的栏目和文章列表、文章页的正文
+    LIST_STRAINER = class_strainer("div", ["header", "leftItem"])
+    ARTICLE_STRAINER = class_strainer("div", ["rm_txt_con"])
+    # 列表页栏目中的每个li一篇文章，日期在i中，没有i时从文本中查找
+    LIST_SPEC = ListSpec("li", {"pubtime": "i", "link": "a"})
+
     def __init__(self, sub=""):
         # 父类初始化，获得url、save_folder
         self.source_name = "renmin" + sub
@@ -13,7 +22,10 @@ class RenminScraper(BaseScraper):
         self.base_url = self.get_base_url(self.url)
 
     def run(self):
-        return self.retrieve_paper()
+        try:
+            return self.retrieve_paper()
+        finally:
+            self.close()
 
     def get_base_url(self, url):
         if isinstance(url, list):
@@ -27,7 +39,14 @@ class RenminScraper(BaseScraper):
         paper_list = []
         try:
             for url in self.url:
-                soup = self.fetch_page_soup(url)
+                soup = self.fetch_page_soup(
+                    url, conditional=True, parse_only=self.LIST_STRAINER
+                )
+                if self.list_cache.unchanged(
+                    url, self.list_fingerprint(soup) if soup else None
+                ):
+                    self.logger.info(f"列表页没有变化，跳过：{url}")
+                    continue
                 category = self.parse_categories(soup)
                 sub_paper_list = self.parse_paper_list(soup, category)
                 if sub_paper_list:  # 如果不是空列表
@@ -37,25 +56,23 @@ class RenminScraper(BaseScraper):
             self.logger.error(f"get_paper_list()运行过程出错：{str(e)}")
             return []
 
-    def fetch_page_soup(self, url):
-        response = requests.get(url)
-        # 解析HTML
-        soup = BeautifulSoup(response.text, "html.parser")
-
-        # 查找<meta>标签
-        meta_tag = soup.find("meta", attrs={"http-equiv": "content-type"})
-
-        # 如果找到<meta>标签，提取编码信息
-        if meta_tag and "content" in meta_tag.attrs:
-            content = meta_tag["content"]
-            # 从content中提取charset
-            charset = content.split("charset=")[-1] if "charset=" in content else None
-            if charset:
-                response.encoding = charset  # 设置响应编码
-
-        # 设置编码后，需要重新解析HTML
-        soup = BeautifulSoup(response.text, "html.parser")
-        return soup
+    @timed("fetch_page_soup")
+    def fetch_page_soup(self, url, conditional=False, parse_only=None):
+        # conditional为True时发送条件请求，服务器返回304时返回None
+        headers = self.list_cache.conditional_headers(url) if conditional else {}
+        response = self.fetch_response(url, headers)
+        if conditional and self.list_cache.record_response(url, response):
+            self.count_page()
+            return None
+        response.raise_for_status()
+        self.count_page()
+        # 根据HTTP头、BOM和<meta>一次确定编码后解析HTML
+        text = decode_content(response.headers, response.content)
+        return make_soup(text, parse_only)
+
+    def list_fingerprint(self, soup):
+        div_main = soup.find("div", class_="leftItem")
+        return str(div_main) if div_main else None
 
     def parse_categories(self, soup):
         div_header = soup.find("div", class_="header").find("div", class_="item")
@@ -69,54 +86,52 @@ class RenminScraper(BaseScraper):
 
         for i, item in enumerate(div_items):
             category = category_list[i] if i < len(category_list) else "Unknown"
-            li_tags = item.find_all("li")
-            for li in li_tags:
-                if i_tag := li.find("i"):
-                    pubtime = i_tag.text.strip()
-                else:
-                    pubtime = re.search(r"\d{4}-\d{2}-\d{2}", li.get_text()).group()
-
-                a_tag = li.find("a")
-                title = (
-                    a_tag.text.strip().replace(f"（{category}）", "") if a_tag else ""
-                )
-                href = urljoin(self.base_url, a_tag["href"]) if a_tag else ""
-                paper_list.append(
-                    {
-                        "category": category,
-                        "pubtime": pubtime,
-                        "href": href,
-                        "title": title,
-                    }
-                )
+            paper_list.extend(self.get_sub_paper_list(item, category))
         return paper_list
 
+    def get_sub_paper_list(self, item, category):
+        paper_list = []
+        for li in self.LIST_SPEC.find_items(item):
+            fields = self.LIST_SPEC.extract(li)
+            if i_tag := fields.get("pubtime"):
+                pubtime = i_tag.text.strip()
+            else:
+                pubtime = DATE_PATTERN.search(li.get_text()).group()
+
+            a_tag = fields.get("link")
+            title = a_tag.text.strip().replace(f"（{category}）", "") if a_tag else ""
+            href = urljoin(self.base_url, a_tag["href"]) if a_tag else ""
+            paper_list.append(Paper(category, pubtime, href, title))
+        return paper_list
+
+    @timed("get_paper_info")
     def get_paper_info(self, href) -> list:
         try:
-            soup = self.fetch_page_soup(href)
-            div = soup.find("div", class_="rm_txt_con cf")
-
-            p_elements = [
-                child for child in div.children if child.name == "p" and child.string
-            ]
-            # 可能出现没有直接子元素的p标签
-            if not p_elements:
-                p_elements = [
-                    p for p in div.find_all("p") if p.string and p.string.strip()
-                ]
-
-            return p_elements
+            soup = self.fetch_page_soup(href, parse_only=self.ARTICLE_STRAINER)
+            return self.parse_paper_info(soup)
 
         except Exception as e:
             self.logger.error(f"get_paper_info()运行过程出错：{str(e)}")
             return []
 
-    def extract_and_write_paragraphs(self, doc, p_elements):
-        for p in p_elements:
-            if content := p.find(string=True, recursive=False):
-                paragraph = self.format_paragraph(doc)
-                run = self.format_paragraph_font(paragraph)
-                run.text = content.replace("　　", "").strip()
+    def parse_paper_info(self, soup) -> list:
+        div = soup.find("div", class_="rm_txt_con cf")
+
+        p_elements = [
+            child for child in div.children if child.name == "p" and child.string
+        ]
+        # 可能出现没有直接子元素的p标签
+        if not p_elements:
+            p_elements = [p for p in div.find_all("p") if p.string and p.string.strip()]
+
+        return p_elements
+
+    def extract_paragraphs(self, p_elements):
+        return [
+            Paragraph(content.replace("　　", "").strip())
+            for p in p_elements
+            if (content := p.find(string=True, recursive=False))
+        ]
 
 
 def browser_func():
@@ -1,68 +1,53 @@
 from urllib.parse import urljoin
 from browser_renmin import RenminScraper
-import re
+from backfill import BackfillMixin
 from utils_func import setup_logging
 
 # 配置日志
 logging = setup_logging()
 
 
-class RenminScraperYear(RenminScraper):
+class RenminScraperYear(BackfillMixin, RenminScraper):
     def __init__(self, year):
         # 父类初始化
         super().__init__()
         self.year = str(year)
-
-    def parse_paper_list(self, soup, category_list):
-        div_main = soup.find("div", class_="leftItem")
-        div_items = div_main.find_all("div", class_="item")
-        paper_list = []
-
-        for i, item in enumerate(div_items):
-            category = category_list[i] if i < len(category_list) else "Unknown"
-            sub_category_href = self.get_sub_category_href(item)
-            while True:
-                soup = self.fetch_page_soup(sub_category_href)
-                sub_item = soup.find("div", class_="leftItem").find(
-                    "div", class_="item"
-                )
-                paper_list.extend(self.get_sub_paper_list(sub_item, category))
-
-                next_page_link = soup.find("td", attrs={"align": "right"}).find(
-                    "a", string="下一页"
-                )
-                if next_page_link:
-                    sub_base_url = sub_category_href.rsplit("/", 1)[0]
-                    sub_category_href = f"{sub_base_url}/{next_page_link["href"]}"
-                else:
-                    break
-
-        return paper_list
-
-    def get_sub_paper_list(self, item, category):
-        paper_list = []
-        li_tags = item.find_all("li")
-        for li in li_tags:
-            if i_tag := li.find("i"):
-                pubtime = i_tag.text.strip()
-            else:
-                pubtime = re.search(r"\d{4}-\d{2}-\d{2}", li.get_text()).group()
-
-            if not pubtime.startswith(self.year):
-                break
-
-            a_tag = li.find("a")
-            title = a_tag.text.strip().replace(f"（{category}）", "") if a_tag else ""
-            href = urljoin(self.base_url, a_tag["href"]) if a_tag else ""
-            paper_list.append(
-                {
-                    "category": category,
-                    "pubtime": pubtime,
-                    "href": href,
-                    "title": title,
-                }
-            )
-        return paper_list
+        # 各栏目（子栏目第一页的地址）对应的类别
+        self.channel_categories = {}
+
+    def backfill_channels(self, page=None):
+        # 每个子栏目一个栏目，cursor为当前列表页的地址
+        if type(self.url) == str:
+            self.url = [self.url]
+        channels = []
+        for url in self.url:
+            soup = self.fetch_page_soup(url, parse_only=self.LIST_STRAINER)
+            category_list = self.parse_categories(soup)
+            div_items = soup.find("div", class_="leftItem").find_all("div", class_="item")
+            for i, item in enumerate(div_items):
+                category = category_list[i] if i < len(category_list) else "Unknown"
+                sub_category_href = self.get_sub_category_href(item)
+                if sub_category_href:
+                    sub_category_href = urljoin(url, sub_category_href)
+                    self.channel_categories[sub_category_href] = category
+                    channels.append((sub_category_href, sub_category_href))
+        return channels
+
+    def backfill_label(self, channel):
+        return self.channel_categories.get(channel, channel)
+
+    def fetch_backfill_page(self, page, channel, cursor):
+        soup = self.fetch_page_soup(cursor)
+        sub_item = soup.find("div", class_="leftItem").find("div", class_="item")
+        # 返回本页的全部文章，按年份筛选由BackfillMixin完成
+        paper_list = self.get_sub_paper_list(sub_item, self.channel_categories[channel])
+
+        next_page_link = soup.find("td", attrs={"align": "right"}).find(
+            "a", string="下一页"
+        )
+        if next_page_link:
+            return paper_list, urljoin(cursor, next_page_link["href"])
+        return paper_list, None
 
     def get_sub_category_href(self, item):
         try:
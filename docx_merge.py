@@ -0,0 +1,241 @@
+import io
+import re
+import zipfile
+from docx_template import template_bytes
+from output_writers import STRUCTURED_EXTENSION, read_article, article_body_xml
+
+# 流式合并docx：不构建python-docx对象模型，直接从每个源文件的zip中取出document.xml的
+# body内容写入输出包。任一时刻内存中只有一个源文件的document.xml，与合并的文件数量无关。
+# 源文件也可以是结构化文章（jsonl），正文XML直接由结构化数据生成，包和样式使用文章模板。
+
+DOCUMENT_PART = "word/document.xml"
+STYLES_PART = "word/styles.xml"
+NUMBERING_PART = "word/numbering.xml"
+
+# 每个源文件后追加的分隔内容
+PAGE_BREAK = b'<w:p><w:r><w:br w:type="page"/></w:r></w:p>'
+EMPTY_PARAGRAPH = b"<w:p/>"
+
+# 读取根元素开始标签时最多读取的字节数
+ROOT_SCAN_BYTES = 16384
+
+_ROOT_TAG = re.compile(rb"<w:document\b[^>]*>", re.S)
+_BODY_OPEN = re.compile(rb"<w:body\b[^>]*>")
+_BODY_EMPTY = re.compile(rb"<w:body\s*/>")
+_XMLNS = re.compile(rb'\sxmlns:([\w.-]+)="[^"]*"')
+_STYLE = re.compile(rb"<w:style\b[^>]*>.*?</w:style>", re.S)
+_STYLE_ID = re.compile(rb'w:styleId="([^"]*)"')
+_ABSTRACT_NUM = re.compile(rb"<w:abstractNum\b[^>]*?(?:/>|>.*?</w:abstractNum>)", re.S)
+_NUM = re.compile(rb"<w:num\b[^>]*?(?:/>|>.*?</w:num>)", re.S)
+_ABSTRACT_NUM_ID = re.compile(rb'(<w:abstractNum\b[^>]*?w:abstractNumId=")(\d+)(")')
+_NUM_ID = re.compile(rb'(<w:num\b[^>]*?w:numId=")(\d+)(")')
+_ABSTRACT_NUM_REF = re.compile(rb'(<w:abstractNumId\b[^>]*?w:val=")(\d+)(")')
+_NUM_REF = re.compile(rb'(<w:numId\b[^>]*?w:val=")(\d+)(")')
+_NUMBERING_END = re.compile(rb"<w:numIdMacAtCleanup\b|</w:numbering>")
+
+
+def _is_structured(path):
+    return path.endswith(STRUCTURED_EXTENSION)
+
+
+def _open_package(path):
+    """docx直接打开；结构化文章使用文章模板的包"""
+    if _is_structured(path):
+        return zipfile.ZipFile(io.BytesIO(template_bytes()))
+    return zipfile.ZipFile(path)
+
+
+def _source_body(path):
+    if _is_structured(path):
+        return article_body_xml(read_article(path))
+    with zipfile.ZipFile(path) as source:
+        body, _ = split_body(source.read(DOCUMENT_PART))
+    return body
+
+
+def _read_root_tag(source):
+    with source.open(DOCUMENT_PART) as part:
+        head = part.read(ROOT_SCAN_BYTES)
+    match = _ROOT_TAG.search(head)
+    if not match:
+        raise ValueError(f"无法识别的document.xml：{source.filename}")
+    return match.group(0)
+
+
+def _merge_root_tag(base_tag, other_tags):
+    """补齐其他源文件根元素上声明、但第一个文件没有声明的命名空间"""
+    declared = set(_XMLNS.findall(base_tag))
+    extra = []
+    for tag in other_tags:
+        for match in _XMLNS.finditer(tag):
+            if match.group(1) not in declared:
+                declared.add(match.group(1))
+                extra.append(match.group(0))
+    if not extra:
+        return base_tag
+    return base_tag[:-1] + b"".join(extra) + b">"
+
+
+def _merge_styles(base_styles, other_styles, num_maps=None):
+    """按styleId补齐第一个文件中缺少的样式定义，样式引用的编号按所在文件的num_map改写"""
+    known = set(_STYLE_ID.findall(base_styles))
+    extra = []
+    for index, styles in enumerate(other_styles):
+        num_map = num_maps[index] if num_maps else None
+        for match in _STYLE.finditer(styles):
+            style_id = _STYLE_ID.search(match.group(0))
+            if style_id and style_id.group(1) not in known:
+                known.add(style_id.group(1))
+                extra.append(_renumber(match.group(0), _NUM_REF, num_map))
+    if not extra:
+        return base_styles
+    end = base_styles.rindex(b"</w:styles>")
+    return base_styles[:end] + b"".join(extra) + base_styles[end:]
+
+
+def _renumber(xml, pattern, id_map):
+    """把pattern匹配到的编号id按id_map改写，id_map为空时原样返回"""
+    if not id_map:
+        return xml
+    return pattern.sub(
+        lambda m: m.group(1) + id_map.get(m.group(2), m.group(2)) + m.group(3), xml
+    )
+
+
+def _merge_numbering(base_numbering, other_numbering):
+    """
+    把其他文件的列表定义（w:abstractNum）和编号实例（w:num）追加到第一个文件的numbering.xml，
+    id与已有的重复时改用未使用的id。返回(合并后的numbering.xml, 每个文件的numId映射)，
+    映射为{旧numId: 新numId}，只包含改变了的id，正文和样式中的w:numId按它改写
+    """
+    used_abstract = {int(i) for _, i, _ in _ABSTRACT_NUM_ID.findall(base_numbering)}
+    used_num = {int(i) for _, i, _ in _NUM_ID.findall(base_numbering)}
+    abstract_parts, num_parts, num_maps = [], [], []
+    for numbering in other_numbering:
+        abstract_map, num_map = {}, {}
+        for match in _ABSTRACT_NUM.finditer(numbering):
+            old = _ABSTRACT_NUM_ID.search(match.group(0)).group(2)
+            new = int(old)
+            if new in used_abstract:
+                new = max(used_abstract) + 1
+                abstract_map[old] = str(new).encode()
+            used_abstract.add(new)
+            abstract_parts.append(_renumber(match.group(0), _ABSTRACT_NUM_ID, abstract_map))
+        for match in _NUM.finditer(numbering):
+            old = _NUM_ID.search(match.group(0)).group(2)
+            new = int(old)
+            if new in used_num:
+                new = max(used_num) + 1
+                num_map[old] = str(new).encode()
+            used_num.add(new)
+            num = _renumber(match.group(0), _NUM_ID, num_map)
+            num_parts.append(_renumber(num, _ABSTRACT_NUM_REF, abstract_map))
+        num_maps.append(num_map)
+    # 架构要求所有w:abstractNum在w:num之前
+    first_num = _NUM.search(base_numbering)
+    end = _NUMBERING_END.search(base_numbering).start()
+    abstract_at = first_num.start() if first_num else end
+    merged = (
+        base_numbering[:abstract_at]
+        + b"".join(abstract_parts)
+        + base_numbering[abstract_at:end]
+        + b"".join(num_parts)
+        + base_numbering[end:]
+    )
+    return merged, num_maps
+
+
+def split_body(document_xml):
+    """返回(body内容, 末尾的sectPr)，body内容不包含末尾的sectPr"""
+    if _BODY_EMPTY.search(document_xml):
+        return b"", b""
+    body_open = _BODY_OPEN.search(document_xml)
+    start = body_open.end()
+    end = document_xml.rindex(b"</w:body>")
+    sect_start = document_xml.rfind(b"<w:sectPr", start, end)
+    if sect_start != -1:
+        sect_end = document_xml.rfind(b"</w:sectPr>", sect_start, end)
+        # 只有紧挨着</w:body>的sectPr才是文档级的节属性
+        if sect_end != -1 and not document_xml[sect_end + 11 : end].strip():
+            return document_xml[start:sect_start], document_xml[sect_start:end]
+    return document_xml[start:end], b""
+
+
+def merge_docx_stream(sources, output_file):
+    """
+    sources为[(docx或jsonl路径, 分隔内容)]，按顺序把每个文件的正文和分隔内容写入output_file。
+    输出包以第一个文件为基础：页面设置取第一个文件的节属性，样式按styleId合并，
+    编号（列表）定义追加到第一个文件的编号部件，id重复的改用新id并改写正文中的引用；
+    第一个文件没有编号部件时沿用原样。其他部件沿用第一个文件
+    """
+    base_path = sources[0][0]
+    other_tags, other_styles, style_paths = [], [], []
+    other_numbering, numbering_paths = [], []
+    with _open_package(base_path) as base:
+        base_tag = _read_root_tag(base)
+        names = base.namelist()
+        base_styles = base.read(STYLES_PART) if STYLES_PART in names else None
+        base_numbering = base.read(NUMBERING_PART) if NUMBERING_PART in names else None
+    # 第一遍只读取每个文件的根元素、样式和编号，都很小；和第一个文件相同的直接跳过。
+    # 结构化文章都使用文章模板（记为None），模板只读取一次
+    others = [path for path, _ in sources[1:] if not _is_structured(path)]
+    if not _is_structured(base_path) and len(others) < len(sources) - 1:
+        others.append(None)
+    for path in others:
+        with zipfile.ZipFile(path or io.BytesIO(template_bytes())) as source:
+            other_tags.append(_read_root_tag(source))
+            names = source.namelist()
+            if base_styles is not None and STYLES_PART in names:
+                styles = source.read(STYLES_PART)
+                if styles != base_styles:
+                    other_styles.append(styles)
+                    style_paths.append(path)
+            if base_numbering is not None and NUMBERING_PART in names:
+                numbering = source.read(NUMBERING_PART)
+                if numbering != base_numbering:
+                    other_numbering.append(numbering)
+                    numbering_paths.append(path)
+    root_tag = _merge_root_tag(base_tag, other_tags)
+    num_maps = {}
+    if other_numbering:
+        base_numbering, maps = _merge_numbering(base_numbering, other_numbering)
+        num_maps = {path: m for path, m in zip(numbering_paths, maps) if m}
+    if base_styles is not None and other_styles:
+        base_styles = _merge_styles(
+            base_styles, other_styles, [num_maps.get(path) for path in style_paths]
+        )
+    del other_tags, other_styles, other_numbering
+
+    with _open_package(base_path) as base, zipfile.ZipFile(
+        output_file, "w", zipfile.ZIP_DEFLATED
+    ) as output:
+        for info in base.infolist():
+            if info.filename == DOCUMENT_PART:
+                _write_document(output, info, base, root_tag, sources, num_maps)
+            elif info.filename == STYLES_PART and base_styles is not None:
+                output.writestr(info, base_styles)
+            elif info.filename == NUMBERING_PART and base_numbering is not None:
+                output.writestr(info, base_numbering)
+            else:
+                with base.open(info) as src, output.open(info, "w") as dst:
+                    while chunk := src.read(1 << 16):
+                        dst.write(chunk)
+
+
+def _write_document(output, info, base, root_tag, sources, num_maps):
+    _, sect_pr = split_body(base.read(DOCUMENT_PART))
+    with output.open(info, "w", force_zip64=True) as dst:
+        dst.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n')
+        dst.write(root_tag)
+        dst.write(b"<w:body>")
+        for path, separator in sources:
+            body = _source_body(path)
+            # 编号id改变了的文件改写正文中的w:numId，结构化文章使用模板的映射
+            num_map = num_maps.get(None if _is_structured(path) else path)
+            if num_map and path != sources[0][0]:
+                body = _renumber(body, _NUM_REF, num_map)
+            dst.write(body)
+            dst.write(separator)
+            del body
+        dst.write(sect_pr)
+        dst.write(b"</w:body></w:document>")
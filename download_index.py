@@ -0,0 +1,292 @@
+import os
+import sqlite3
+import sys
+import threading
+import time
+from urllib.parse import urlsplit, parse_qsl, urlencode
+from output_writers import ARTICLE_EXTENSIONS, index_name
+from utils_func import load_config, setup_logging, get_state_folder
+
+# 调用时传入参数: rebuild [站点名称]，从磁盘重建已下载文章索引
+
+# 规范化链接时去掉的统计参数
+_TRACKING_PARAMS = ("utm_", "spm", "from")
+
+
+def canonical_href(href):
+    """
+    规范化文章链接，作为去重的键：忽略协议、主机名大小写、锚点、统计参数和末尾的斜杠，
+    同一篇文章从不同栏目或以不同协议链接时得到相同的键
+    """
+    if not href:
+        return None
+    parts = urlsplit(href.strip())
+    query = urlencode(
+        sorted(
+            (key, value)
+            for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if not key.lower().startswith(_TRACKING_PARAMS)
+        )
+    )
+    path = parts.path.rstrip("/") or "/"
+    return f"{parts.netloc.lower()}{path}" + (f"?{query}" if query else "")
+
+
+class DownloadIndex:
+    """
+    已下载文章索引，保存在 state 文件夹下的 sqlite 数据库中。
+    以处理后的文件名和文章链接为键，每次运行只加载一次，替代对 save_folder 的 os.walk 扫描。
+    同时记录规范化链接和正文哈希，用于跳过不同栏目或改了标题的重复文章：
+    重复文章记为别名（status为alias，alias_of为原文章），不再生成docx。
+    """
+
+    DB_NAME = "download_index.sqlite3"
+
+    def __init__(self, state_folder, site):
+        self.logger = setup_logging()
+        self.site = site
+        # state_folder为None时使用内存数据库，只在本次运行中有效
+        self.db_path = os.path.join(state_folder, self.DB_NAME) if state_folder else ":memory:"
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS articles (
+                site TEXT NOT NULL,
+                name TEXT NOT NULL,
+                href TEXT,
+                folder TEXT NOT NULL DEFAULT '',
+                status TEXT NOT NULL DEFAULT 'new',
+                merged_into TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (site, name)
+            )
+            """
+        )
+        # 旧版本的数据库补充去重用的列
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(articles)")}
+        for column, column_type in (
+            ("canonical_href", "TEXT"),
+            ("body_hash", "TEXT"),
+            ("alias_of", "TEXT"),
+            ("size", "INTEGER"),
+        ):
+            if column not in columns:
+                self._conn.execute(
+                    f"ALTER TABLE articles ADD COLUMN {column} {column_type}"
+                )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_articles_href ON articles (site, href)"
+        )
+        self._conn.commit()
+        self._load()
+
+    def _load(self):
+        rows = self._conn.execute(
+            """
+            SELECT name, href, canonical_href, body_hash, alias_of
+            FROM articles WHERE site = ?
+            """,
+            (self.site,),
+        ).fetchall()
+        self._names = {row[0] for row in rows}
+        self._hrefs = {row[1] for row in rows if row[1]}
+        # 规范化链接和正文哈希对应的原文章（别名指向其原文章）
+        self._canonical = {}
+        self._hashes = {}
+        for name, href, canonical, body_hash, alias_of in rows:
+            original = alias_of or name
+            if canonical := canonical or canonical_href(href):
+                self._canonical.setdefault(canonical, original)
+            if body_hash:
+                self._hashes.setdefault(body_hash, original)
+
+    def __len__(self):
+        return len(self._names)
+
+    def contains(self, file_name):
+        return file_name in self._names
+
+    def has_href(self, href):
+        return bool(href) and (
+            href in self._hrefs or canonical_href(href) in self._canonical
+        )
+
+    def hrefs(self):
+        """返回{文件名: 链接}"""
+        return dict(
+            self._conn.execute(
+                "SELECT name, href FROM articles WHERE site = ? AND href IS NOT NULL",
+                (self.site,),
+            ).fetchall()
+        )
+
+    def find_href(self, href):
+        """返回规范化链接相同的已下载文章的文件名"""
+        return self._canonical.get(canonical_href(href))
+
+    def find_body(self, body_hash):
+        """返回正文哈希相同的已下载文章的文件名"""
+        return self._hashes.get(body_hash) if body_hash else None
+
+    def size_of(self, file_name):
+        row = self._conn.execute(
+            "SELECT size FROM articles WHERE site = ? AND name = ?",
+            (self.site, file_name),
+        ).fetchone()
+        return row[0] or 0 if row else 0
+
+    def add(self, file_name, href=None, folder="", body_hash=None, size=None):
+        canonical = canonical_href(href)
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO articles (
+                    site, name, href, canonical_href, body_hash, size,
+                    folder, status, updated_at
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, 'new', ?)
+                ON CONFLICT (site, name) DO UPDATE SET
+                    href = COALESCE(excluded.href, articles.href),
+                    canonical_href = COALESCE(
+                        excluded.canonical_href, articles.canonical_href
+                    ),
+                    body_hash = COALESCE(excluded.body_hash, articles.body_hash),
+                    size = COALESCE(excluded.size, articles.size),
+                    folder = excluded.folder,
+                    updated_at = excluded.updated_at
+                """,
+                (
+                    self.site,
+                    file_name,
+                    href,
+                    canonical,
+                    body_hash,
+                    size,
+                    folder,
+                    time.time(),
+                ),
+            )
+            self._conn.commit()
+        self._names.add(file_name)
+        if href:
+            self._hrefs.add(href)
+            self._canonical.setdefault(canonical, file_name)
+        if body_hash:
+            self._hashes.setdefault(body_hash, file_name)
+
+    def add_alias(self, file_name, alias_of, href=None, body_hash=None):
+        """记录重复文章：不生成docx，只记下它是哪篇已下载文章的别名"""
+        canonical = canonical_href(href)
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO articles (
+                    site, name, href, canonical_href, body_hash, alias_of,
+                    status, updated_at
+                )
+                VALUES (?, ?, ?, ?, ?, ?, 'alias', ?)
+                ON CONFLICT (site, name) DO NOTHING
+                """,
+                (
+                    self.site,
+                    file_name,
+                    href,
+                    canonical,
+                    body_hash,
+                    alias_of,
+                    time.time(),
+                ),
+            )
+            self._conn.commit()
+        self._names.add(file_name)
+        if href:
+            self._hrefs.add(href)
+            self._canonical.setdefault(canonical, alias_of)
+
+    def move(self, file_names, folder):
+        """归档移动后更新文件所在的相对目录"""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                """
+                INSERT INTO articles (site, name, folder, status, updated_at)
+                VALUES (?, ?, ?, 'new', ?)
+                ON CONFLICT (site, name) DO UPDATE SET
+                    folder = excluded.folder, updated_at = excluded.updated_at
+                """,
+                [(self.site, name, folder, now) for name in file_names],
+            )
+            self._conn.commit()
+        self._names.update(file_names)
+
+    def mark_merged(self, file_names, merged_into):
+        """合并后记录文件被合并到哪个文档"""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                """
+                UPDATE articles SET status = 'merged', merged_into = ?, updated_at = ?
+                WHERE site = ? AND name = ?
+                """,
+                [(merged_into, now, self.site, name) for name in file_names],
+            )
+            self._conn.commit()
+
+    def rebuild(self, save_folder):
+        """从磁盘重建索引，保留已有的href记录；其他输出格式的文件按对应的docx文件名记录"""
+        found = {}
+        for root, _, files in os.walk(save_folder):
+            folder = os.path.relpath(root, save_folder)
+            folder = "" if folder == "." else folder.replace("\\", "/")
+            for name in files:
+                if name.endswith(ARTICLE_EXTENSIONS):
+                    found[index_name(name)] = folder
+
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                """
+                INSERT INTO articles (site, name, folder, status, updated_at)
+                VALUES (?, ?, ?, 'new', ?)
+                ON CONFLICT (site, name) DO UPDATE SET
+                    folder = excluded.folder, updated_at = excluded.updated_at
+                """,
+                [(self.site, name, folder, now) for name, folder in found.items()],
+            )
+            self._conn.commit()
+        self._load()
+        self.logger.info(f"【{self.site}】从磁盘重建索引完成，共{len(found)}个文件")
+        return len(found)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def rebuild_index(site=None, config_path="config/config.yaml"):
+    config = load_config(config_path)
+    state_folder = get_state_folder(config)
+    root_folder = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), config.get("save_folder", "docx")
+    )
+    for item in config.get("news_sites"):
+        name = item.get("name")
+        if site and name != site:
+            continue
+        save_folder = os.path.join(root_folder, name)
+        if not os.path.exists(save_folder):
+            continue
+        index = DownloadIndex(state_folder, name)
+        index.rebuild(save_folder)
+        index.close()
+
+
+if __name__ == "__main__":
+    args = sys.argv
+    if len(args) < 2 or args[1] != "rebuild":
+        print("参数错误, 请传入参数: rebuild [站点名称]")
+        sys.exit(1)
+
+    rebuild_index(args[2] if len(args) > 2 else None)
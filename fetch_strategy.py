@@ -0,0 +1,83 @@
+import json
+import os
+import re
+import threading
+from urllib.parse import urlparse
+from utils_func import setup_logging
+
+
+class FetchStrategy:
+    """
+    混合抓取策略：先用 HTTP 请求，页面缺少预期内容时再用浏览器。
+    按地址模式（数字替换为#）记录 HTTP 成功和失败的次数，保存在 state 文件夹，
+    之后的运行直接为每类地址选择合适的抓取方式。
+    """
+
+    FILE_NAME = "fetch_strategy.json"
+    # 至少尝试几次HTTP后才判断该类地址是否需要浏览器
+    MIN_SAMPLES = 3
+    # 已判定需要浏览器的地址，每隔多少次重新用HTTP试一次，以便网站改版后恢复
+    RETRY_EVERY = 20
+
+    def __init__(self, state_folder, mode="hybrid"):
+        self.logger = setup_logging()
+        # 抓取方式：hybrid（先HTTP后浏览器）、http（只用HTTP）、browser（只用浏览器）
+        self.mode = mode
+        self.path = os.path.join(state_folder, self.FILE_NAME)
+        self._lock = threading.Lock()
+        self.stats = self._load()
+        self.http_hits = 0
+        self.browser_fallbacks = 0
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except Exception as e:
+            self.logger.warning(f"读取抓取策略统计失败，重新统计：{e}")
+            return {}
+
+    def save(self):
+        with self._lock:
+            with open(self.path, "w", encoding="utf-8") as file:
+                json.dump(self.stats, file, ensure_ascii=False, indent=2)
+
+    @staticmethod
+    def url_pattern(url):
+        parsed = urlparse(url)
+        path = re.sub(r"\d+", "#", parsed.path)
+        return f"{parsed.netloc}{path}"
+
+    def _entry(self, url):
+        return self.stats.setdefault(
+            self.url_pattern(url), {"http_ok": 0, "http_miss": 0, "browser": 0}
+        )
+
+    def prefer_http(self, url):
+        if self.mode != "hybrid":
+            return self.mode == "http"
+        with self._lock:
+            entry = self._entry(url)
+            tried = entry["http_ok"] + entry["http_miss"]
+            if tried < self.MIN_SAMPLES or entry["http_ok"] >= entry["http_miss"]:
+                return True
+            return entry["browser"] % self.RETRY_EVERY == 0
+
+    def record_http(self, url, ok):
+        with self._lock:
+            self._entry(url)["http_ok" if ok else "http_miss"] += 1
+            if ok:
+                self.http_hits += 1
+
+    def record_browser(self, url):
+        with self._lock:
+            self._entry(url)["browser"] += 1
+            self.browser_fallbacks += 1
+
+    def report(self, launch_count=0):
+        self.logger.info(
+            f"抓取策略：HTTP直接获取{self.http_hits}个页面，浏览器获取{self.browser_fallbacks}个页面，"
+            + (f"启动firefox {launch_count}次" if launch_count else "未启动firefox")
+        )
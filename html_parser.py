@@ -0,0 +1,143 @@
+import codecs
+import re
+from bs4 import BeautifulSoup, SoupStrainer
+from metrics import observe
+
+try:
+    import lxml  # noqa: F401
+
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+# HTML解析后端：auto时优先使用lxml，未安装则使用html.parser
+_parser_backend = "lxml" if LXML_AVAILABLE else "html.parser"
+
+# 在页面前多少字节中查找<meta>声明的编码
+META_SCAN_BYTES = 4096
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([\w-]+)""", re.I)
+_HEADER_CHARSET = re.compile(r"charset\s*=\s*[\"']?([\w-]+)", re.I)
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+)
+# gb2312/gbk页面中常混有扩展字符，统一用超集gb18030解码
+_CHARSET_ALIASES = {"gb2312": "gb18030", "gbk": "gb18030", "x-gbk": "gb18030"}
+
+
+def set_parser_backend(name="auto"):
+    """设置解析后端：auto、lxml 或 html.parser"""
+    global _parser_backend
+    if name == "auto" or (name == "lxml" and not LXML_AVAILABLE):
+        name = "lxml" if LXML_AVAILABLE else "html.parser"
+    _parser_backend = name
+    return _parser_backend
+
+
+def get_parser_backend():
+    return _parser_backend
+
+
+def _normalize_charset(charset):
+    charset = charset.strip().lower()
+    charset = _CHARSET_ALIASES.get(charset, charset)
+    try:
+        return codecs.lookup(charset).name
+    except LookupError:
+        return None
+
+
+def detect_charset(headers, content, default="utf-8"):
+    """
+    一次确定页面编码，不需要先解析一遍HTML：
+    依次检查BOM、HTTP头的Content-Type、页面开头的<meta>声明
+    """
+    for bom, charset in _BOMS:
+        if content.startswith(bom):
+            return charset
+    content_type = (headers or {}).get("content-type", "")
+    if match := _HEADER_CHARSET.search(content_type):
+        if charset := _normalize_charset(match.group(1)):
+            return charset
+    if match := _META_CHARSET.search(content[:META_SCAN_BYTES]):
+        if charset := _normalize_charset(match.group(1).decode("ascii", "ignore")):
+            return charset
+    return default
+
+
+def decode_content(headers, content):
+    charset = detect_charset(headers, content)
+    if content.startswith(codecs.BOM_UTF8):
+        content = content[len(codecs.BOM_UTF8) :]
+    return content.decode(charset, errors="replace")
+
+
+def class_strainer(names, classes):
+    """
+    只解析class属性包含classes之一的names标签及其子树。
+    解析时class还是未拆分的字符串，用正则按单词匹配
+    """
+    pattern = "|".join(re.escape(name) for name in classes)
+    return SoupStrainer(names, class_=re.compile(rf"(?:^|\s)(?:{pattern})(?:\s|$)"))
+
+
+def make_soup(markup, parse_only=None):
+    """用当前的解析后端解析HTML，parse_only为SoupStrainer时只解析需要的子树"""
+    with observe("parse_html"):
+        return BeautifulSoup(markup, _parser_backend, parse_only=parse_only)
+
+
+def _has_class(tag, name):
+    classes = tag.get("class") or ()
+    if isinstance(classes, str):
+        classes = classes.split()
+    return name in classes
+
+
+class ListSpec:
+    """
+    列表页的提取规则，各站点声明为类属性或模块常量，创建时预先整理好按标签名查找的字段表。
+    items 为列表条目：标签 或 (标签, class)；fields 为条目中要提取的字段：{字段名: 标签 或 (标签, class)}，
+    与 find 相同取第一个匹配的元素；links 为True时同时收集条目中全部的a标签。
+    每个条目的子树只遍历一次，不再对每个字段分别调用 find
+    """
+
+    def __init__(self, items, fields=None, links=False):
+        self.item_name, self.item_class = items if isinstance(items, tuple) else (items, None)
+        self.links = links
+        self._field_count = len(fields or {})
+        # 标签名 -> [(字段名, class)]
+        self._lookup = {}
+        for field, target in (fields or {}).items():
+            name, class_name = target if isinstance(target, tuple) else (target, None)
+            self._lookup.setdefault(name, []).append((field, class_name))
+
+    def find_items(self, container):
+        if self.item_class:
+            return container.find_all(self.item_name, class_=self.item_class)
+        return container.find_all(self.item_name)
+
+    def extract(self, item):
+        """返回 {字段名: 元素}，没有找到的字段不在结果中；links为True时 "links" 为全部a标签"""
+        found = {}
+        links = [] if self.links else None
+        lookup = self._lookup
+        for node in item.descendants:
+            name = node.name
+            if name is None:
+                continue
+            if links is not None and name == "a":
+                links.append(node)
+            targets = lookup.get(name)
+            if not targets:
+                continue
+            for field, class_name in targets:
+                if field not in found and (class_name is None or _has_class(node, class_name)):
+                    found[field] = node
+            # 不需要收集a标签时，字段找齐即可停止遍历
+            if links is None and len(found) == self._field_count:
+                break
+        if links is not None:
+            found["links"] = links
+        return found
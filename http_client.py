@@ -0,0 +1,236 @@
+import random
+import threading
+import time
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from metrics import FETCH_BYTES, HTTP_REQUESTS, counter, gauge
+
+HTTP_RETRIES = counter("scraper_http_retries_total", "HTTP请求重试次数")
+CIRCUIT_OPENS = counter("scraper_http_circuit_open_total", "主机熔断次数")
+CONCURRENCY_LIMIT = gauge("scraper_http_concurrency_limit", "主机当前的并发上限")
+
+# 需要重试的状态码：限流和服务器临时错误
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """主机熔断期间直接失败，不发送请求"""
+
+
+class HostController:
+    """
+    单个主机的请求控制：
+    - 令牌桶：每秒最多rate个请求，允许burst个突发
+    - AIMD并发上限：请求正常时每完成约limit个请求上限加1，出错、限流或响应明显变慢时减半，
+      最小为1、最大为max_limit；短时间内多个失败只减半一次
+    - 熔断：连续失败threshold次后，cooldown秒内直接失败；之后放行一个探测请求，成功则恢复
+    """
+
+    # 两次减半的最小间隔，单位：秒
+    DECREASE_INTERVAL = 1.0
+    # 响应时间超过平均值的倍数且超过下限时视为变慢，下限单位：秒
+    SLOW_FACTOR = 3.0
+    SLOW_FLOOR = 2.0
+    # Retry-After 最多暂停的时间，单位：秒
+    MAX_PAUSE = 60
+
+    def __init__(self, host, max_limit, rate=0, burst=0, threshold=5, cooldown=30):
+        self.host = host
+        self.max_limit = max(1, int(max_limit))
+        self.limit = float(self.max_limit)
+        self.rate = float(rate or 0)
+        self.burst = max(1.0, float(burst or self.rate or 1))
+        self.tokens = self.burst
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._refilled = time.monotonic()
+        self._paused_until = 0
+        self._latency = None
+        self._last_decrease = 0
+        self._failures = 0
+        self._open_until = 0
+        self._probing = False
+        CONCURRENCY_LIMIT.set(self.max_limit, host=host)
+
+    def acquire(self):
+        with self._cond:
+            if self._open_until:
+                if time.monotonic() < self._open_until or self._probing:
+                    raise CircuitOpenError(f"{self.host} 熔断中，暂不请求")
+                self._probing = True
+            while self._in_flight >= int(self.limit):
+                self._cond.wait()
+            self._in_flight += 1
+        self._take_token()
+
+    def _take_token(self):
+        if not self.rate:
+            return
+        while True:
+            with self._cond:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.burst, self.tokens + (now - self._refilled) * self.rate
+                )
+                self._refilled = now
+                wait = self._paused_until - now
+                if wait <= 0 and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(wait, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def release(self, latency=None, ok=True, retry_after=None):
+        """latency为None时只归还并发名额（请求未发出或出错与主机无关）"""
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+            if latency is None:
+                if self._probing:
+                    self._probing = False
+                return
+            now = time.monotonic()
+            if retry_after:
+                self._paused_until = now + min(retry_after, self.MAX_PAUSE)
+            slow = self._latency is not None and latency > max(
+                self.SLOW_FACTOR * self._latency, self.SLOW_FLOOR
+            )
+            if ok:
+                self._latency = (
+                    latency if self._latency is None else self._latency * 0.8 + latency * 0.2
+                )
+                self._failures = 0
+                if self._open_until:
+                    self._open_until = 0
+                    self._probing = False
+            else:
+                self._failures += 1
+                if self._probing or self._failures >= self.threshold:
+                    self._open_until = now + self.cooldown
+                    self._probing = False
+                    CIRCUIT_OPENS.inc(host=self.host)
+            if not ok or slow:
+                if now - self._last_decrease >= self.DECREASE_INTERVAL:
+                    self._last_decrease = now
+                    self.limit = max(1.0, self.limit / 2)
+            else:
+                self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+            CONCURRENCY_LIMIT.set(int(self.limit), host=self.host)
+
+
+class RetryBudget:
+    """
+    重试预算：每个请求存入ratio个令牌，每次重试取出1个，
+    主机大面积出错时重试次数不超过请求数的ratio倍，避免重试放大故障
+    """
+
+    def __init__(self, ratio=0.2, minimum=5, maximum=50):
+        self.ratio = ratio
+        self.maximum = maximum
+        self.tokens = float(minimum)
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.maximum, self.tokens + self.ratio)
+
+    def withdraw(self):
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+def retry_after_seconds(response):
+    value = response.headers.get("Retry-After") if response is not None else None
+    try:
+        return max(0.0, float(value)) if value else None
+    except ValueError:
+        return None
+
+
+class HttpFetcher:
+    """
+    共享连接池的 HTTP 客户端，所有请求复用同一个 requests.Session（keep-alive），
+    每个主机由 HostController 控制速率、并发和熔断；连接错误、超时、限流和5xx
+    按带抖动的指数退避重试，重试次数受 RetryBudget 限制。线程安全，可在多个抓取线程中共用。
+    """
+
+    # 重试退避的基数和上限，单位：秒
+    BACKOFF_BASE = 0.5
+    BACKOFF_MAX = 10
+
+    def __init__(
+        self,
+        pool_size=10,
+        per_host_limit=4,
+        timeout=30,
+        rate=0,
+        max_retries=3,
+        retry_budget=0.2,
+    ):
+        self.timeout = timeout
+        self.per_host_limit = max(1, int(per_host_limit))
+        self.rate = rate
+        self.max_retries = max_retries
+        self.budget = RetryBudget(retry_budget)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def host_controller(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = HostController(
+                    host, self.per_host_limit, self.rate
+                )
+            return self._hosts[host]
+
+    def get(self, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        controller = self.host_controller(url)
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            controller.acquire()
+            start = time.monotonic()
+            response, error = None, None
+            try:
+                response = self.session.get(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            except Exception:
+                controller.release()
+                raise
+            retryable = error is not None or response.status_code in RETRY_STATUS
+            retry_after = retry_after_seconds(response)
+            controller.release(time.monotonic() - start, not retryable, retry_after)
+            if response is not None:
+                HTTP_REQUESTS.inc(host=controller.host, status=response.status_code)
+                FETCH_BYTES.inc(len(response.content), method="http", host=controller.host)
+            if not retryable:
+                return response
+            if attempt >= self.max_retries or not self.budget.withdraw():
+                if error is not None:
+                    raise error
+                return response
+            # 全抖动的指数退避；服务器给出Retry-After时按其等待
+            delay = random.uniform(
+                0, min(self.BACKOFF_MAX, self.BACKOFF_BASE * 2**attempt)
+            )
+            if retry_after is not None:
+                delay = min(retry_after, HostController.MAX_PAUSE)
+            attempt += 1
+            HTTP_RETRIES.inc(host=controller.host)
+            time.sleep(delay)
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+import threading
+from utils_func import setup_logging
+
+
+class ListPageCache:
+    """
+    列表页缓存，按地址记录 ETag、Last-Modified 和列表内容的哈希。
+    再次请求时带上 If-None-Match / If-Modified-Since，返回304或列表内容哈希不变时，
+    跳过该列表页的解析和逐篇的 is_downloaded 检查。
+    本次运行记录的新值先暂存，整次运行没有失败的文章时才 commit，避免漏掉需要重试的文章。
+    """
+
+    def __init__(self, state_folder, site, enabled=True):
+        self.logger = setup_logging()
+        self.enabled = enabled
+        self.path = os.path.join(state_folder, f"list_cache_{site}.json")
+        self._lock = threading.Lock()
+        self.entries = self._load() if enabled else {}
+        self._pending = {}
+        self._not_modified = set()
+        self.requests = 0
+        self.not_modified_hits = 0
+        self.hash_hits = 0
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except Exception as e:
+            self.logger.warning(f"读取列表页缓存失败，重新缓存：{e}")
+            return {}
+
+    @property
+    def skipped(self):
+        return self.not_modified_hits + self.hash_hits
+
+    def conditional_headers(self, url):
+        """生成条件请求头"""
+        entry = self.entries.get(url) if self.enabled else None
+        if not entry:
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def record_response(self, url, response):
+        """记录条件请求的结果，返回True表示服务器返回304；出错的响应（非2xx）不记录"""
+        if not self.enabled:
+            return False
+        if response.status_code == 304:
+            with self._lock:
+                self._not_modified.add(url)
+            return True
+        if not 200 <= response.status_code < 300:
+            return False
+        with self._lock:
+            pending = self._pending.setdefault(url, {})
+            pending["etag"] = response.headers.get("ETag")
+            pending["last_modified"] = response.headers.get("Last-Modified")
+        return False
+
+    def unchanged(self, url, content):
+        """
+        判断列表页是否没有变化：服务器返回过304，或列表内容的哈希与上次相同。
+        content为列表所在区域的HTML，为None时视为有变化
+        """
+        if not self.enabled:
+            return False
+        with self._lock:
+            self.requests += 1
+            if url in self._not_modified:
+                self.not_modified_hits += 1
+                return True
+            if content is None:
+                return False
+            digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+            pending = self._pending.setdefault(url, {})
+            pending["hash"] = digest
+            if self.entries.get(url, {}).get("hash") == digest:
+                self.hash_hits += 1
+                return True
+            return False
+
+    def commit(self):
+        """本次运行成功处理完所有文章后，保存暂存的缓存信息"""
+        if not self.enabled or not self._pending:
+            return
+        with self._lock:
+            for url, pending in self._pending.items():
+                self.entries.setdefault(url, {}).update(pending)
+            self._pending = {}
+            with open(self.path, "w", encoding="utf-8") as file:
+                json.dump(self.entries, file, ensure_ascii=False, indent=2)
+
+    def report(self):
+        if not self.enabled or not self.requests:
+            return
+        self.logger.info(
+            f"列表页缓存：请求{self.requests}次，304未修改{self.not_modified_hits}次，"
+            f"内容未变化{self.hash_hits}次，命中率{self.skipped / self.requests:.0%}"
+        )
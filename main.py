@@ -1,32 +1,56 @@
-import schedule
-import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import asyncio
+import os
 from browser_hubeigov import browser_func as browser_func_hubei
 from browser_renmin import browser_func as browser_func_renmin
-from utils_func import load_config, setup_logging
+from browser_renmin_jp import browser_func as browser_func_renmin_jp
+from scheduler import RunHook, ScheduledJob, Scheduler
+from utils_func import load_config, setup_logging, get_state_folder
 from syno_drive_orgnizer import process_stars_move_api
+import metrics
 
 # 配置日志
 logger = setup_logging()
 # 读取 yaml 文件，获取配置信息
 
 config = load_config()
+metrics.configure(config)
 
+# 站点名称与爬取函数的对应关系，news_sites中的站点按name查找
+SITE_JOBS = {
+    "hubeigov": browser_func_hubei,
+    "renmin": browser_func_renmin,
+    "renmin_jp": browser_func_renmin_jp,
+}
 
-# 定义并行爬取任务函数
-def job_scraper():
-    logger.info("开始执行任务")
-    process_stars_move_api()
 
-    with ThreadPoolExecutor(max_workers=2) as executor:
-        future_hubei = executor.submit(browser_func_hubei)
-        future_renmin = executor.submit(browser_func_renmin)
+def build_jobs():
+    # 每天的执行时间，站点没有单独设置时使用
+    scheduletime = config.get("SCHEDULE_TIME", ["08:00"])
+    # 如果 schedule_time 为多个时间组成的列表，则分别在每个时间点执行一次
+    if not isinstance(scheduletime, list):
+        scheduletime = [scheduletime]
 
-        results = [
-            future.result() for future in as_completed([future_hubei, future_renmin])
-        ]
-
-    return all(results)
+    # 爬取前先移动加星文件到指定文件夹, 防止掉加星；同时触发的站点只移动一次
+    stars_move = RunHook("stars_move", process_stars_move_api)
+    jobs = []
+    for item in config.get("news_sites"):
+        name = item.get("name")
+        if name not in SITE_JOBS:
+            logger.warning(f"没有站点 {name} 的爬取任务，跳过")
+            continue
+        times = item.get("schedule_time", scheduletime)
+        if not isinstance(times, list):
+            times = [times]
+        jobs.append(
+            ScheduledJob(
+                name, SITE_JOBS[name], times, item.get("interval"), before=stars_move
+            )
+        )
+        logger.info(
+            f"定时任务【{name}】已设置，每天的 {times} 点执行一次"
+            + (f"，并每隔{item.get('interval')}分钟执行一次" if item.get("interval") else "")
+        )
+    return jobs
 
 
 if __name__ == "__main__":
@@ -37,31 +61,18 @@ if __name__ == "__main__":
         else:
             logger.info("通知功能未启用")
 
-        if config.get("debug_mode", False):
-            logger.info("调试模式已开启")
-            success_flag = job_scraper()
-            if success_flag:
-                logger.info("首次请求成功")
-            else:
-                logger.error("首次请求失败")
-
-        # 设置每天的执行时间
-        scheduletime = config.get("SCHEDULE_TIME", ["08:00"])
-        interval = int(config.get("INTERVAL", 10)) * 60  # 单位：分钟
-
-        # 定义定时任务，如果 schedule_time 为多个时间组成的列表，则分别在每个时间点执行一次
-        if not isinstance(scheduletime, list):
-            scheduletime = [scheduletime]
-
-        for every_time in scheduletime:
-            schedule.every().day.at(every_time).do(job_scraper)
-
-        logger.info(f"定时任务已设置，每天的 {scheduletime} 点执行一次")
+        debug_mode = config.get("debug_mode", False)
+        if debug_mode:
+            logger.info("调试模式已开启，启动后立即执行一次所有任务")
 
-        # 主循环
-        while True:
-            schedule.run_pending()
-            time.sleep(interval)  # 每隔INTERVAL检查一次是否有任务需要执行
+        scheduler = Scheduler(
+            build_jobs(),
+            max_concurrent=config.get("max_concurrent_jobs", 2),
+            state_file=os.path.join(
+                get_state_folder(config), "scheduler_state.json"
+            ),
+        )
+        asyncio.run(scheduler.run(run_now=debug_mode))
     except Exception as e:
         logger.error(f"主程序出错：{e}")
         exit(1)
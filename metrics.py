@@ -0,0 +1,209 @@
+import atexit
+import functools
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from utils_func import setup_logging, get_state_folder
+
+# 进程内的耗时和计数指标，以Prometheus文本格式写入 <metrics_folder>/<脚本名>.prom，
+# 可以由node_exporter的textfile collector采集。定时任务每次运行结束后写入一次，进程退出时再写入一次。
+
+# 耗时直方图的分桶，单位：秒
+LATENCY_BUCKETS = (
+    0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300
+)
+
+_lock = threading.Lock()
+_metrics = {}
+_settings = {"enabled": False, "folder": None}
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.values = {}
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        return [
+            f"{self.name}{_format_labels(key)} {value}"
+            for key, value in sorted(self.values.items())
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with _lock:
+            self.values[_label_key(labels)] = value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        # 标签 -> [各分桶的计数, 总和, 次数]
+        self.values = {}
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with _lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][index] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self):
+        lines = []
+        for key, (counts, total, count) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(key, [("le", str(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(key, [("le", "+Inf")])
+            lines.append(f"{self.name}_bucket{labels} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {total:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+def _register(metric_class, name, help_text):
+    with _lock:
+        if name not in _metrics:
+            _metrics[name] = metric_class(name, help_text)
+        return _metrics[name]
+
+
+def counter(name, help_text):
+    return _register(Counter, name, help_text)
+
+
+def gauge(name, help_text):
+    return _register(Gauge, name, help_text)
+
+
+def histogram(name, help_text):
+    return _register(Histogram, name, help_text)
+
+
+STAGE_SECONDS = histogram("scraper_stage_seconds", "各阶段的耗时（秒）")
+ARTICLES = counter(
+    "scraper_articles_total", "处理的文章数量，result为new、skipped、duplicate、failed"
+)
+FETCH_BYTES = counter("scraper_fetch_bytes_total", "抓取的页面字节数")
+HTTP_REQUESTS = counter("scraper_http_requests_total", "HTTP请求数量")
+NOTIFY_MESSAGES = counter(
+    "scraper_notify_messages_total", "通知发送结果，result为sent、retry、dropped"
+)
+JOB_RUNS = counter("scraper_job_runs_total", "定时任务运行次数")
+JOB_DURATION = gauge("scraper_job_last_duration_seconds", "定时任务上次运行的耗时（秒）")
+JOB_LAST_SUCCESS = gauge(
+    "scraper_job_last_success_timestamp_seconds", "定时任务上次成功的时间"
+)
+
+
+@contextmanager
+def observe(stage, site=""):
+    """记录代码块的耗时，出错时同样记录"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage, site=site)
+
+
+def timed(stage):
+    """方法装饰器，记录每次调用的耗时，站点取实例的source_name"""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            site = getattr(args[0], "source_name", "") if args else ""
+            with observe(stage, site):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def configure(config):
+    """按配置启用导出，进程退出时写入一次"""
+    enabled = bool(config.get("metrics", True))
+    folder = config.get("metrics_folder") or os.path.join(
+        get_state_folder(config), "metrics"
+    )
+    with _lock:
+        first = _settings["folder"] is None
+        _settings.update(enabled=enabled, folder=folder)
+    if first:
+        atexit.register(write_textfile)
+
+
+def render():
+    with _lock:
+        metrics = sorted(_metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            samples = metric.render()
+            if not samples:
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(job=None):
+    """
+    写入 <metrics_folder>/<job>.prom，job默认为脚本名；
+    先写临时文件再替换，采集时不会读到一半的内容
+    """
+    if not _settings["enabled"] or not _settings["folder"]:
+        return None
+    job = job or os.path.splitext(os.path.basename(sys.argv[0]))[0].strip("-") or "python"
+    path = os.path.join(_settings["folder"], f"{job}.prom")
+    try:
+        os.makedirs(_settings["folder"], exist_ok=True)
+        temp_file = f"{path}.{os.getpid()}.tmp"
+        with open(temp_file, "w", encoding="utf-8") as file:
+            file.write(render())
+        os.replace(temp_file, path)
+        return path
+    except OSError as e:
+        setup_logging().warning(f"写入指标文件失败：{e}")
+        return None
@@ -0,0 +1,253 @@
+import atexit
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from utils_func import setup_logging, load_config, get_state_folder, MQTTClient
+from metrics import observe, NOTIFY_MESSAGES
+
+
+class Notifier:
+    """
+    后台通知发送：webhook 和 MQTT 消息先写入 state 文件夹中的 SQLite 队列，
+    由后台线程发送，调用方不等待网络。
+    - MQTT 保持一个长连接，webhook 复用同一个 requests.Session
+    - 相同的 MQTT 消息（例如多次 update-drive）在发送前合并为一条
+    - 发送失败按指数退避重试，队列在磁盘上，进程重启后继续发送
+    多个进程共用同一个队列文件，发送前先占用消息，避免重复发送。
+    """
+
+    FILE_NAME = "notify_queue.sqlite3"
+    # 后台线程没有消息时的检查间隔，单位：秒
+    POLL_INTERVAL = 1
+    # 占用消息的时长，超过后其他进程可以重新发送，单位：秒
+    LEASE_SECONDS = 60
+    # 重试的退避时间，单位：秒
+    BACKOFF_BASE = 5
+    BACKOFF_MAX = 600
+    # 超过次数仍失败的消息丢弃
+    MAX_ATTEMPTS = 20
+    # 进程退出前等待队列发送完的最长时间，单位：秒
+    FLUSH_TIMEOUT = 15
+
+    def __init__(self, state_folder, secret_path="config/secret.yaml", timeout=10):
+        self.logger = setup_logging()
+        self.secret_path = secret_path
+        self.timeout = timeout
+        self.path = os.path.join(state_folder, self.FILE_NAME)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._idle = threading.Event()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                target TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                coalesce_key TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_try REAL NOT NULL,
+                lease_until REAL NOT NULL DEFAULT 0
+            )"""
+        )
+        self._conn.commit()
+        self._session = None
+        self._mqtt = None
+        self.sent = 0
+        self.coalesced = 0
+        self._thread = threading.Thread(target=self._run, name="notifier", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    # ------------------------------------------------------- #
+    # 入队，调用方只写入队列，立即返回
+
+    def _enqueue(self, kind, target, payload, coalesce_key=None, delay=0):
+        now = time.time()
+        with self._lock:
+            if coalesce_key:
+                # 队列中还没开始发送的相同消息只保留一条，发送时间取较晚的一个
+                row = self._conn.execute(
+                    "SELECT id FROM messages WHERE coalesce_key = ? AND lease_until <= ?",
+                    (coalesce_key, now),
+                ).fetchone()
+                if row:
+                    self._conn.execute(
+                        "UPDATE messages SET next_try = MAX(next_try, ?) WHERE id = ?",
+                        (now + delay, row[0]),
+                    )
+                    self._conn.commit()
+                    self.coalesced += 1
+                    return
+            self._conn.execute(
+                "INSERT INTO messages (kind, target, payload, coalesce_key, next_try) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (kind, target, payload, coalesce_key, now + delay),
+            )
+            self._conn.commit()
+            self._idle.clear()
+        self._wakeup.set()
+
+    def webhook(self, url, payload):
+        self._enqueue("webhook", url, json.dumps(payload, ensure_ascii=False))
+
+    def mqtt(self, payload, topic="nas_cmd/execute", delay=0):
+        """相同主题和内容的消息在发送前合并，delay为延迟发送的秒数"""
+        self._enqueue("mqtt", topic, payload, f"mqtt:{topic}:{payload}", delay)
+
+    # ------------------------------------------------------- #
+    # 后台发送
+
+    def _claim(self):
+        """占用所有到期的消息，返回 [(id, kind, target, payload, attempts)]"""
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, kind, target, payload, attempts FROM messages "
+                "WHERE next_try <= ? AND lease_until <= ? ORDER BY id",
+                (now, now),
+            ).fetchall()
+            claimed = []
+            for row in rows:
+                cursor = self._conn.execute(
+                    "UPDATE messages SET lease_until = ? WHERE id = ? AND lease_until <= ?",
+                    (now + self.LEASE_SECONDS, row[0], now),
+                )
+                if cursor.rowcount:
+                    claimed.append(row)
+            self._conn.commit()
+        return claimed
+
+    def _pending_count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+
+    def _next_due(self):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(MAX(next_try, lease_until)) FROM messages"
+            ).fetchone()
+        return row[0]
+
+    def _run(self):
+        while True:
+            try:
+                batch = self._claim()
+                for message_id, kind, target, payload, attempts in batch:
+                    self._deliver(message_id, kind, target, payload, attempts)
+                if not batch:
+                    if not self._pending_count():
+                        self._idle.set()
+                    next_due = self._next_due()
+                    wait = self.POLL_INTERVAL
+                    if next_due is not None:
+                        wait = min(max(next_due - time.time(), 0.05), self.POLL_INTERVAL)
+                    self._wakeup.wait(wait)
+                    self._wakeup.clear()
+            except Exception as e:
+                self.logger.error(f"通知发送线程出错：{e}")
+                time.sleep(self.POLL_INTERVAL)
+
+    def _deliver(self, message_id, kind, target, payload, attempts):
+        with observe(f"notify_{kind}"):
+            sent = self._send(message_id, kind, target, payload, attempts)
+        NOTIFY_MESSAGES.inc(kind=kind, result=sent)
+
+    def _send(self, message_id, kind, target, payload, attempts):
+        """发送一条消息，返回sent、retry或dropped"""
+        try:
+            if kind == "webhook":
+                self.logger.info(f"发送消息到webhook: {target}")
+                response = self._get_session().post(
+                    target, data=payload.encode("utf-8"),
+                    headers={"Content-Type": "application/json"},
+                    timeout=self.timeout,
+                )
+                response.raise_for_status()
+            else:
+                self._get_mqtt().publish(target, payload)
+        except Exception as e:
+            attempts += 1
+            with self._lock:
+                if attempts >= self.MAX_ATTEMPTS:
+                    self.logger.error(f"通知发送失败{attempts}次，放弃：{kind} {target} {e}")
+                    self._conn.execute("DELETE FROM messages WHERE id = ?", (message_id,))
+                    result = "dropped"
+                else:
+                    backoff = min(self.BACKOFF_BASE * 2 ** (attempts - 1), self.BACKOFF_MAX)
+                    backoff *= random.uniform(0.8, 1.2)
+                    self.logger.warning(
+                        f"通知发送失败，{backoff:.0f}秒后第{attempts + 1}次尝试：{kind} {target} {e}"
+                    )
+                    self._conn.execute(
+                        "UPDATE messages SET attempts = ?, next_try = ?, lease_until = 0 "
+                        "WHERE id = ?",
+                        (attempts, time.time() + backoff, message_id),
+                    )
+                    result = "retry"
+                self._conn.commit()
+            return result
+        with self._lock:
+            self._conn.execute("DELETE FROM messages WHERE id = ?", (message_id,))
+            self._conn.commit()
+        self.sent += 1
+        return "sent"
+
+    def _get_session(self):
+        if self._session is None:
+            self._session = requests.Session()
+            self._session.mount("http://", HTTPAdapter(pool_maxsize=2))
+            self._session.mount("https://", HTTPAdapter(pool_maxsize=2))
+        return self._session
+
+    def _get_mqtt(self):
+        # MQTT长连接，断开后由paho自动重连，publish时未连接会重新连接
+        if self._mqtt is None:
+            mqtt_config = load_config(config_path=self.secret_path).get("mqtt", {})
+            self._mqtt = MQTTClient(
+                mqtt_config.get("host", "localhost"),
+                mqtt_config.get("port", 1883),
+                mqtt_config.get("user", None),
+                mqtt_config.get("pass", None),
+                mqtt_config.get("client_id", None),
+            )
+            self._mqtt.client.reconnect_delay_set(1, 60)
+        return self._mqtt
+
+    def flush(self, timeout=None):
+        """
+        等待新入队的消息发送完，进程退出时调用；
+        发送失败等待重试的消息留在队列中，由下次运行的进程继续发送
+        """
+        deadline = time.time() + (self.FLUSH_TIMEOUT if timeout is None else timeout)
+        while time.time() < deadline:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT MIN(next_try) FROM messages WHERE attempts = 0"
+                ).fetchone()
+            if row[0] is None or row[0] > deadline:
+                break
+            self._wakeup.set()
+            self._idle.wait(0.2)
+        if self._mqtt is not None:
+            self._mqtt.disconnect()
+            self._mqtt = None
+
+
+_notifier = None
+_notifier_lock = threading.Lock()
+
+
+def get_notifier(config=None):
+    """进程内共用一个通知发送器"""
+    global _notifier
+    with _notifier_lock:
+        if _notifier is None:
+            _notifier = Notifier(get_state_folder(config or load_config()))
+        return _notifier
@@ -0,0 +1,183 @@
+import json
+import os
+import re
+import time
+from xml.sax.saxutils import escape
+from article_model import Article
+from docx_template import (
+    new_document,
+    add_styled_paragraph,
+    STYLE_CATEGORY,
+    STYLE_TITLE,
+    STYLE_DATE,
+    STYLE_BODY,
+)
+
+# 文章的输出格式。每篇文章先整理为 article_model.Article（类别、标题、日期、链接和各段落），
+# 再由配置的各个输出器写入文件，文件名相同、扩展名不同。jsonl中每篇文章一行：
+#   {"category", "title", "pubtime", "href", "paragraphs": [[[文本, 是否加粗], ...], ...]}
+# 只输出jsonl时抓取不再生成docx，合并时由 article_body_xml 直接生成正文XML。
+# Article只包含字符串，可以传给渲染进程，由 render_article 在进程池中写入文件。
+
+# 已下载文章索引中统一使用docx的文件名，与输出格式无关
+INDEX_EXTENSION = ".docx"
+# 结构化文章的扩展名，合并时可以代替docx
+STRUCTURED_EXTENSION = ".jsonl"
+
+# XML中不允许的控制字符
+_INVALID_XML_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+# 与python-docx一致：制表符写为<w:tab/>，换行写为<w:br/>
+_SPECIAL_CHARS = re.compile(r"([\t\n\r])")
+
+
+def build_article(title, category, datetime, paragraphs, href=None):
+    """paragraphs为extract_paragraphs返回的[Paragraph]"""
+    return Article(category, title, datetime, href, paragraphs)
+
+
+def read_article(path):
+    with open(path, "r", encoding="utf-8") as file:
+        return Article.from_dict(json.loads(file.readline()))
+
+
+class DocxWriter:
+    """从A4模板生成docx，段落引用模板中的样式"""
+
+    extension = ".docx"
+
+    def write(self, article, path):
+        doc = new_document()
+        add_styled_paragraph(doc, STYLE_CATEGORY, article.category)
+        add_styled_paragraph(doc, STYLE_TITLE, article.title)
+        add_styled_paragraph(doc, STYLE_DATE, article.pubtime)
+        for body in article.paragraphs:
+            paragraph = add_styled_paragraph(doc, STYLE_BODY)
+            for text, bold in body.runs():
+                run = paragraph.add_run()
+                if bold:
+                    run.bold = True
+                run.text = text
+        doc.save(path)
+
+
+class MarkdownWriter:
+    extension = ".md"
+
+    def write(self, article, path):
+        lines = [f"# {article.title}", ""]
+        meta = f"{article.category} | {article.pubtime}"
+        if article.href:
+            meta += f" | [原文]({article.href})"
+        lines += [meta, ""]
+        for paragraph in article.paragraphs:
+            text = "".join(
+                f"**{text}**" if bold else text for text, bold in paragraph.runs()
+            )
+            lines += [text, ""]
+        with open(path, "w", encoding="utf-8") as file:
+            file.write("\n".join(lines))
+
+
+class TextWriter:
+    extension = ".txt"
+
+    def write(self, article, path):
+        lines = [article.category, article.title, article.pubtime]
+        if article.href:
+            lines.append(article.href)
+        lines.append("")
+        lines += [paragraph.text for paragraph in article.paragraphs]
+        with open(path, "w", encoding="utf-8") as file:
+            file.write("\n".join(lines) + "\n")
+
+
+class JsonlWriter:
+    """每篇文章一行JSON，多个文件直接拼接即为JSON Lines"""
+
+    extension = STRUCTURED_EXTENSION
+
+    def write(self, article, path):
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(json.dumps(article.to_dict(), ensure_ascii=False) + "\n")
+
+
+WRITERS = {
+    "docx": DocxWriter,
+    "md": MarkdownWriter,
+    "txt": TextWriter,
+    "jsonl": JsonlWriter,
+}
+# 所有输出格式的扩展名，归档时一起移动
+ARTICLE_EXTENSIONS = tuple(writer.extension for writer in WRITERS.values())
+
+
+def get_writers(formats):
+    if isinstance(formats, str):
+        formats = [formats]
+    unknown = [name for name in formats if name not in WRITERS]
+    if unknown or not formats:
+        raise ValueError(f"不支持的输出格式：{unknown}，可选：{list(WRITERS)}")
+    return [WRITERS[name]() for name in dict.fromkeys(formats)]
+
+
+def render_article(article, path_base, formats):
+    """
+    按输出格式写入文章，文件名为path_base加各格式的扩展名，
+    返回[(路径, 字节数, 耗时)]。只使用可序列化的参数，可以在渲染进程中调用
+    """
+    results = []
+    for writer in get_writers(formats):
+        path = f"{path_base}{writer.extension}"
+        start = time.perf_counter()
+        writer.write(article, path)
+        results.append((path, os.path.getsize(path), time.perf_counter() - start))
+    return results
+
+
+def index_name(file_name):
+    """任一输出格式的文件名对应的索引文件名"""
+    return os.path.splitext(file_name)[0] + INDEX_EXTENSION
+
+
+# ------------------------------------------------------- #
+# 结构化文章转换为docx正文
+
+
+def _run_xml(text, bold):
+    parts = ["<w:r>"]
+    if bold:
+        parts.append("<w:rPr><w:b/></w:rPr>")
+    for piece in _SPECIAL_CHARS.split(_INVALID_XML_CHARS.sub("", text)):
+        if piece == "\t":
+            parts.append("<w:tab/>")
+        elif piece in ("\n", "\r"):
+            parts.append("<w:br/>")
+        elif piece:
+            space = ' xml:space="preserve"' if piece.strip() != piece else ""
+            parts.append(f"<w:t{space}>{escape(piece)}</w:t>")
+    parts.append("</w:r>")
+    return "".join(parts)
+
+
+def _paragraph_xml(style_id, runs):
+    return (
+        f'<w:p><w:pPr><w:pStyle w:val="{style_id}"/></w:pPr>'
+        + "".join(_run_xml(text, bold) for text, bold in runs)
+        + "</w:p>"
+    )
+
+
+def article_body_xml(article):
+    """生成文章的document.xml正文（不含sectPr），与DocxWriter的内容相同"""
+    parts = [
+        _paragraph_xml(style_id, [(text, False)] if text else [])
+        for style_id, text in (
+            (STYLE_CATEGORY, article.category),
+            (STYLE_TITLE, article.title),
+            (STYLE_DATE, article.pubtime),
+        )
+    ]
+    parts += [
+        _paragraph_xml(STYLE_BODY, paragraph.runs()) for paragraph in article.paragraphs
+    ]
+    return "".join(parts).encode("utf-8")
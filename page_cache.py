@@ -0,0 +1,276 @@
+import gzip
+import mmap
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from requests import HTTPError
+from requests.structures import CaseInsensitiveDict
+from utils_func import load_config, setup_logging, get_state_folder
+
+# 调用时传入参数: stats [站点名称]，查看原始页面缓存的记录数和大小
+
+# requests已经解压过正文，这些头不再与缓存的正文对应，不写入缓存
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+class PageCacheMiss(Exception):
+    """回放时缓存中没有该页面"""
+
+
+class CachedPage:
+    """缓存的页面，属性与 requests.Response 中用到的相同"""
+
+    def __init__(self, url, status_code, headers, content, fetched_at):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.fetched_at = fetched_at
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise HTTPError(f"{self.status_code} Error for url: {self.url}")
+
+
+def _warc_record(url, status_code, headers, content, fetched_at):
+    http_head = [f"HTTP/1.1 {status_code}"]
+    http_head += [
+        f"{key}: {value}"
+        for key, value in headers.items()
+        if key.lower() not in _DROP_HEADERS
+    ]
+    block = ("\r\n".join(http_head) + "\r\n\r\n").encode("latin-1", "replace") + content
+    warc_date = datetime.fromtimestamp(fetched_at, timezone.utc).strftime(
+        "%Y-%m-%dT%H:%M:%SZ"
+    )
+    warc_head = (
+        "WARC/1.0\r\n"
+        "WARC-Type: response\r\n"
+        f"WARC-Target-URI: {url}\r\n"
+        f"WARC-Date: {warc_date}\r\n"
+        f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>\r\n"
+        "Content-Type: application/http; msgtype=response\r\n"
+        f"Content-Length: {len(block)}\r\n\r\n"
+    )
+    return warc_head.encode("utf-8") + block + b"\r\n\r\n"
+
+
+def _parse_record(data):
+    """解析一条WARC记录，返回(状态码, 响应头, 正文)"""
+    warc_head, _, rest = data.partition(b"\r\n\r\n")
+    length = 0
+    for line in warc_head.split(b"\r\n"):
+        key, _, value = line.partition(b":")
+        if key.strip().lower() == b"content-length":
+            length = int(value)
+    http_head, _, body = rest[:length].partition(b"\r\n\r\n")
+    lines = http_head.decode("latin-1").split("\r\n")
+    headers = CaseInsensitiveDict()
+    for line in lines[1:]:
+        key, _, value = line.partition(":")
+        headers[key.strip()] = value.strip()
+    return int(lines[0].split()[1]), headers, body
+
+
+class PageCache:
+    """
+    原始页面缓存，保存抓取到的响应（地址、时间、响应头和正文），修改正文提取规则后可以不联网重新生成文章。
+    每个站点一个文件夹 state/page_cache/<站点>，页面逐条压缩后追加写入分段的 .warc.gz 文件
+    （每条记录是一个独立的gzip成员，可以用WARC工具查看），sqlite索引记录每个地址最新一条记录的位置。
+    读取时内存映射分段文件，按位置只解压这一条记录。
+    超过保存天数的分段和超过总大小时最旧的分段整个删除。
+    """
+
+    INDEX_NAME = "index.sqlite3"
+    # 单个分段文件的大小上限，超过后写入新的分段，淘汰以分段为单位
+    SEGMENT_BYTES = 64 * 1024 * 1024
+
+    def __init__(self, state_folder, site, max_mb=2048, max_age_days=400):
+        self.logger = setup_logging()
+        self.site = site
+        self.folder = os.path.join(state_folder, "page_cache", site)
+        os.makedirs(self.folder, exist_ok=True)
+        self.max_bytes = int(max_mb) * 1024 * 1024
+        self.max_age = float(max_age_days) * 86400
+        self._lock = threading.Lock()
+        self._maps = {}
+        self._writer = None
+        self._segment = None
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self._conn = sqlite3.connect(
+            os.path.join(self.folder, self.INDEX_NAME), timeout=30, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                segment TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                status INTEGER NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_segment ON pages (segment)")
+        self._conn.commit()
+
+    def _segments(self):
+        """按写入先后排列的分段文件名"""
+        return sorted(name for name in os.listdir(self.folder) if name.endswith(".warc.gz"))
+
+    def put(self, url, status_code, headers, content):
+        """写入一个页面，只缓存状态码为200的响应"""
+        if status_code != 200 or not content:
+            return
+        fetched_at = time.time()
+        record = gzip.compress(
+            _warc_record(url, status_code, headers, content, fetched_at), compresslevel=6
+        )
+        with self._lock:
+            if self._writer is None or self._writer.tell() >= self.SEGMENT_BYTES:
+                self._open_segment()
+            offset = self._writer.tell()
+            self._writer.write(record)
+            self._writer.flush()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)",
+                (url, self._segment, offset, len(record), status_code, fetched_at),
+            )
+            self._conn.commit()
+            self.stored += 1
+
+    def _open_segment(self):
+        # 只在写入时淘汰，回放和查看统计只读取，不删除分段
+        if self._writer:
+            self._writer.close()
+        self._evict_locked()
+        self._segment = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.warc.gz"
+        self._writer = open(os.path.join(self.folder, self._segment), "ab")
+
+    def get(self, url):
+        """返回缓存的页面，没有时返回None"""
+        row = self._conn.execute(
+            "SELECT segment, offset, length, fetched_at FROM pages WHERE url = ?", (url,)
+        ).fetchone()
+        if not row:
+            self.misses += 1
+            return None
+        segment, offset, length, fetched_at = row
+        try:
+            data = gzip.decompress(self._read(segment, offset, length))
+            status_code, headers, content = _parse_record(data)
+        except (OSError, ValueError, EOFError) as e:
+            self.logger.warning(f"读取缓存的页面失败：{url}，{e}")
+            self.misses += 1
+            return None
+        self.hits += 1
+        return CachedPage(url, status_code, headers, content, fetched_at)
+
+    def _read(self, segment, offset, length):
+        with self._lock:
+            mapped = self._maps.get(segment)
+            # 正在写入的分段会变长，映射的长度不够时重新映射
+            if mapped is None or len(mapped) < offset + length:
+                if mapped is not None:
+                    mapped.close()
+                with open(os.path.join(self.folder, segment), "rb") as file:
+                    mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                self._maps[segment] = mapped
+            return mapped[offset : offset + length]
+
+    def _evict_locked(self):
+        now = time.time()
+        segments = [
+            (name, os.path.getsize(os.path.join(self.folder, name)))
+            for name in self._segments()
+        ]
+        total = sum(size for _, size in segments)
+        removed = []
+        for name, size in segments:
+            if name == self._segment:
+                break
+            expired = self.max_age and (
+                now - os.path.getmtime(os.path.join(self.folder, name)) > self.max_age
+            )
+            if not expired and (not self.max_bytes or total <= self.max_bytes):
+                break
+            if mapped := self._maps.pop(name, None):
+                mapped.close()
+            os.remove(os.path.join(self.folder, name))
+            self._conn.execute("DELETE FROM pages WHERE segment = ?", (name,))
+            total -= size
+            removed.append(name)
+        if removed:
+            self._conn.commit()
+            self.logger.info(
+                f"【{self.site}】原始页面缓存删除{len(removed)}个旧分段，剩余{total / 1048576:.0f}MB"
+            )
+
+    def stats(self):
+        """返回(页面数, 分段数, 总字节数)"""
+        count = self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+        segments = self._segments()
+        size = sum(os.path.getsize(os.path.join(self.folder, name)) for name in segments)
+        return count, len(segments), size
+
+    def report(self):
+        if self.hits or self.misses:
+            self.logger.info(
+                f"【{self.site}】从原始页面缓存读取{self.hits}个页面，缺少{self.misses}个"
+            )
+        if self.stored:
+            self.logger.info(f"【{self.site}】原始页面缓存写入{self.stored}个页面")
+
+    def close(self):
+        with self._lock:
+            if self._writer:
+                self._writer.close()
+                self._writer = None
+            for mapped in self._maps.values():
+                mapped.close()
+            self._maps.clear()
+            self._conn.close()
+
+
+def open_page_cache(config, site, replay=False):
+    """按配置打开站点的原始页面缓存，未启用时返回None；回放时总是打开"""
+    if not (replay or config.get("page_cache", False)):
+        return None
+    return PageCache(
+        get_state_folder(config),
+        site,
+        config.get("page_cache_max_mb", 2048),
+        config.get("page_cache_max_age_days", 400),
+    )
+
+
+def print_stats(site=None, config_path="config/config.yaml"):
+    config = load_config(config_path)
+    cache_root = os.path.join(get_state_folder(config), "page_cache")
+    if not os.path.exists(cache_root):
+        print("没有原始页面缓存")
+        return
+    for name in sorted(os.listdir(cache_root)):
+        if site and name != site:
+            continue
+        cache = open_page_cache(config, name, replay=True)
+        count, segments, size = cache.stats()
+        print(f"{name}：{count}个页面，{segments}个分段，{size / 1048576:.1f}MB")
+        cache.close()
+
+
+if __name__ == "__main__":
+    args = sys.argv
+    if len(args) < 2 or args[1] != "stats":
+        print("参数错误, 请传入参数: stats [站点名称]")
+        sys.exit(1)
+
+    print_stats(args[2] if len(args) > 2 else None)
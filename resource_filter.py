@@ -0,0 +1,121 @@
+import threading
+from collections import Counter
+from fnmatch import fnmatch
+from utils_func import setup_logging
+
+# 默认拦截的资源类型和统计/广告脚本地址，只需要HTML时这些资源都不必下载
+DEFAULT_BLOCK_RESOURCE_TYPES = ["image", "media", "font", "stylesheet"]
+DEFAULT_BLOCK_URL_PATTERNS = [
+    "*google-analytics.com*",
+    "*googletagmanager.com*",
+    "*hm.baidu.com*",
+    "*cnzz.com*",
+    "*.51.la*",
+]
+
+
+class ResourceFilter:
+    """
+    playwright 资源过滤，在 context 上按资源类型和地址拦截请求。
+    allow_url_patterns 中的子资源始终放行；allow_page_patterns 匹配的页面不做任何过滤，
+    用于确实需要脚本或样式才能渲染的页面。同时统计拦截和放行的请求数，以及放行的字节数
+    （被拦截的请求没有下载，大小未知，只统计请求数）。
+    """
+
+    def __init__(
+        self,
+        block_resource_types=None,
+        block_url_patterns=None,
+        allow_url_patterns=None,
+        allow_page_patterns=None,
+    ):
+        self.logger = setup_logging()
+        self.block_resource_types = set(
+            DEFAULT_BLOCK_RESOURCE_TYPES
+            if block_resource_types is None
+            else block_resource_types
+        )
+        self.block_url_patterns = (
+            DEFAULT_BLOCK_URL_PATTERNS
+            if block_url_patterns is None
+            else block_url_patterns
+        )
+        self.allow_url_patterns = allow_url_patterns or []
+        self.allow_page_patterns = allow_page_patterns or []
+        self._unfiltered_pages = set()
+        self._lock = threading.Lock()
+        self.blocked = Counter()
+        self.allowed = Counter()
+        self.allowed_bytes = Counter()
+
+    @classmethod
+    def from_config(cls, config):
+        """从配置文件的resource_filter项创建，未启用时返回None"""
+        filter_config = config.get("resource_filter") or {}
+        if not filter_config.get("enabled", True):
+            return None
+        return cls(
+            filter_config.get("block_resource_types"),
+            filter_config.get("block_url_patterns"),
+            filter_config.get("allow_url_patterns"),
+            filter_config.get("allow_page_patterns"),
+        )
+
+    def attach(self, context):
+        context.route("**/*", self._handle_route)
+        context.on("response", self._on_response)
+
+    def prepare(self, page, url):
+        """页面跳转前调用，匹配allow_page_patterns的页面加载全部资源"""
+        with self._lock:
+            if any(fnmatch(url, pattern) for pattern in self.allow_page_patterns):
+                self._unfiltered_pages.add(page)
+            else:
+                self._unfiltered_pages.discard(page)
+
+    def _is_unfiltered(self, request):
+        try:
+            page = request.frame.page
+        except Exception:
+            return False
+        # 页面池传入的可能是延迟启动的页面代理，逐个比较而不是按哈希查找
+        with self._lock:
+            return any(unfiltered == page for unfiltered in self._unfiltered_pages)
+
+    def should_block(self, resource_type, url):
+        if resource_type == "document":
+            return False
+        if any(fnmatch(url, pattern) for pattern in self.allow_url_patterns):
+            return False
+        return resource_type in self.block_resource_types or any(
+            fnmatch(url, pattern) for pattern in self.block_url_patterns
+        )
+
+    def _handle_route(self, route):
+        request = route.request
+        resource_type = request.resource_type
+        if not self._is_unfiltered(request) and self.should_block(
+            resource_type, request.url
+        ):
+            with self._lock:
+                self.blocked[resource_type] += 1
+            route.abort()
+        else:
+            route.continue_()
+
+    def _on_response(self, response):
+        resource_type = response.request.resource_type
+        # 以Content-Length统计放行的字节数，分块传输的响应没有该头，不计入
+        size = int(response.headers.get("content-length", 0) or 0)
+        with self._lock:
+            self.allowed[resource_type] += 1
+            self.allowed_bytes[resource_type] += size
+
+    def report(self):
+        blocked_num = sum(self.blocked.values())
+        allowed_num = sum(self.allowed.values())
+        detail = "，".join(f"{k}:{v}" for k, v in self.blocked.most_common())
+        self.logger.info(
+            f"资源过滤：拦截{blocked_num}个请求（{detail or '无'}）；"
+            f"放行{allowed_num}个请求，{sum(self.allowed_bytes.values()) / 1024:.1f}KB"
+        )
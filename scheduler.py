@@ -0,0 +1,178 @@
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from utils_func import setup_logging
+import metrics
+
+# 等待下次运行时每次最多睡眠的秒数，系统休眠或修改时间后也能按时触发
+MAX_SLEEP = 30
+
+
+class RunHook:
+    """
+    任务开始前运行的函数，可以由多个任务共用：同时触发的任务只运行一次，
+    其余任务等待这次运行结束后再开始。出错只记录日志，不影响任务运行
+    """
+
+    def __init__(self, name, func):
+        self.logger = setup_logging()
+        self.name = name
+        self.func = func
+        self.lock = asyncio.Lock()
+        self.last_end = None
+
+    async def run(self, triggered_at):
+        async with self.lock:
+            # 任务触发之后已经运行完一次（其他任务触发的），不再重复运行
+            if self.last_end is not None and self.last_end >= triggered_at:
+                return
+            try:
+                await asyncio.to_thread(self.func)
+            except Exception as e:
+                self.logger.error(f"【{self.name}】运行出错：{e}")
+            finally:
+                self.last_end = time.monotonic()
+
+
+class ScheduledJob:
+    """
+    定时任务：times为每天运行的时间点（"时:分"），interval为运行间隔（分钟），
+    两者可以同时设置，取最近的一次作为下次运行时间；before为任务开始前运行的RunHook
+    """
+
+    def __init__(self, name, func, times=None, interval=None, before=None):
+        self.name = name
+        self.func = func
+        self.before = before
+        self.times = [datetime.strptime(str(t), "%H:%M").time() for t in times or []]
+        self.interval = timedelta(minutes=float(interval)) if interval else None
+        self.lock = asyncio.Lock()
+        self.next_run = None
+        self.last_start = None
+        self.last_duration = None
+        self.last_result = None
+        self.runs = 0
+        self.skipped = 0
+
+    def compute_next_run(self, now):
+        candidates = []
+        for at in self.times:
+            run = datetime.combine(now.date(), at)
+            if run <= now:
+                run += timedelta(days=1)
+            candidates.append(run)
+        if self.interval:
+            # 按上次计划的时间累加间隔，不因任务耗时而漂移
+            run = self.next_run or now
+            while run <= now:
+                run += self.interval
+            candidates.append(run)
+        return min(candidates) if candidates else None
+
+    def state(self):
+        return {
+            "next_run": self.next_run.isoformat(timespec="seconds")
+            if self.next_run
+            else None,
+            "last_start": self.last_start.isoformat(timespec="seconds")
+            if self.last_start
+            else None,
+            "last_duration": round(self.last_duration, 1)
+            if self.last_duration is not None
+            else None,
+            "last_result": self.last_result,
+            "running": self.lock.locked(),
+            "runs": self.runs,
+            "skipped": self.skipped,
+        }
+
+
+class Scheduler:
+    """
+    基于asyncio的定时调度：每个任务单独计算下次运行时间并按时触发，
+    任务在线程中运行；同一任务上次运行未结束时跳过本次，
+    max_concurrent限制同时运行的任务数（不包括任务开始前的RunHook），各任务的状态写入state_file
+    """
+
+    def __init__(self, jobs, max_concurrent=2, state_file=None):
+        self.logger = setup_logging()
+        self.jobs = jobs
+        self.max_concurrent = max(int(max_concurrent), 1)
+        self.state_file = state_file
+        self._semaphore = None
+        self._tasks = set()
+
+    async def run(self, run_now=False):
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        if run_now:
+            for job in self.jobs:
+                self._spawn(job)
+        await asyncio.gather(*(self._job_loop(job) for job in self.jobs))
+
+    async def _job_loop(self, job):
+        while True:
+            job.next_run = job.compute_next_run(datetime.now())
+            self.save_state()
+            if job.next_run is None:
+                self.logger.warning(f"任务【{job.name}】没有设置运行时间")
+                return
+            self.logger.info(
+                f"任务【{job.name}】下次运行时间：{job.next_run:%Y-%m-%d %H:%M:%S}"
+            )
+            while (delay := (job.next_run - datetime.now()).total_seconds()) > 0:
+                await asyncio.sleep(min(delay, MAX_SLEEP))
+            self._spawn(job)
+
+    def _spawn(self, job):
+        task = asyncio.create_task(self.trigger(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def trigger(self, job):
+        if job.lock.locked():
+            job.skipped += 1
+            self.logger.warning(f"任务【{job.name}】上次运行还未结束，跳过本次运行")
+            self.save_state()
+            return
+        async with job.lock:
+            if job.before:
+                await job.before.run(time.monotonic())
+            async with self._semaphore:
+                job.last_start = datetime.now()
+                self.save_state()
+                start = time.monotonic()
+                try:
+                    result = await asyncio.to_thread(job.func)
+                    job.last_result = "failed" if result is False else "success"
+                except Exception as e:
+                    self.logger.error(f"任务【{job.name}】运行出错：{e}")
+                    job.last_result = "error"
+                job.last_duration = time.monotonic() - start
+                job.runs += 1
+        self.logger.info(
+            f"任务【{job.name}】运行结束（{job.last_result}），耗时{job.last_duration:.1f}秒"
+        )
+        self.save_state()
+        self.record_metrics(job)
+
+    def record_metrics(self, job):
+        # 每次任务运行结束后更新指标文件，常驻进程不用等到退出
+        metrics.JOB_RUNS.inc(job=job.name, result=job.last_result)
+        metrics.JOB_DURATION.set(round(job.last_duration, 3), job=job.name)
+        if job.last_result == "success":
+            metrics.JOB_LAST_SUCCESS.set(round(time.time()), job=job.name)
+        metrics.write_textfile()
+
+    def save_state(self):
+        if not self.state_file:
+            return
+        state = {job.name: job.state() for job in self.jobs}
+        try:
+            temp_file = f"{self.state_file}.tmp"
+            with open(temp_file, "w", encoding="utf-8") as file:
+                json.dump(state, file, ensure_ascii=False, indent=2)
+            os.replace(temp_file, self.state_file)
+        except OSError as e:
+            self.logger.warning(f"保存调度状态失败：{e}")
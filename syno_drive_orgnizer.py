@@ -1,18 +1,31 @@
+from synology_drive_api.base import SynologyException
 from synology_drive_api.drive import SynologyDrive
-from utils_func import load_config, path_join, setup_logging
+from synology_drive_api.utils import form_urlencoded
+from utils_func import load_config, path_join, setup_logging, get_state_folder
+import json
+import os
+import posixpath
+import threading
+import time
 import requests
+from metrics import timed
 
 
 class MySynd(SynologyDrive):
     """
     Synology Drive 封装类，自动读取配置并连接 NAS。
     用法：with MySynd() as synd:
+    preferred_address 为上次可用的地址，优先尝试
     """
 
-    def __init__(self, config_path="config/secret.yaml"):
+    def __init__(self, config_path="config/secret.yaml", preferred_address=None, probe=True):
         self._logger = setup_logging()
         self._config_nas = load_config(config_path)
-        self._nas_info = self._find_available_nas()
+        # probe为False时直接使用preferred_address，不探测连通性（恢复保存的会话时）
+        if probe or not preferred_address:
+            self._nas_info = self._find_available_nas(preferred_address)
+        else:
+            self._nas_info = tuple(preferred_address)
         if not self._nas_info:
             raise Exception("没有可用的Synology NAS")
         nas_addr, nas_port, is_https = self._nas_info
@@ -32,6 +45,15 @@ class MySynd(SynologyDrive):
     def __exit__(self, exc_type, exc_val, exc_tb):
         super().__exit__(exc_type, exc_val, exc_tb)
 
+    @property
+    def nas_info(self):
+        return self._nas_info
+
+    def restore_session(self, sid):
+        """使用保存的会话id，不再登录；会话已失效时之后的第一个请求出错"""
+        self.session._sid = sid
+        self.session._session_expire = False
+
     def _try_connect(self, url):
         """内部方法，测试NAS地址连通性"""
         try:
@@ -40,12 +62,22 @@ class MySynd(SynologyDrive):
         except Exception:
             return False
 
-    def _find_available_nas(self):
-        """内部方法，查找可用的NAS地址"""
-        for addr_info in self._config_nas.get("nas_address", []):
-            addr = addr_info.get("address")
-            port = addr_info.get("port", 5000)
-            is_https = addr_info.get("https", False)
+    def _find_available_nas(self, preferred_address=None):
+        """内部方法，查找可用的NAS地址，上次可用的地址排在最前"""
+        candidates = [
+            (
+                addr_info.get("address"),
+                addr_info.get("port", 5000),
+                addr_info.get("https", False),
+            )
+            for addr_info in self._config_nas.get("nas_address", [])
+        ]
+        if preferred_address:
+            preferred_address = tuple(preferred_address)
+            if preferred_address in candidates:
+                candidates.remove(preferred_address)
+                candidates.insert(0, preferred_address)
+        for addr, port, is_https in candidates:
             url = f"{'https' if is_https else 'http'}://{addr}:{port}"
             if self._try_connect(url):
                 self._logger.debug(f"Synology Drive连接成功: {url}")
@@ -53,59 +85,245 @@ class MySynd(SynologyDrive):
         self._logger.error("没有可用的Synology Drive地址")
         return None
 
+    def list_starred(self, offset=0, limit=1000):
+        """列出整个Drive中加星的文件和文件夹，一次请求代替逐个文件夹列出"""
+        params = {
+            "api": "SYNO.SynologyDrive.Files",
+            "version": 2,
+            "method": "list_starred",
+            "filter": {},
+            "sort_direction": "asc",
+            "sort_by": "name",
+            "offset": offset,
+            "limit": limit,
+        }
+        return self.session.http_get("entry.cgi", params=params)
+
+    def iter_starred(self, limit=1000):
+        """分页列出全部加星的文件和文件夹，直到达到返回的total"""
+        offset = 0
+        while True:
+            data = self.list_starred(offset, limit)["data"]
+            items = data["items"]
+            yield from items
+            offset += len(items)
+            if not items or offset >= data["total"]:
+                return
+
+    def move_files(self, file_ids, dest_folder):
+        """一次请求移动多个文件，file_ids为文件id列表，dest_folder为文件夹路径或id"""
+        if dest_folder.isdigit():
+            dest_path = f"id:{dest_folder}"
+        else:
+            dest_path = f"/{dest_folder}" if not dest_folder.startswith("/") else dest_folder
+        data = {
+            "api": "SYNO.SynologyDrive.Files",
+            "method": "move",
+            "version": 2,
+            "files": [f"id:{file_id}" for file_id in file_ids],
+            "to_parent_folder": dest_path,
+            "conflict_action": "autorename",
+        }
+        return self.session.http_post("entry.cgi", data=form_urlencoded(data))
+
+
+# Synology API的错误码：API不存在、方法不存在、版本不支持，出现时改为逐个文件夹列出
+UNSUPPORTED_API_CODES = {102, 103, 104}
+_synd_cache = {"synd": None, "login_time": 0}
+_synd_lock = threading.Lock()
+
+
+class SyncState:
+    """
+    加星同步的状态：上次可用的NAS地址、登录的会话、各加星文件夹的id、是否支持加星列表。
+    会话保存在状态文件中，定时任务和archive_docx.py的每次运行（新的进程）在有效期内不必重新登录
+    """
+
+    FILE_NAME = "syno_sync.json"
 
+    def __init__(self):
+        config = load_config()
+        self.path = os.path.join(get_state_folder(config), self.FILE_NAME)
+        # 会话的有效期，单位：分钟，默认1天，应不短于定时任务的间隔
+        self.session_ttl = float(config.get("syno_session_ttl", 1440)) * 60
+        self.data = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as file:
+                    self.data = json.load(file)
+            except Exception:
+                self.data = {}
+        self.data.setdefault("starred_folders", {})
+
+    def save(self):
+        with open(self.path, "w", encoding="utf-8") as file:
+            json.dump(self.data, file, ensure_ascii=False, indent=2)
+        # 文件中保存了会话id，只允许本用户读写
+        os.chmod(self.path, 0o600)
+
+
+def get_synd(state):
+    """
+    返回已登录的MySynd。会话在有效期内直接复用，不再探测地址和登录：
+    先用进程内的会话，再用状态文件中保存的会话（上次运行或其他进程登录的），都没有时才登录
+    """
+    with _synd_lock:
+        now = time.time()
+        synd = _synd_cache["synd"]
+        if synd is not None and now - _synd_cache["login_time"] < state.session_ttl:
+            return synd
+        if synd is not None:
+            try:
+                synd.logout()
+            except Exception:
+                pass
+        session = state.data.get("session") or {}
+        address = state.data.get("nas_address")
+        login_time = session.get("login_time", 0)
+        if session.get("sid") and address and now - login_time < state.session_ttl:
+            synd = MySynd(preferred_address=address, probe=False)
+            synd.restore_session(session["sid"])
+            _synd_cache.update(synd=synd, login_time=login_time)
+            return synd
+        synd = MySynd(preferred_address=address)
+        synd.login()
+        login_time = time.time()
+        _synd_cache.update(synd=synd, login_time=login_time)
+        state.data["nas_address"] = list(synd.nas_info)
+        state.data["session"] = {"sid": synd.session.sid, "login_time": login_time}
+        state.save()
+        return synd
+
+
+def invalidate_synd(state=None):
+    """丢弃进程内和状态文件中保存的会话，下次重新探测地址并登录"""
+    with _synd_lock:
+        _synd_cache.update(synd=None, login_time=0)
+    if state is not None and state.data.pop("session", None):
+        state.save()
+
+
+@timed("process_stars_move_api")
 def process_stars_move_api():
     """遍历指定文件夹，将加星文件移动到加星子文件夹"""
-    import os
+    logger = setup_logging()
+    state = SyncState()
+    try:
+        _sync_starred(get_synd(state), state)
+    except Exception as e:
+        # 会话过期或NAS地址变化时重新登录后再试一次
+        logger.warning(f"加星文件同步出错，重新登录后重试: {e}")
+        invalidate_synd(state)
+        _sync_starred(get_synd(state), state)
+
+
+def _sync_starred(synd, state):
     logger = setup_logging()
     remote_root_folder = "/mydrive/新闻文档爬取与合并/"
     remote_folder_names = ["hubeigov", "renmin"]
     starred_folder_name = "加星"
+    folder_paths = {
+        path_join(remote_root_folder, folder_name): folder_name
+        for folder_name in remote_folder_names
+    }
 
-    def _gen_starred_folder_path(synd, remote_folder_path, starred_folder_name, data_items):
-        """确保加星文件夹存在，不存在则创建，返回加星文件夹路径"""
-        starred_folder_path = path_join(remote_folder_path, starred_folder_name)
-        if not any(item["display_path"] == starred_folder_path for item in data_items):
-            try:
-                synd.create_folder(starred_folder_name, remote_folder_path)
-                logger.info(f"文件夹创建成功: {starred_folder_path}")
-            except Exception as e:
-                logger.error(f"创建文件夹失败: {e}")
-                return None
-        return starred_folder_path
+    starred_items = None
+    if state.data.get("list_starred", True):
+        try:
+            starred_items = group_starred(synd.iter_starred(), folder_paths)
+        except SynologyException as e:
+            # 只有明确不支持时才关闭加星列表，会话过期等错误抛出，由调用方重新登录后重试
+            if e.code not in UNSUPPORTED_API_CODES:
+                raise
+            logger.info(f"Synology Drive不支持加星列表，改为逐个文件夹列出: 错误码{e.code}")
+            state.data["list_starred"] = False
+            state.save()
+            starred_items = None
+        except (KeyError, TypeError, ValueError) as e:
+            # 响应格式与预期不同时本次改为逐个文件夹列出，下次仍先尝试加星列表
+            logger.warning(f"加星列表的响应格式无法解析，改为逐个文件夹列出: {e!r}")
+            starred_items = None
 
-    with MySynd() as synd:
-        for folder_name in remote_folder_names:
-            remote_folder_path = path_join(remote_root_folder, folder_name)
+    if starred_items is None:
+        starred_items = {}
+        for remote_folder_path in folder_paths:
             try:
                 data = synd.list_folder(remote_folder_path)
                 data_items = data["data"]["items"]
             except Exception as e:
                 logger.error(f"获取文件夹内容失败: {e}, 路径: {remote_folder_path}")
                 continue
+            starred_items[remote_folder_path] = [
+                item
+                for item in data_items
+                if item.get("starred") and item.get("type") == "file"
+            ]
 
-            # 确保加星文件夹存在
-            starred_folder_path = _gen_starred_folder_path(
-                synd, remote_folder_path, starred_folder_name, data_items
+    for remote_folder_path, items in starred_items.items():
+        if not items:
+            continue
+        # 确保加星文件夹存在
+        starred_folder_path = path_join(remote_folder_path, starred_folder_name)
+        starred_folder_id = _get_starred_folder_id(
+            synd, state, remote_folder_path, starred_folder_name
+        )
+        if not starred_folder_id:
+            continue
+        try:
+            synd.move_files([item["file_id"] for item in items], starred_folder_id)
+        except Exception as e:
+            # 加星文件夹可能已被删除，下次重新查找
+            state.data["starred_folders"].pop(starred_folder_path, None)
+            state.save()
+            logger.error(f"移动文件失败: {e}，文件夹: {remote_folder_path}")
+            continue
+        for item in items:
+            logger.info(
+                f"移动文件成功: {os.path.basename(item['display_path'])} -> 【{os.path.relpath(starred_folder_path, remote_root_folder)}】"
             )
-            if not starred_folder_path:
-                continue
 
-            for item in data_items:
-                if item.get("starred") and item.get("type") == "file":
-                    try:
-                        synd.move_path(item["display_path"], starred_folder_path)
-                        logger.info(
-                            f"移动文件成功: {os.path.basename(item['display_path'])} -> 【{os.path.relpath(starred_folder_path, remote_root_folder)}】"
-                        )
-                    except Exception as e:
-                        logger.error(f"移动文件失败: {e}，文件: {item['display_path']}")
+
+def group_starred(items, folder_paths):
+    """
+    把加星的条目按所在文件夹分组，只保留folder_paths中的文件夹直接包含的文件；
+    条目缺少display_path、type或file_id时抛出KeyError
+    """
+    starred_items = {path: [] for path in folder_paths}
+    for item in items:
+        parent = posixpath.dirname(item["display_path"])
+        if item["type"] == "file" and parent in starred_items:
+            if "file_id" not in item:
+                raise KeyError("file_id")
+            starred_items[parent].append(item)
+    return starred_items
+
+
+def _get_starred_folder_id(synd, state, remote_folder_path, starred_folder_name):
+    """返回加星文件夹的id，不存在则创建；id保存在状态文件中，之后不再查询"""
+    logger = setup_logging()
+    starred_folder_path = path_join(remote_folder_path, starred_folder_name)
+    folder_id = state.data["starred_folders"].get(starred_folder_path)
+    if folder_id:
+        return folder_id
+    try:
+        folder_id = synd.get_file_or_folder_info(starred_folder_path)["data"]["file_id"]
+    except Exception:
+        try:
+            synd.create_folder(starred_folder_name, remote_folder_path)
+            logger.info(f"文件夹创建成功: {starred_folder_path}")
+            folder_id = synd.get_file_or_folder_info(starred_folder_path)["data"][
+                "file_id"
+            ]
+        except Exception as e:
+            logger.error(f"创建文件夹失败: {e}")
+            return None
+    state.data["starred_folders"][starred_folder_path] = str(folder_id)
+    state.save()
+    return str(folder_id)
 
 
 def test():
     """示例：列出远程文件夹并保存到本地json"""
-    import json
-
     remote_root_folder = "/mydrive/新闻文档爬取与合并/"
     with MySynd() as synd:
         obj = synd.list_folder(remote_root_folder)
@@ -113,5 +331,19 @@ def test():
             json.dump(obj, f, ensure_ascii=False, indent=4)
 
 
+def record_starred(path="tests/fixtures/list_starred.json"):
+    """录制NAS返回的加星列表（第一页），用于检查group_starred对真实响应的解析"""
+    with MySynd() as synd:
+        obj = synd.list_starred()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, indent=4)
+
+
 if __name__ == "__main__":
-    test()
+    import sys
+
+    # 调用时传入参数: record_starred，录制加星列表；不传参数时列出远程文件夹
+    if len(sys.argv) > 1 and sys.argv[1] == "record_starred":
+        record_starred()
+    else:
+        test()
@@ -0,0 +1,110 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import syno_drive_orgnizer as syno
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "list_starred.json")
+ROOT = "/mydrive/新闻文档爬取与合并/"
+FOLDER_PATHS = {ROOT + "hubeigov": "hubeigov", ROOT + "renmin": "renmin"}
+
+
+def load_fixture():
+    with open(FIXTURE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class FakeSynd:
+    """按给定的响应返回加星列表，记录移动的文件和列出的文件夹"""
+
+    def __init__(self, pages, folders=None):
+        self.pages = list(pages)
+        self.folders = folders or {}
+        self.listed = []
+        self.moved = {}
+
+    def list_starred(self, offset=0, limit=1000):
+        return self.pages.pop(0)
+
+    iter_starred = syno.MySynd.iter_starred
+
+    def list_folder(self, path):
+        self.listed.append(path)
+        return {"data": {"items": self.folders.get(path, [])}}
+
+    def move_files(self, file_ids, dest_folder):
+        self.moved.setdefault(dest_folder, []).extend(file_ids)
+
+
+class FakeState:
+    def __init__(self):
+        self.data = {
+            "starred_folders": {
+                ROOT + "hubeigov/加星": "1",
+                ROOT + "renmin/加星": "2",
+            }
+        }
+
+    def save(self):
+        pass
+
+
+def test_group_starred_recorded_response():
+    items = load_fixture()["data"]["items"]
+    grouped = syno.group_starred(items, FOLDER_PATHS)
+    # 只保留两个站点文件夹直接包含的文件，不包括子文件夹、加星文件夹和其他文件夹中的文件
+    assert {path: [item["file_id"] for item in group] for path, group in grouped.items()} == {
+        ROOT + "hubeigov": ["882614125167948001"],
+        ROOT + "renmin": ["882614125167948102"],
+    }
+
+
+def test_group_starred_missing_field():
+    item = dict(load_fixture()["data"]["items"][0])
+    del item["file_id"]
+    with pytest.raises(KeyError):
+        syno.group_starred([item], FOLDER_PATHS)
+
+
+def test_iter_starred_pages_until_total():
+    items = load_fixture()["data"]["items"]
+    pages = [
+        {"success": True, "data": {"items": items[:3], "total": 5}},
+        {"success": True, "data": {"items": items[3:], "total": 5}},
+    ]
+    synd = FakeSynd(pages)
+    assert [item["file_id"] for item in synd.iter_starred(limit=3)] == [
+        item["file_id"] for item in items
+    ]
+    assert synd.pages == []
+
+
+def test_sync_starred_recorded_response():
+    synd = FakeSynd([load_fixture()])
+    state = FakeState()
+    syno._sync_starred(synd, state)
+    assert synd.listed == []
+    assert synd.moved == {"1": ["882614125167948001"], "2": ["882614125167948102"]}
+
+
+@pytest.mark.parametrize(
+    "response",
+    [
+        {"success": True, "data": {"files": []}},
+        {"success": True, "data": {"items": [{"name": "a.docx"}], "total": 1}},
+        {"success": True, "data": None},
+    ],
+)
+def test_sync_starred_falls_back_on_unexpected_schema(response):
+    folder_item = dict(load_fixture()["data"]["items"][0])
+    synd = FakeSynd([response], folders={ROOT + "hubeigov": [folder_item]})
+    state = FakeState()
+    syno._sync_starred(synd, state)
+    assert synd.listed == list(FOLDER_PATHS)
+    assert synd.moved == {"1": ["882614125167948001"]}
+    # 格式问题只影响本次运行，下次仍先尝试加星列表
+    assert "list_starred" not in state.data
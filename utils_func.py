@@ -29,6 +29,16 @@ def path_join(*args):
     return os.path.join(*args).replace("\\", "/")
 
 
+def get_state_folder(config):
+    # 运行状态（索引、缓存等）保存目录，默认与docx文件夹同级的state文件夹
+    state_folder = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        config.get("state_folder", "state"),
+    )
+    os.makedirs(state_folder, exist_ok=True)
+    return state_folder
+
+
 def mkdirs_with_owner(folder_path, owner_uid=1027, owner_gid=100):
     # 创建目录，并设置目录的拥有者
     if not os.path.exists(folder_path):
@@ -50,8 +60,8 @@ def change_file_owner(path, owner_uid=1027, owner_gid=100):
 
 
 def load_year_from_args():
-    # 解析命令行参数
-    args = sys.argv[1:]
+    # 解析命令行参数，--开头的选项不是年份
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
     if len(args) > 0 and args[0].isdigit():
         logger.info(f"使用命令行参数指定的年份：{args[0]}")
         return int(args[0])
@@ -60,6 +70,11 @@ def load_year_from_args():
         return 2025
 
 
+def load_replay_from_args():
+    # 命令行参数中有--from-cache时从原始页面缓存回放，不联网
+    return "--from-cache" in sys.argv[1:]
+
+
 class MQTTClient:
     def __init__(self, host, port, username, password, client_id):
         """